@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ocr"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# Load test of the OCR API server modes (ocr_config.HTTP_SERVER): bridge-like clients POST
+# /ocr_shm through a requests.Session, first at the bridge's polling rate, then as fast as they
+# can. The server runs in a child process with stand-in engines and one published frame, so
+# nearly every answer comes from the poller's result and what is measured is the per-request
+# HTTP cost: client latency, throughput and server CPU per request.
+MODES = ("threading", "asyncio")
+
+
+def _serve(args):
+    import standins
+    standins.install_paddle_standin(5.0, 1.0)
+
+    import core.api.ocr_api as ocr_api
+    import core.services.ocr_poller as ocr_poller
+    from bench_pipeline import make_subtitles
+    from core.runtime.ocr_shm_writer import ShmFrameWriter
+    from core.runtime.ocr_startup import STARTUP
+
+    sub = make_subtitles(1, 1280, 200, 3)[0]
+    standins.learn_frame(sub["img"], sub["bands"])
+    writer = ShmFrameWriter(slot_count=3, slot_bytes=1280 * 200 * 4)
+    writer.write_frame(sub["img"])
+    httpd = ocr_api.create_server("127.0.0.1", 0, mode=args.serve)
+    STARTUP.set_state("ready")
+    ocr_poller.start()
+    print(f"PORT {httpd.server_address[1]}", flush=True)
+    try:
+        httpd.serve_forever()
+    finally:
+        writer.close(unlink=True)
+
+
+def _client(port: int, interval_s: float, stop: threading.Event, out: list):
+    import requests
+
+    s = requests.Session()
+    url = f"http://127.0.0.1:{port}/ocr_shm"
+    params = {"lang": "en", "gpu": "0", "fields": "text,seq"}
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            ok = s.post(url, params=params, data=b"", timeout=(2.0, 5.0)).json().get("ok", False)
+        except Exception:
+            ok = False
+        dt = time.perf_counter() - t0
+        out.append((dt * 1000.0, ok))
+        if interval_s > 0:
+            time.sleep(max(0.0, interval_s - dt))
+
+
+def _cpu_s(pid: int):
+    # user + system CPU seconds of the server process, None if it cannot be read
+    try:
+        import psutil
+
+        return sum(psutil.Process(pid).cpu_times()[:2])
+    except ImportError:
+        pass
+    try:
+        with open(f"/proc/{pid}/stat", "r") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _phase(port: int, proc, clients: int, interval_s: float, seconds: float):
+    import numpy as np
+
+    cpu0 = _cpu_s(proc.pid)
+    stop = threading.Event()
+    outs = [[] for _ in range(clients)]
+    threads = [threading.Thread(target=_client, args=(port, interval_s, stop, o), daemon=True) for o in outs]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    cpu1 = _cpu_s(proc.pid)
+    cpu = (cpu1 - cpu0) if (cpu0 is not None and cpu1 is not None) else None
+    lat = np.array([ms for o in outs for ms, _ in o], dtype=np.float64)
+    n = int(lat.size)
+    return {
+        "clients": clients,
+        "interval_ms": round(interval_s * 1000.0, 1),
+        "requests": n,
+        "errors": sum(1 for o in outs for _, ok in o if not ok),
+        "req_per_s": round(n / elapsed, 1),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3) if n else 0.0,
+        "p95_ms": round(float(np.percentile(lat, 95)), 3) if n else 0.0,
+        "p99_ms": round(float(np.percentile(lat, 99)), 3) if n else 0.0,
+        "server_cpu_ms_per_req": round(cpu * 1000.0 / n, 3) if (cpu is not None and n) else None,
+    }
+
+
+def _run_mode(mode: str, args):
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve", mode],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    try:
+        port = None
+        for line in proc.stdout:
+            if line.startswith("PORT "):
+                port = int(line.split()[1])
+                break
+        if port is None:
+            return {"mode": mode, "error": "server did not start"}
+        time.sleep(0.5)  # let the poller publish the first result
+        return {
+            "mode": mode,
+            "polling": _phase(port, proc, args.clients, args.poll_ms / 1000.0, args.seconds),
+            "saturated": _phase(port, proc, args.burst_clients, 0.0, args.seconds),
+        }
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OCR API server modes under bridge-like load")
+    ap.add_argument("--modes", default=",".join(MODES))
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--clients", type=int, default=2, help="clients at the polling rate (bridge + viewer)")
+    ap.add_argument("--poll-ms", type=float, default=80.0, help="BridgeConfig.poll_interval_ms")
+    ap.add_argument("--burst-clients", type=int, default=4, help="clients for the saturated phase")
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--serve", default="", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.serve:
+        return _serve(args)
+
+    results = [_run_mode(m.strip(), args) for m in args.modes.split(",") if m.strip()]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        if "error" in r:
+            print(f"{r['mode']:<10} {r['error']}")
+            continue
+        for phase in ("polling", "saturated"):
+            p = r[phase]
+            cpu = p["server_cpu_ms_per_req"]
+            print(f"{r['mode']:<10} {phase:<9} clients={p['clients']} req/s={p['req_per_s']:>8.1f}  "
+                  f"p50={p['p50_ms']:>6.2f} ms  p95={p['p95_ms']:>6.2f} ms  p99={p['p99_ms']:>6.2f} ms  "
+                  f"server cpu/req={'n/a' if cpu is None else f'{cpu:.3f} ms'}  errors={p['errors']}")
+
+
+if __name__ == "__main__":
+    main()
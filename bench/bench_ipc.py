@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "ocr"))
+sys.path.insert(0, str(ROOT / "bridge"))
+sys.path.insert(0, str(BENCH))
+
+# Round trip of the bridge's two calls per cycle, HTTP vs the IPC transport
+# (BridgeConfig.transport): POST /ocr_shm answered from the poller's result and POST /translate
+# answered from the translator's cache, so what is left is transport cost. Both services run in
+# child processes with stand-in engines and listen on HTTP and IPC at the same time.
+
+
+def _address(name: str) -> str:
+    if os.name == "nt":
+        return rf"\\.\pipe\setja-bench-{name}-{os.getpid()}"
+    return os.path.join(tempfile.gettempdir(), f"setja-bench-{name}-{os.getpid()}.sock")
+
+
+def _serve_ocr(args):
+    import standins
+    standins.install_paddle_standin(5.0, 1.0)
+
+    import core.api.ocr_api as ocr_api
+    import core.services.ocr_poller as ocr_poller
+    from bench_pipeline import make_subtitles
+    import core.api.ocr_ipc as ocr_ipc
+    from core.runtime.ocr_shm_writer import ShmFrameWriter
+    from core.runtime.ocr_startup import STARTUP
+
+    sub = make_subtitles(1, 1280, 200, 3)[0]
+    standins.learn_frame(sub["img"], sub["bands"])
+    writer = ShmFrameWriter(slot_count=3, slot_bytes=1280 * 200 * 4)
+    writer.write_frame(sub["img"])
+    httpd = ocr_api.create_server("127.0.0.1", 0, mode=args.server)
+    ipc = ocr_ipc.serve(args.serve_ocr)
+    STARTUP.set_state("ready")
+    ocr_poller.start()
+    print(f"PORT {httpd.server_address[1]}", flush=True)
+    try:
+        httpd.serve_forever()
+    finally:
+        ipc.close()
+        writer.close(unlink=True)
+
+
+def _start_ocr(address: str, args):
+    proc = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--serve-ocr", address,
+                             "--server", args.server],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in proc.stdout:
+        if line.startswith("PORT "):
+            return proc, int(line.split()[1])
+    proc.kill()
+    raise RuntimeError("OCR server did not start")
+
+
+def _stats(lat_ms, elapsed: float):
+    import numpy as np
+
+    lat = np.array(lat_ms, dtype=np.float64)
+    return {
+        "requests": int(lat.size),
+        "req_per_s": round(lat.size / elapsed, 1),
+        "mean_ms": round(float(lat.mean()), 3),
+        "p50_ms": round(float(np.percentile(lat, 50)), 3),
+        "p95_ms": round(float(np.percentile(lat, 95)), 3),
+        "p99_ms": round(float(np.percentile(lat, 99)), 3),
+    }
+
+
+def _measure(call, n: int):
+    for _ in range(min(50, n)):
+        call()
+    lat = []
+    t0 = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter()
+        call()
+        lat.append((time.perf_counter() - t) * 1000.0)
+    return _stats(lat, time.perf_counter() - t0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="bridge round trips: HTTP vs IPC transport")
+    ap.add_argument("--requests", type=int, default=2000, help="round trips per call and transport")
+    ap.add_argument("--server", default="asyncio", choices=("asyncio", "threading"), help="OCR HTTP server mode")
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--serve-ocr", default="", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.serve_ocr:
+        return _serve_ocr(args)
+
+    import bridge_ocr_t as BR
+    from bench_pipeline import _free_port, start_translator
+
+    ocr_addr, mt_addr = _address("ocr"), _address("mt")
+    ocr_proc, ocr_port = _start_ocr(ocr_addr, args)
+    mt_port = _free_port()
+    mt_args = argparse.Namespace(mt_batch_ms=8.0, mt_token_ms=0.6, mt_device=None, mt_ipc=mt_addr,
+                                 startup_timeout=60.0)
+    mt_proc = start_translator(mt_port, "standin", mt_args)
+    time.sleep(0.5)  # let the poller publish the first result
+
+    results = []
+    try:
+        for transport in ("http", "ipc"):
+            cfg = BR.BridgeConfig(
+                ocr_url=f"http://127.0.0.1:{ocr_port}/ocr_shm",
+                mt_url=f"http://127.0.0.1:{mt_port}/translate",
+                gpu=0,
+                transport=transport,
+                ocr_ipc=ocr_addr,
+                mt_ipc=mt_addr,
+            )
+            session = BR.open_session(cfg)
+            results.append({
+                "transport": transport,
+                "ocr_shm": _measure(lambda: BR._fetch_ocr_text(session, cfg), args.requests),
+                "translate": _measure(lambda: BR._send_to_translator(session, cfg, "Hello there."), args.requests),
+            })
+            session.close()
+    finally:
+        for p in (ocr_proc, mt_proc):
+            p.terminate()
+            p.wait(timeout=10)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"ocr server={args.server} requests={args.requests}")
+    for r in results:
+        for call in ("ocr_shm", "translate"):
+            s = r[call]
+            print(f"{r['transport']:<5} {call:<10} req/s={s['req_per_s']:>8.1f}  mean={s['mean_ms']:>6.3f} ms  "
+                  f"p50={s['p50_ms']:>6.3f} ms  p95={s['p95_ms']:>6.3f} ms  p99={s['p99_ms']:>6.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(ROOT / "translator"))
+
+# Tokenizer share of RealTimeMT.translate_lines, with the token / detoken caches
+# (t_config.TOKEN_CACHE_MAX / DETOK_CACHE_MAX) off and on. Requests are subtitle-like groups of
+# lines drawn from a fixed pool with a skewed repeat distribution: lines come back constantly,
+# but in new combinations, so the translation cache (keyed on the whole group) mostly misses and
+# every line goes through tokenization, the translator and detokenization.
+# The translator is the CTranslate2 stand-in; the tokenizer is the real MarianTokenizer when
+# transformers and translator/core/hf_tokenizer are there.
+
+
+def _tokenizer_available() -> bool:
+    try:
+        import transformers  # noqa: F401
+        import sentencepiece  # noqa: F401
+    except ImportError:
+        return False
+    return (ROOT / "translator" / "core" / "hf_tokenizer" / "source.spm").exists()
+
+
+def make_requests(n: int, pool: int, seed: int = 7):
+    rnd = random.Random(seed)
+    words = ("the of and to in is you that it he was for on are as with his they at be this have "
+             "from or one had by word but not what all were we when your can said there use an each").split()
+    lines = [" ".join(rnd.choice(words) for _ in range(rnd.randint(3, 10))).capitalize() + rnd.choice(".?!")
+             for _ in range(pool)]
+    weights = [1.0 / (i + 1) for i in range(pool)]  # a few lines repeat far more than the rest
+    return [rnd.choices(lines, weights, k=rnd.choice((1, 2, 2, 3))) for _ in range(n)]
+
+
+class _Timed:
+    # wraps a bound method and adds up the time spent in it
+    def __init__(self, fn):
+        self.fn = fn
+        self.s = 0.0
+        self.calls = 0
+
+    def __call__(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return self.fn(*args, **kwargs)
+        finally:
+            self.s += time.perf_counter() - t0
+            self.calls += 1
+
+
+def run(mt, requests, caches: bool):
+    from core.config.t_config import TOKEN_CACHE_MAX, DETOK_CACHE_MAX
+    from core.utils.t_runtime import LRUCache, StabilityGate
+
+    mt.tok_cache = LRUCache(TOKEN_CACHE_MAX) if caches else None
+    mt.detok_cache = LRUCache(DETOK_CACHE_MAX) if caches else None
+    # fresh translation cache, no stability gate: every request reaches the tokenizer path
+    mt.cache = LRUCache(len(requests) * 2 + 16)
+    mt.speaker_cache = LRUCache(1024)
+    mt.gate = StabilityGate(0)
+
+    enc = _Timed(type(mt)._encode_to_tokens.__get__(mt))
+    dec = _Timed(type(mt)._decode_from_tokens.__get__(mt))
+    mt._encode_to_tokens, mt._decode_from_tokens = enc, dec
+    try:
+        lat = []
+        for i, lines in enumerate(requests):
+            t0 = time.perf_counter()
+            mt.translate_lines(lines, stream_id=f"bench_{i}")
+            lat.append(time.perf_counter() - t0)
+    finally:
+        del mt._encode_to_tokens, mt._decode_from_tokens
+
+    total = sum(lat)
+    n = len(lat)
+    return {
+        "caches": caches,
+        "requests": n,
+        "request_ms": round(total * 1000.0 / n, 3),
+        "tokenize_ms": round(enc.s * 1000.0 / n, 3),
+        "detokenize_ms": round(dec.s * 1000.0 / n, 3),
+        "tokenizer_share": round((enc.s + dec.s) / total, 4) if total else 0.0,
+        "token_cache": mt.tok_cache.stats() if mt.tok_cache is not None else None,
+        "detoken_cache": mt.detok_cache.stats() if mt.detok_cache is not None else None,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="tokenizer share of translate_lines, token caches off vs on")
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--pool", type=int, default=400, help="distinct subtitle lines")
+    ap.add_argument("--tokenizer", default="auto", choices=("auto", "real", "standin"))
+    ap.add_argument("--mt-batch-ms", type=float, default=2.0, help="stand-in translator cost per batch")
+    ap.add_argument("--mt-token-ms", type=float, default=0.05, help="stand-in translator cost per token")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    real = args.tokenizer == "real" or (args.tokenizer == "auto" and _tokenizer_available())
+    from standins import install_mt_standins
+    install_mt_standins(args.mt_batch_ms, args.mt_token_ms, tokenizer=not real)
+
+    import core.config.t_config as TCFG
+    TCFG.DEVICE = "cpu"
+    from core.utils.t_engine import RealTimeMT
+
+    mt = RealTimeMT()
+    reqs = make_requests(args.requests, args.pool)
+    results = [run(mt, reqs, caches=False), run(mt, reqs, caches=True)]
+
+    if args.json:
+        print(json.dumps({"tokenizer": "real" if real else "standin", "results": results}, indent=2))
+        return
+    print(f"tokenizer={'MarianTokenizer' if real else 'stand-in'} requests={args.requests} pool={args.pool} "
+          f"translator=stand-in ({args.mt_batch_ms} ms/batch + {args.mt_token_ms} ms/token)")
+    for r in results:
+        hit = r["token_cache"]["hit_rate"] if r["token_cache"] else None
+        print(f"caches={'on ' if r['caches'] else 'off'}  request={r['request_ms']:>7.3f} ms  "
+              f"tokenize={r['tokenize_ms']:>6.3f} ms  detokenize={r['detokenize_ms']:>6.3f} ms  "
+              f"tokenizer share={r['tokenizer_share'] * 100:>5.1f}%"
+              + (f"  token hit rate={hit * 100:.1f}%" if hit is not None else ""))
+
+
+if __name__ == "__main__":
+    main()
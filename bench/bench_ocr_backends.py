@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ocr"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+# PaddleOCR vs ONNX Runtime (CPU) behind the same pool: load time, per-frame latency, resident
+# memory and exact-text accuracy. Each backend runs in its own process so RSS is not shared.
+BACKENDS = ("paddle", "onnx")
+
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / (1024.0 * 1024.0)
+    except ImportError:
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _pct(xs, p: float) -> float:
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(p * (len(xs) - 1))))] if xs else 0.0
+
+
+def _child(args):
+    from bench_pipeline import make_subtitles
+
+    import core.runtime.ocr_config as CFG
+    import core.runtime.ocr_engine as E
+
+    if args.onnx_dir:
+        CFG.ONNX_MODEL_DIR = args.onnx_dir
+    if args.threads:
+        CFG.ONNX_THREADS = args.threads
+
+    subs = make_subtitles(args.frames, args.width, args.height, 7)
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    pool = E.PaddleOcrPool(rec_cache=E.RecCache(0), size=1, backend=args.child)
+    group = pool.get("en", bool(args.gpu), False)
+    load_ms = (time.perf_counter() - t0) * 1000.0
+    pool.run_ocr(group, subs[0]["img"], False)  # warm-up
+    rss_loaded = _rss_mb()
+
+    times, ok = [], 0
+    for _ in range(args.repeat):
+        for s in subs:
+            t = time.perf_counter()
+            text = E.extract_from_paddle_result(pool.run_ocr(group, s["img"], False))[0]
+            times.append((time.perf_counter() - t) * 1000.0)
+            ok += int(text == s["text"])
+    pool.close()
+    return {
+        "backend": args.child,
+        "load_ms": round(load_ms, 1),
+        "p50_ms": round(_pct(times, 0.5), 2),
+        "p95_ms": round(_pct(times, 0.95), 2),
+        "mean_ms": round(sum(times) / len(times), 2),
+        "rss_mb": round(_rss_mb(), 1),
+        "rss_engine_mb": round(rss_loaded - rss0, 1),
+        "accuracy": round(ok / len(times), 4),
+    }
+
+
+def _spawn(backend: str, args):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", backend,
+           "--frames", str(args.frames), "--repeat", str(args.repeat),
+           "--width", str(args.width), "--height", str(args.height),
+           "--gpu", str(args.gpu), "--threads", str(args.threads)]
+    if args.onnx_dir:
+        cmd += ["--onnx-dir", args.onnx_dir]
+    p = subprocess.run(cmd, capture_output=True, text=True)
+    lines = [ln for ln in p.stdout.splitlines() if ln.startswith("{")]
+    if p.returncode != 0 or not lines:
+        err = (p.stderr.strip().splitlines() or ["exit code %d" % p.returncode])[-1]
+        return {"backend": backend, "error": err}
+    return json.loads(lines[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OCR backend comparison: PaddleOCR vs ONNX Runtime")
+    ap.add_argument("--backends", default=",".join(BACKENDS))
+    ap.add_argument("--frames", type=int, default=12)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=200)
+    ap.add_argument("--gpu", type=int, default=0, help="paddle only; the ONNX backend is CPU only")
+    ap.add_argument("--threads", type=int, default=0, help="ONNX Runtime intra-op threads (0 = default)")
+    ap.add_argument("--onnx-dir", default="", help="override ocr_config.ONNX_MODEL_DIR")
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--child", default="", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        # the engines may log to stdout; the parent only reads the last JSON line
+        print(json.dumps(_child(args)), flush=True)
+        return
+
+    results = [_spawn(b.strip(), args) for b in args.backends.split(",") if b.strip()]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        if "error" in r:
+            print(f"{r['backend']:<7} unavailable: {r['error']}")
+            continue
+        print(f"{r['backend']:<7} load={r['load_ms']:>8.1f} ms  p50={r['p50_ms']:>7.2f} ms  p95={r['p95_ms']:>7.2f} ms  "
+              f"rss={r['rss_mb']:>7.1f} MB (engine {r['rss_engine_mb']:+.1f})  accuracy={r['accuracy']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
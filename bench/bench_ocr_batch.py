@@ -0,0 +1,109 @@
+import argparse
+import importlib.util
+import json
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ocr"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import numpy as np
+
+from bench_pipeline import make_subtitles
+
+# Concurrent run_ocr callers against one worker group, with and without cross-request
+# recognition micro-batching (REC_BATCH).
+
+
+def _run_case(E, frames, batch: bool, args):
+    pool = E.PaddleOcrPool(rec_cache=E.RecCache(0), size=args.workers, queue_depth=max(16, args.clients * 2),
+                           batch=batch, batch_window_ms=args.window_ms, batch_max=args.batch_max)
+    group = pool.get("en", bool(args.gpu), False)
+    pool.run_ocr(group, frames[0], False)  # warm-up
+
+    lat = []
+    lock = threading.Lock()
+    t_end = time.perf_counter() + args.seconds
+
+    def client(i):
+        k = i
+        while time.perf_counter() < t_end:
+            t0 = time.perf_counter()
+            pool.run_ocr(group, frames[k % len(frames)], False, priority=E.PRIO_SHM)
+            dt = (time.perf_counter() - t0) * 1000.0
+            with lock:
+                lat.append(dt)
+            k += 1
+
+    t0 = time.perf_counter()
+    ts = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(args.clients)]
+    for t in ts:
+        t.start()
+    for t in ts:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stats = group.batcher.stats()
+    pool.close()
+
+    a = np.asarray(lat, dtype=np.float64)
+    return {
+        "batch": batch,
+        "window_ms": args.window_ms,
+        "requests": int(a.size),
+        "requests_per_s": round(a.size / elapsed, 2),
+        "p50_ms": round(float(np.percentile(a, 50)), 2),
+        "p99_ms": round(float(np.percentile(a, 99)), 2),
+        "avg_batch": stats["avg_batch"],
+        "merged_requests": stats["merged_requests"],
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OCR throughput with cross-request recognition batching")
+    ap.add_argument("--ocr-engine", default="auto", choices=("auto", "real", "standin"))
+    ap.add_argument("--clients", type=int, default=4)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--window-ms", type=float, default=4.0)
+    ap.add_argument("--batch-max", type=int, default=32)
+    ap.add_argument("--seconds", type=float, default=5.0)
+    ap.add_argument("--gpu", type=int, default=0)
+    ap.add_argument("--det-ms", type=float, default=20.0, help="stand-in detection cost per frame")
+    ap.add_argument("--rec-ms", type=float, default=1.5, help="stand-in recognition cost per line")
+    ap.add_argument("--rec-call-ms", type=float, default=10.0, help="stand-in recognition cost per call")
+    ap.add_argument("--device-slots", type=int, default=1,
+                    help="stand-in compute units shared by all engines (1 = one saturated CPU/GPU, 0 = unlimited)")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    engine = args.ocr_engine
+    if engine == "auto":
+        engine = "real" if importlib.util.find_spec("paddleocr") is not None else "standin"
+    if engine == "standin":
+        import standins
+        standins.install_paddle_standin(args.det_ms, args.rec_ms, args.rec_call_ms, args.device_slots)
+
+    import core.runtime.ocr_engine as E
+
+    subs = make_subtitles(8, 1280, 200, 7)
+    if engine == "standin":
+        for s in subs:
+            standins.learn_frame(s["img"], s["bands"])
+    frames = [s["img"] for s in subs]
+
+    results = [_run_case(E, frames, b, args) for b in (False, True)]
+    for r in results:
+        r.update(engine=engine, clients=args.clients, workers=args.workers)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(f"batch={'on ' if r['batch'] else 'off'}  {r['requests_per_s']:>8.2f} req/s  p50={r['p50_ms']:>7.2f} ms  "
+              f"p99={r['p99_ms']:>7.2f} ms  avg_batch={r['avg_batch']:>5.2f}  merged={r['merged_requests']}")
+
+
+if __name__ == "__main__":
+    main()
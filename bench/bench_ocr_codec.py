@@ -0,0 +1,78 @@
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ocr"))
+
+import core.api.ocr_codec as CODEC
+
+# Encode cost and body size of an /ocr_shm response per ocr_codec.ResponseFormat.
+MODES = (
+    # name, query
+    ("json (default)", {}),
+    ("json boxes=i32", {"boxes": ["i32"]}),
+    ("msgpack", {"fmt": ["msgpack"]}),
+    ("json fields=text,seq", {"fields": ["text,seq"]}),
+    ("msgpack fields=text,seq", {"fmt": ["msgpack"], "fields": ["text,seq"]}),
+)
+
+
+def make_response(lines: int, seed: int = 5):
+    rnd = random.Random(seed)
+    words = "the of and to in is you that it he was for on are as with his they at be this".split()
+    texts = [" ".join(rnd.choice(words) for _ in range(rnd.randint(3, 9))).capitalize() + "." for _ in range(lines)]
+    boxs = []
+    for i in range(lines):
+        x0, y0 = rnd.randint(0, 400), 20 + i * 48
+        x1, y1 = x0 + rnd.randint(300, 800), y0 + 36
+        boxs.append([[x0, y0], [x1, y0], [x1, y1], [x0, y1]])
+    scores = [rnd.uniform(0.8, 1.0) for _ in range(lines)]
+    return {
+        "ok": True,
+        "text": "\n".join(texts),
+        "texts": texts,
+        "boxs": boxs,
+        "scores": scores,
+        "avg_conf": sum(scores) / len(scores),
+        "lang": "en",
+        "gpu": True,
+        "source": "shm",
+        "frame": {"w": 1280, "h": 200, "left": 320, "top": 860, "seq": 12345, "slot": 1, "ts_us": 1712345678901},
+        "seq": 12345,
+        "coalesced": "latest",
+        "age_ms": 3.2,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OCR response encoding cost and size")
+    ap.add_argument("--lines", type=int, default=4)
+    ap.add_argument("--iters", type=int, default=20000)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    obj = make_response(args.lines)
+    results = []
+    for name, qs in MODES:
+        fmt = CODEC.ResponseFormat.from_request(qs)
+        _, body = fmt.encode(obj)
+        t0 = time.perf_counter()
+        for _ in range(args.iters):
+            fmt.encode(obj)
+        us = (time.perf_counter() - t0) * 1e6 / args.iters
+        results.append({"mode": name, "bytes": len(body), "encode_us": round(us, 2)})
+
+    if args.json:
+        print(json.dumps({"lines": args.lines, "results": results}, indent=2))
+        return
+    print(f"lines={args.lines}")
+    for r in results:
+        print(f"{r['mode']:<26} {r['bytes']:>6} B  {r['encode_us']:>8.2f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,453 @@
+import argparse
+import bisect
+import contextlib
+import importlib.util
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+BENCH = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "ocr"))
+sys.path.insert(0, str(ROOT / "bridge"))
+sys.path.insert(0, str(BENCH))
+
+os.environ.setdefault("SETJA_SHM_BACKEND", "posix")
+os.environ.setdefault("SETJA_SHM_PATH", os.path.join(tempfile.gettempdir(), f"setja_bench_pipe_{os.getpid()}"))
+
+import numpy as np
+import cv2
+
+# capture -> OCR API -> bridge gate -> translator -> overlay, driven by synthetic subtitle frames.
+# Stages (ms):
+#   ocr_http     bridge POST /ocr_shm round trip
+#   gate         bridge appearance gate
+#   mt_http      bridge POST /translate round trip (mt_engine: the "ms" the translator reports)
+#   overlay      writing the translated text the way txt_viewer does (tmp + os.replace)
+#   capture_ocr  subtitle published on SHM -> first OCR response that contains that frame
+#   e2e          subtitle published on SHM -> its translation written by the overlay
+
+_WORDS = (
+    "the we you they this that night door light road river city house friend time way home "
+    "never always again still here there now later maybe really only just very little "
+    "open close find keep leave take bring follow wait run look hear tell know remember "
+    "quiet dark cold early late strange broken hidden last first second other same"
+).split()
+
+
+def _sentence(rng: random.Random, n_words: int) -> str:
+    words = [rng.choice(_WORDS) for _ in range(n_words)]
+    words[0] = words[0].capitalize()
+    return " ".join(words) + rng.choice((".", "!", "?", "..."))
+
+
+def _render(lines, width: int, height: int, scale: float = 1.0, bottom: int = 0):
+    # centred lines; bottom > 0 puts the block that many px above the bottom edge instead
+    img = np.zeros((height, width, 3), dtype=np.uint8)
+    font, thick = cv2.FONT_HERSHEY_SIMPLEX, max(2, int(round(2 * scale)))
+    line_h = int(round(50 * scale))
+    if bottom > 0:
+        y = height - bottom - line_h * len(lines) + int(round(35 * scale))
+    else:
+        y = (height - line_h * len(lines)) // 2 + int(round(35 * scale))
+    bands = []
+    for text in lines:
+        (tw, th), _ = cv2.getTextSize(text, font, scale, thick)
+        x = max(4, (width - tw) // 2)
+        cv2.putText(img, text, (x, y), font, scale, (255, 255, 255), thick, cv2.LINE_AA)
+        bands.append((y - th - int(8 * scale), y + int(12 * scale), text))
+        y += line_h
+    return img, bands
+
+
+def make_subtitles(count: int, width: int, height: int, seed: int, scale: float = 1.0, bottom: int = 0):
+    rng = random.Random(seed)
+    subs = []
+    for _ in range(count):
+        n_lines = 2 if rng.random() < 0.35 else 1
+        lines = [_sentence(rng, rng.randint(3, 7)) for _ in range(n_lines)]
+        img, bands = _render(lines, width, height, scale, bottom)
+        subs.append({"lines": lines, "text": "\n".join(lines), "img": img, "bands": bands})
+    return subs
+
+
+class Publisher(threading.Thread):
+    # Publishes the subtitle frames at `fps`, holding each one for hold_ms (repeated frames are
+    # identical, like a paused subtitle), and records when each subtitle first hit the SHM.
+    def __init__(self, writer, subs, fps: float, hold_ms: float):
+        super().__init__(daemon=True)
+        self.writer = writer
+        self.subs = subs
+        self.period = 1.0 / max(1e-3, fps)
+        self.hold = hold_ms / 1000.0
+        self.stop_evt = threading.Event()
+        self.published = 0
+        self.change_seqs = []   # first frame seq of subtitle i
+        self.change_t = []      # perf_counter when subtitle i was published
+
+    def run(self):
+        t0 = time.perf_counter()
+        cur = -1
+        n = 0
+        while not self.stop_evt.is_set():
+            target = t0 + n * self.period
+            delay = target - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            idx = int((time.perf_counter() - t0) / self.hold)
+            if idx >= len(self.subs):
+                break
+            seq = self.writer.write_frame(self.subs[idx]["img"])
+            if idx != cur:
+                self.change_seqs.append(seq)
+                self.change_t.append(time.perf_counter())
+                cur = idx
+            self.published += 1
+            n += 1
+
+    def sub_of_seq(self, seq: int) -> int:
+        return bisect.bisect_right(self.change_seqs, seq) - 1
+
+
+def _stats(values):
+    if not values:
+        return {"n": 0}
+    a = np.asarray(values, dtype=np.float64)
+    return {
+        "n": int(a.size),
+        "mean": round(float(a.mean()), 3),
+        "p50": round(float(np.percentile(a, 50)), 3),
+        "p95": round(float(np.percentile(a, 95)), 3),
+        "p99": round(float(np.percentile(a, 99)), 3),
+        "max": round(float(a.max()), 3),
+    }
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _ipc_address(name: str) -> str:
+    # per-run address, so a running SETJA instance is not disturbed
+    if os.name == "nt":
+        return rf"\\.\pipe\setja-bench-{name}-{os.getpid()}"
+    return os.path.join(tempfile.gettempdir(), f"setja-bench-{name}-{os.getpid()}.sock")
+
+
+def _pick(choice: str, available: bool) -> str:
+    if choice == "auto":
+        return "real" if available else "standin"
+    return choice
+
+
+def _paddle_available() -> bool:
+    return importlib.util.find_spec("paddleocr") is not None
+
+
+def _mt_available() -> bool:
+    model = ROOT / "translator" / "core" / "translator_model" / "model.bin"
+    return (importlib.util.find_spec("ctranslate2") is not None
+            and importlib.util.find_spec("transformers") is not None
+            and model.exists())
+
+
+def start_translator(port: int, mt: str, args):
+    import requests
+
+    cmd = [sys.executable, str(BENCH / "serve_translator.py"), "--port", str(port)]
+    if mt == "standin":
+        cmd += ["--standin", "--mt-batch-ms", str(args.mt_batch_ms), "--mt-token-ms", str(args.mt_token_ms)]
+    if args.mt_device:
+        cmd += ["--device", args.mt_device]
+    if getattr(args, "mt_ipc", ""):
+        cmd += ["--ipc", args.mt_ipc]
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    t_end = time.monotonic() + args.startup_timeout
+    while time.monotonic() < t_end:
+        if proc.poll() is not None:
+            err = proc.stderr.read().decode("utf-8", "replace").strip().splitlines()
+            raise RuntimeError("translator failed to start: " + (err[-1] if err else f"exit {proc.returncode}"))
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/health", timeout=1.0).ok:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("translator did not come up in time")
+
+
+def run(args):
+    ocr_engine = _pick(args.ocr_engine, _paddle_available())
+    mt_engine = _pick(args.mt, _mt_available())
+
+    if ocr_engine == "standin":
+        import standins
+        standins.install_paddle_standin(args.det_ms, args.rec_ms, args.rec_call_ms)
+
+    import requests
+    import bridge_ocr_t as BR
+    import core.runtime.ocr_config as CFG
+    import core.runtime.ocr_engine as OCR
+    import core.runtime.ocr_shm as SHM
+    import core.services.ocr_poller as ocr_poller
+    import core.api.ocr_api as ocr_api
+    from core.runtime.ocr_shm_writer import ShmFrameWriter
+    from core.runtime.ocr_startup import STARTUP
+
+    CFG.AUTO_GPU = bool(args.gpu)
+
+    n_subs = max(1, int(args.seconds * 1000.0 / args.hold_ms))
+    subs = make_subtitles(n_subs, args.width, args.height, args.seed)
+    if ocr_engine == "standin":
+        for s in subs:
+            standins.learn_frame(s["img"], s["bands"])
+
+    ocr_ipc = ""
+    args.mt_ipc = ""
+    if args.transport == "ipc":
+        ocr_ipc = _ipc_address("ocr")
+        args.mt_ipc = _ipc_address("mt")
+    mt_port = _free_port()
+    mt_proc = start_translator(mt_port, mt_engine, args)
+
+    writer = ShmFrameWriter(version=args.shm_version, slot_count=3, slot_bytes=args.width * args.height * 4)
+    writer.write_frame(np.zeros((args.height, args.width, 3), dtype=np.uint8))
+
+    httpd = ocr_api.create_server("127.0.0.1", 0)
+    ocr_port = httpd.server_address[1]
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    if ocr_ipc:
+        import core.api.ocr_ipc as ocr_ipc_api
+
+        ocr_ipc_api.serve(ocr_ipc)
+    # same start-up as ocr_main, minus the background thread
+    group = OCR.POOL.get(lang=CFG.AUTO_LANG, use_gpu=CFG.AUTO_GPU, use_angle_cls=CFG.AUTO_ANGLE)
+    if CFG.WARMUP:
+        OCR.POOL.warm_up(group, OCR.warmup_image(args.width, args.height), cls=CFG.AUTO_CLS, runs=CFG.WARMUP_RUNS)
+    STARTUP.set_state("ready")
+    if args.poller:
+        ocr_poller.start()
+
+    cfg = BR.BridgeConfig(
+        ocr_url=f"http://127.0.0.1:{ocr_port}/ocr_shm",
+        mt_url=f"http://127.0.0.1:{mt_port}/translate",
+        gpu=int(bool(args.gpu)),
+        poll_interval_ms=args.poll_ms,
+        transport=args.transport,
+        ocr_ipc=ocr_ipc,
+        mt_ipc=args.mt_ipc,
+    )
+    session = BR.open_session(cfg)
+    overlay_path = os.path.join(tempfile.gettempdir(), f"setja_bench_overlay_{os.getpid()}.txt")
+
+    # warm-up: engine creation + first inference stay out of the numbers
+    BR._fetch_ocr_text(session, cfg)
+    BR._send_to_translator(session, cfg, "Hello there.")
+
+    st = {k: [] for k in ("ocr_http", "gate", "mt_http", "mt_engine", "overlay", "capture_ocr", "e2e", "cycle")}
+    state = {"prev_ocr_text": None, "appearance_count": 0, "cooldown_until": 0.0, "last_sent_text": None}
+    seen_seqs = set()
+    ocr_seen = {}
+    translated = {}
+    ocr_exact = ocr_total = 0
+    gate_skips = empty = errors = mt_calls = 0
+
+    pub = Publisher(writer, subs, args.fps, args.hold_ms)
+    pub.start()
+    t_start = time.perf_counter()
+    try:
+        while pub.is_alive() or time.perf_counter() - t_start < args.seconds:
+            if not pub.is_alive() and len(translated) >= len(pub.change_t):
+                break
+            c0 = time.perf_counter()
+            try:
+                j = BR._fetch_ocr_text(session, cfg)
+            except (requests.RequestException, OSError, EOFError, ValueError):
+                errors += 1
+                continue
+            c1 = time.perf_counter()
+            st["ocr_http"].append((c1 - c0) * 1000.0)
+            if not j.get("ok"):
+                errors += 1
+                continue
+
+            seq = int(j.get("seq", -1))
+            seen_seqs.add(seq)
+            idx = pub.sub_of_seq(seq)
+            cur_text = (j.get("text") or "").strip()
+            if idx >= 0:
+                ocr_total += 1
+                ocr_exact += int(cur_text == subs[idx]["text"])
+                if idx not in ocr_seen:
+                    ocr_seen[idx] = c1
+                    st["capture_ocr"].append((c1 - pub.change_t[idx]) * 1000.0)
+
+            if cfg.skip_empty and not cur_text:
+                empty += 1
+            else:
+                g0 = time.perf_counter()
+                send = BR._appearance_gate(cur_text, state, cfg.similarity_threshold, cfg.cooldown_sec)
+                st["gate"].append((time.perf_counter() - g0) * 1000.0)
+                if not send:
+                    gate_skips += 1
+                else:
+                    m0 = time.perf_counter()
+                    try:
+                        mt_j = BR._send_to_translator(session, cfg, cur_text)
+                    except (requests.RequestException, OSError, EOFError, ValueError):
+                        errors += 1
+                        mt_j = {}
+                    m1 = time.perf_counter()
+                    mt_calls += 1
+                    st["mt_http"].append((m1 - m0) * 1000.0)
+                    if mt_j.get("ok"):
+                        st["mt_engine"].append(float(mt_j.get("ms") or 0.0))
+                    lines = mt_j.get("lines")
+                    if lines:
+                        o0 = time.perf_counter()
+                        tmp = overlay_path + ".tmp"
+                        with open(tmp, "w", encoding="utf-8") as f:
+                            f.write("\n".join(ln.strip() for ln in lines if (ln or "").strip()))
+                        os.replace(tmp, overlay_path)
+                        o1 = time.perf_counter()
+                        st["overlay"].append((o1 - o0) * 1000.0)
+                        if idx >= 0 and idx not in translated:
+                            translated[idx] = o1
+                            st["e2e"].append((o1 - pub.change_t[idx]) * 1000.0)
+
+            st["cycle"].append((time.perf_counter() - c0) * 1000.0)
+            rest = cfg.poll_interval_ms / 1000.0 - (time.perf_counter() - c0)
+            if rest > 0:
+                time.sleep(rest)
+    finally:
+        pub.stop_evt.set()
+        pub.join()
+        elapsed = time.perf_counter() - t_start
+        latest = ocr_poller.get_latest() if args.poller else {}
+        health = {}
+        with contextlib.suppress(Exception):
+            health = requests.get(f"http://127.0.0.1:{ocr_port}/health", timeout=2.0).json()
+        httpd.shutdown()
+        mt_proc.terminate()
+        with contextlib.suppress(Exception):
+            mt_proc.wait(timeout=5)
+        writer.close()
+        SHM.shm_close()
+        with contextlib.suppress(OSError):
+            os.remove(overlay_path)
+
+    shown = len(pub.change_t)
+    return {
+        "config": {
+            "ocr_engine": ocr_engine,
+            "mt_engine": mt_engine,
+            "frame": f"{args.width}x{args.height}",
+            "fps": args.fps,
+            "hold_ms": args.hold_ms,
+            "poll_ms": args.poll_ms,
+            "seconds": args.seconds,
+            "shm_version": args.shm_version,
+            "poller": bool(args.poller),
+            "gpu": bool(args.gpu),
+            "det_ms": args.det_ms if ocr_engine == "standin" else None,
+            "rec_ms": args.rec_ms if ocr_engine == "standin" else None,
+            "rec_call_ms": args.rec_call_ms if ocr_engine == "standin" else None,
+            "seed": args.seed,
+        },
+        "stages_ms": {k: _stats(v) for k, v in st.items()},
+        "throughput": {
+            "elapsed_s": round(elapsed, 3),
+            "frames_published_per_s": round(pub.published / elapsed, 2),
+            "ocr_requests_per_s": round(len(st["ocr_http"]) / elapsed, 2),
+            "translations_per_s": round(mt_calls / elapsed, 2),
+        },
+        "frames": {
+            "published": pub.published,
+            "ocr_by_bridge": len(seen_seqs),
+            "not_seen_by_bridge": max(0, pub.published - len(seen_seqs)),
+            "poller_frames_skipped": latest.get("frames_skipped"),
+        },
+        "subtitles": {
+            "shown": shown,
+            "ocr_seen": len(ocr_seen),
+            "translated": len(translated),
+            "missed": shown - len(translated),
+            "ocr_exact_rate": round(ocr_exact / ocr_total, 4) if ocr_total else None,
+        },
+        "bridge": {
+            "polls": len(st["ocr_http"]),
+            "empty": empty,
+            "gate_skips": gate_skips,
+            "mt_calls": mt_calls,
+            "errors": errors,
+        },
+        "rec_cache": health.get("rec_cache"),
+    }
+
+
+def _print_human(r):
+    c = r["config"]
+    print(f"ocr={c['ocr_engine']} mt={c['mt_engine']} frame={c['frame']} fps={c['fps']} "
+          f"hold={c['hold_ms']}ms poll={c['poll_ms']}ms poller={c['poller']}")
+    print(f"{'stage':<12} {'n':>6} {'mean':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for k, s in r["stages_ms"].items():
+        if not s["n"]:
+            print(f"{k:<12} {0:>6}")
+            continue
+        print(f"{k:<12} {s['n']:>6} {s['mean']:>9.2f} {s['p50']:>9.2f} {s['p95']:>9.2f} {s['p99']:>9.2f} {s['max']:>9.2f}")
+    for section in ("throughput", "frames", "subtitles", "bridge"):
+        print(section + ": " + ", ".join(f"{k}={v}" for k, v in r[section].items()))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="end-to-end latency: SHM frame -> OCR -> bridge -> MT -> overlay")
+    ap.add_argument("--ocr-engine", default="auto", choices=("auto", "real", "standin"))
+    ap.add_argument("--mt", default="auto", choices=("auto", "real", "standin"))
+    ap.add_argument("--seconds", type=float, default=20.0)
+    ap.add_argument("--fps", type=float, default=30.0)
+    ap.add_argument("--hold-ms", type=float, default=1500.0, help="how long each subtitle stays on screen")
+    ap.add_argument("--poll-ms", type=int, default=80, help="bridge poll interval (BridgeConfig.poll_interval_ms)")
+    ap.add_argument("--transport", default="http", choices=("http", "ipc"), help="BridgeConfig.transport")
+    ap.add_argument("--width", type=int, default=1280)
+    ap.add_argument("--height", type=int, default=200)
+    ap.add_argument("--shm-version", type=int, default=2, choices=(1, 2))
+    ap.add_argument("--no-poller", dest="poller", action="store_false", help="do not run the OCR poller alongside")
+    ap.add_argument("--gpu", type=int, default=0)
+    ap.add_argument("--mt-device", default=None, help="override the translator device for real MT (e.g. cpu)")
+    ap.add_argument("--det-ms", type=float, default=20.0, help="stand-in detection cost per frame")
+    ap.add_argument("--rec-ms", type=float, default=4.0, help="stand-in recognition cost per line")
+    ap.add_argument("--rec-call-ms", type=float, default=0.0, help="stand-in recognition cost per call")
+    ap.add_argument("--mt-batch-ms", type=float, default=8.0, help="stand-in MT cost per batch")
+    ap.add_argument("--mt-token-ms", type=float, default=0.6, help="stand-in MT cost per token")
+    ap.add_argument("--startup-timeout", type=float, default=120.0)
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--json", action="store_true", help="print machine-readable results")
+    ap.add_argument("--out", default=None, help="also write the JSON results to this file")
+    args = ap.parse_args()
+
+    # the poller prints every stable text; keep it out of the report
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results = run(args)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        _print_human(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import importlib.util
+import json
+import sys
+import time
+from pathlib import Path
+
+import cv2
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ocr"))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from bench_pipeline import make_subtitles
+
+# Detection + recognition per frame with and without ocr_preprocess.Preprocessor, on region
+# shapes we see in practice. Reports time, pixels handed to the detector and exact-text accuracy.
+# The stand-in detector resizes like PaddleOCR (longest side down to 960) and is charged on that
+# size, so "off" is what the real pipeline runs.
+CASES = (
+    # name, width, height, font scale, bottom offset (0 = centred), layout
+    ("band 1280x200", 1280, 200, 1.0, 0, "subtitle"),
+    ("band 2560x400 hi-dpi", 2560, 400, 2.0, 0, "subtitle"),
+    ("screen 1920x1080", 1920, 1080, 1.5, 80, "subtitle"),
+    ("screen 3840x2160 hi-dpi", 3840, 2160, 3.0, 160, "subtitle"),
+    # a HUD label in the top corner as well: the text crop is most of the screen
+    ("screen 1920x1080 spread", 1920, 1080, 1.5, 80, "spread"),
+    # low-contrast text below the ink tolerance: empty mask, the detector gets the whole frame
+    ("screen 1920x1080 dim", 1920, 1080, 1.5, 80, "dim"),
+)
+
+
+def _frames(n: int, w: int, h: int, scale: float, bottom: int, layout: str):
+    subs = make_subtitles(n, w, h, 11, scale, bottom)
+    for i, s in enumerate(subs):
+        if layout == "spread":
+            label = f"Score {1200 + 37 * i}"
+            th = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, scale, 3)[0][1]
+            cv2.putText(s["img"], label, (40, 40 + th), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255), 3,
+                        cv2.LINE_AA)
+            s["bands"] = [(30, 50 + th + int(12 * scale), label)] + list(s["bands"])
+            s["text"] = label + "\n" + s["text"]
+        elif layout == "dim":
+            s["img"] //= 16
+    return subs
+
+
+def _run(E, pool, subs, repeat: int):
+    group = pool.get("en", False, False)
+    pool.run_ocr(group, subs[0]["img"], False)  # warm-up
+    ok = n = 0
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        for s in subs:
+            text = E.extract_from_paddle_result(pool.run_ocr(group, s["img"], False))[0]
+            ok += int(text == s["text"])
+            n += 1
+    return (time.perf_counter() - t0) * 1000.0 / n, ok / n
+
+
+def main():
+    ap = argparse.ArgumentParser(description="OCR cost with/without adaptive preprocessing")
+    ap.add_argument("--ocr-engine", default="auto", choices=("auto", "real", "standin"))
+    ap.add_argument("--frames", type=int, default=6)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--gpu", type=int, default=0)
+    ap.add_argument("--det-ms", type=float, default=8.0, help="stand-in detection cost per frame")
+    ap.add_argument("--det-mp-ms", type=float, default=40.0, help="stand-in detection cost per megapixel")
+    ap.add_argument("--rec-ms", type=float, default=3.0, help="stand-in recognition cost per line")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    engine = args.ocr_engine
+    if engine == "auto":
+        engine = "real" if importlib.util.find_spec("paddleocr") is not None else "standin"
+    if engine == "standin":
+        import standins
+        standins.install_paddle_standin(args.det_ms, args.rec_ms, det_mp_ms=args.det_mp_ms)
+
+    import core.runtime.ocr_config as CFG
+    import core.runtime.ocr_engine as E
+    from core.runtime.ocr_preprocess import Preprocessor
+
+    results = []
+    for name, w, h, scale, bottom, layout in CASES:
+        subs = _frames(args.frames, w, h, scale, bottom, layout)
+        if engine == "standin":
+            for s in subs:
+                standins.learn_frame(s["img"], s["bands"])
+        for on in (False, True):
+            prep = Preprocessor(
+                text_height=CFG.PREPROC_TEXT_HEIGHT,
+                margin=CFG.PREPROC_MARGIN,
+                ink_tol=CFG.PREPROC_INK_TOL,
+            ) if on else None
+            pool = E.PaddleOcrPool(rec_cache=E.RecCache(0), size=1, preprocessor=prep)
+            ms, acc = _run(E, pool, subs, args.repeat)
+            pool.close()
+            results.append({
+                "case": name,
+                "engine": engine,
+                "preprocess": on,
+                "ms_per_frame": round(ms, 2),
+                "accuracy": round(acc, 4),
+                "det_pixel_ratio": prep.stats()["pixel_ratio"] if prep else 1.0,
+            })
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(f"{r['case']:<26} preprocess={'on ' if r['preprocess'] else 'off'}  {r['ms_per_frame']:>8.2f} ms/frame  "
+              f"accuracy={r['accuracy']:.3f}  det pixels={r['det_pixel_ratio']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
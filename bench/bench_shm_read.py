@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ocr"))
+
+os.environ.setdefault("SETJA_SHM_BACKEND", "posix")
+os.environ.setdefault("SETJA_SHM_PATH", os.path.join(tempfile.gettempdir(), f"setja_bench_read_{os.getpid()}"))
+
+import numpy as np
+
+import core.runtime.ocr_shm as SHM
+from core.runtime.ocr_shm_writer import ShmFrameWriter
+
+
+def _measure(label: str, read_once, frames: int):
+    read_once()  # first call may allocate the reusable buffer
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    allocated = 0
+    for _ in range(frames):
+        before, _peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        img = read_once()
+        _cur, peak = tracemalloc.get_traced_memory()
+        allocated += max(0, peak - before)
+        del img
+    dt = time.perf_counter() - t0
+    tracemalloc.stop()
+
+    return {
+        "mode": label,
+        "frames": frames,
+        "alloc_bytes_per_frame": int(allocated / frames),
+        "ms_per_frame": round(dt * 1000.0 / frames, 3),
+    }
+
+
+def run(width: int, height: int, frames: int, version: int):
+    w = ShmFrameWriter(version=version, slot_count=3, slot_bytes=width * height * 4)
+    w.write_frame(np.random.randint(0, 255, (height, width, 4), dtype=np.uint8))
+
+    reader = SHM.FrameReader()
+    cases = [
+        ("copy (legacy)", lambda: SHM.read_frame_bgr()[0]),
+        ("direct", lambda: SHM.read_frame_bgr(direct=True)[0]),
+        ("direct + reused buffer", lambda: reader.read()[0]),
+        ("borrowed view, step=4", lambda: SHM.borrow_frame_bgra(step=4)[0]),
+    ]
+    out = []
+    for label, fn in cases:
+        r = _measure(label, fn, frames)
+        r["frame"] = f"{width}x{height}"
+        r["shm_version"] = version
+        out.append(r)
+
+    w.close()
+    SHM.shm_close()
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="bytes allocated / time per read_frame_bgr call")
+    ap.add_argument("--width", type=int, default=3840)
+    ap.add_argument("--height", type=int, default=2160)
+    ap.add_argument("--frames", type=int, default=30)
+    ap.add_argument("--version", type=int, default=2, choices=(1, 2))
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    results = run(args.width, args.height, args.frames, args.version)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(f"{r['mode']:<26} {r['frame']:>10}  alloc/frame={r['alloc_bytes_per_frame']:>12,d} B  "
+              f"{r['ms_per_frame']:>8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+import argparse
+import json
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "ocr"))
+
+os.environ.setdefault("SETJA_SHM_BACKEND", "posix")
+os.environ.setdefault("SETJA_SHM_PATH", os.path.join(tempfile.gettempdir(), f"setja_bench_shm_{os.getpid()}"))
+
+import numpy as np
+
+import core.runtime.ocr_shm as SHM
+from core.runtime.ocr_shm_writer import ShmFrameWriter
+
+
+def _writer_proc(version: int, width: int, height: int, fps: float, stop, ready):
+    w = ShmFrameWriter(version=version, slot_count=3, slot_bytes=width * height * 4)
+    frames = [np.full((height, width, 4), i * 40, dtype=np.uint8) for i in range(4)]
+    ready.set()
+
+    dt = (1.0 / fps) if fps > 0 else 0.0
+    next_t = time.perf_counter()
+    i = 0
+    try:
+        while not stop.is_set():
+            w.write_frame(frames[i % len(frames)], left=0, top=0)
+            i += 1
+            if dt > 0:
+                next_t += dt
+                delay = next_t - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_t = time.perf_counter()
+    finally:
+        w.close(unlink=False)
+
+
+def run_case(version: int, width: int, height: int, fps: float, seconds: float):
+    stop = mp.Event()
+    ready = mp.Event()
+    p = mp.Process(target=_writer_proc, args=(version, width, height, fps, stop, ready), daemon=True)
+    p.start()
+    ready.wait(10.0)
+
+    ok = 0
+    failed = 0
+    torn = 0
+    lat = []
+
+    SHM.shm_close()
+    cpu0 = time.process_time()
+    t_end = time.perf_counter() + seconds
+    while time.perf_counter() < t_end:
+        t0 = time.perf_counter()
+        img, meta = SHM.read_frame_bgr()
+        lat.append((time.perf_counter() - t0) * 1000.0)
+        if img is None:
+            failed += 1
+            continue
+        ok += 1
+        # every synthetic frame is a single flat colour, anything else was torn
+        if img[0, 0, 0] != img[-1, -1, 0]:
+            torn += 1
+    cpu = time.process_time() - cpu0
+
+    stop.set()
+    p.join(5.0)
+    SHM.shm_close()
+
+    lat.sort()
+    n = len(lat)
+    return {
+        "version": version,
+        "frame": f"{width}x{height}",
+        "writer_fps": fps,
+        "reads": n,
+        "ok": ok,
+        "failed": failed,
+        "torn": torn,
+        "reads_per_s": round(n / seconds, 1),
+        "read_ms_p50": round(lat[n // 2], 3) if n else None,
+        "read_ms_p99": round(lat[min(n - 1, int(n * 0.99))], 3) if n else None,
+        "reader_cpu_s": round(cpu, 3),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="V1 (single seqlock slot) vs V2 (ring) SHM reader benchmark")
+    ap.add_argument("--width", type=int, default=1920)
+    ap.add_argument("--height", type=int, default=270)
+    ap.add_argument("--fps", type=float, default=0.0, help="writer rate, 0 = as fast as possible")
+    ap.add_argument("--seconds", type=float, default=3.0)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args()
+
+    results = [run_case(v, args.width, args.height, args.fps, args.seconds) for v in (1, 2)]
+    try:
+        os.remove(os.environ["SETJA_SHM_PATH"])
+    except OSError:
+        pass
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(" | ".join(f"{k}={v}" for k, v in r.items()))
+
+
+if __name__ == "__main__":
+    main()
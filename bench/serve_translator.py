@@ -0,0 +1,39 @@
+import argparse
+import sys
+from pathlib import Path
+
+# The translator and the OCR service both use a top-level "core" package, so the benchmark
+# runs the translator API in its own process through this launcher.
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+sys.path.insert(0, str(ROOT / "translator"))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="run the translator API for benchmarks")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, required=True)
+    ap.add_argument("--standin", action="store_true", help="CPU stand-ins for CTranslate2 / MarianTokenizer")
+    ap.add_argument("--mt-batch-ms", type=float, default=8.0)
+    ap.add_argument("--mt-token-ms", type=float, default=0.6)
+    ap.add_argument("--device", default=None, help="override t_config.DEVICE (e.g. cpu)")
+    ap.add_argument("--ipc", default=None, help="IPC address (t_config.IPC_ADDRESS), none by default")
+    args = ap.parse_args()
+
+    if args.standin:
+        from standins import install_mt_standins
+        install_mt_standins(args.mt_batch_ms, args.mt_token_ms)
+
+    import core.config.t_config as TCFG
+    if args.device:
+        TCFG.DEVICE = args.device
+    TCFG.IPC_ADDRESS = args.ipc or None
+
+    import uvicorn
+    from core.api.t_api import app
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import hashlib
+import re
+import sys
+import threading
+import time
+import types
+
+import numpy as np
+import cv2
+
+# CPU stand-ins for the heavy engines, used by the benchmarks when PaddleOCR / CTranslate2
+# (or their models) are not available. They keep the exact call shapes the services use and
+# burn a configurable amount of time per call so latency numbers stay meaningful.
+
+
+def _mask_key(crop) -> bytes:
+    # keyed on the tight ink box, so any crop that holds the whole line (detector box, layout band) hits
+    g = crop if crop.ndim == 2 else cv2.cvtColor(np.ascontiguousarray(crop), cv2.COLOR_BGR2GRAY)
+    ys, xs = np.nonzero(g > 127)
+    if ys.size:
+        g = g[ys.min():ys.max() + 1, xs.min():xs.max() + 1]
+    h, w = g.shape[:2]
+    nw = max(1, int(round(w * 16 / float(max(1, h)))))
+    g = cv2.resize(g, (nw, 16), interpolation=cv2.INTER_AREA)
+    _, m = cv2.threshold(g, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return hashlib.blake2b(np.packbits(m).tobytes() + nw.to_bytes(4, "little"), digest_size=16).digest()
+
+
+class _StandInDetResize:
+    # PaddleOCR's DetResizeForTest defaults: the longest side is brought down to 960, never up
+    def __init__(self, limit_side_len: int = 960, limit_type: str = "max"):
+        self.limit_side_len = limit_side_len
+        self.limit_type = limit_type
+
+    def size(self, h: int, w: int):
+        limit = self.limit_side_len
+        if self.limit_type == "max":
+            ratio = float(limit) / max(h, w) if max(h, w) > limit else 1.0
+        else:
+            ratio = float(limit) / min(h, w) if min(h, w) < limit else 1.0
+        return max(32, int(round(h * ratio / 32)) * 32), max(32, int(round(w * ratio / 32)) * 32)
+
+
+class _StandInDetector:
+    def __init__(self, cost_ms: float, cost_ms_per_mp: float = 0.0):
+        self.cost_ms = cost_ms
+        self.cost_ms_per_mp = cost_ms_per_mp
+        self.resize = _StandInDetResize()
+        self.preprocess_op = [self.resize]
+
+    def __call__(self, img):
+        t0 = time.perf_counter()
+        g = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        _, b = cv2.threshold(g, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        b = cv2.dilate(b, np.ones((7, 41), np.uint8))
+        cs, _ = cv2.findContours(b, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        rects = sorted(cv2.boundingRect(c) for c in cs)
+        # words of one row -> one line box, whatever the text size
+        lines = []
+        for x, y, w, h in rects:
+            if w < 8 or h < 8:
+                continue
+            for ln in lines:
+                ov = min(ln[3], y + h) - max(ln[1], y)
+                if ov > 0.5 * min(ln[3] - ln[1], h):
+                    ln[0], ln[1], ln[2], ln[3] = min(ln[0], x), min(ln[1], y), max(ln[2], x + w), max(ln[3], y + h)
+                    break
+            else:
+                lines.append([x, y, x + w, y + h])
+        boxes = [[[x0, y0], [x1, y0], [x1, y1], [x0, y1]] for x0, y0, x1, y1 in lines]
+        # fixed cost + per-megapixel cost of the resized input DB would run on (boxes come from
+        # the full-size image, so accuracy does not suffer from the resize here)
+        rh, rw = self.resize.size(*img.shape[:2])
+        _spend(self.cost_ms + self.cost_ms_per_mp * rh * rw / 1e6, t0)
+        return np.array(boxes, dtype=np.float32).reshape((-1, 4, 2)), time.perf_counter() - t0
+
+
+class _StandInRecognizer:
+    lexicon = {}
+    _lock = threading.Lock()
+
+    def __init__(self, cost_ms_per_line: float, cost_ms_per_call: float = 0.0):
+        self.cost_ms_per_line = cost_ms_per_line
+        self.cost_ms_per_call = cost_ms_per_call
+
+    @classmethod
+    def learn(cls, crop, text: str):
+        with cls._lock:
+            cls.lexicon[_mask_key(crop)] = text
+
+    def __call__(self, crops):
+        t0 = time.perf_counter()
+        out = []
+        for c in crops:
+            text = self.lexicon.get(_mask_key(c))
+            out.append((text, 0.97) if text else ("", 0.0))
+        # fixed per-call cost + per-line cost, like a batched predictor
+        _spend(self.cost_ms_per_call + self.cost_ms_per_line * len(crops), t0)
+        return out, time.perf_counter() - t0
+
+
+class _StandInClassifier:
+    def __call__(self, crops):
+        return crops, [("0", 1.0)] * len(crops), 0.0
+
+
+class StandInPaddleOCR:
+    det_ms = 20.0
+    rec_ms = 4.0
+    rec_call_ms = 0.0
+    det_mp_ms = 0.0
+
+    def __init__(self, use_angle_cls=False, lang="en", use_gpu=False, show_log=False, **kwargs):
+        self.use_angle_cls = use_angle_cls
+        self.drop_score = 0.5
+        self.text_detector = _StandInDetector(self.det_ms, self.det_mp_ms)
+        self.text_recognizer = _StandInRecognizer(self.rec_ms, self.rec_call_ms)
+        self.text_classifier = _StandInClassifier()
+
+    def ocr(self, img, det=True, rec=True, cls=False, **kwargs):
+        import core.runtime.ocr_engine as OCR
+
+        boxes, _ = self.text_detector(img)
+        boxes = OCR.sorted_boxes(boxes)
+        if not boxes:
+            return [None]
+        rec_res, _ = self.text_recognizer([OCR.crop_box(img, b) for b in boxes])
+        lines = [[b.tolist(), r] for b, r in zip(boxes, rec_res) if r[1] >= self.drop_score]
+        return [lines or None]
+
+
+def learn_frame(img, bands):
+    # Teach the stand-in recognizer what was rendered: bands = [(y0, y1, text), ...].
+    # Uses the same detector + crop as the engine so the lookup hits at benchmark time.
+    import core.runtime.ocr_engine as OCR
+
+    boxes, _ = _StandInDetector(0.0)(img)
+    for b in boxes:
+        cy = float(b[:, 1].mean())
+        for y0, y1, text in bands:
+            if y0 <= cy <= y1:
+                _StandInRecognizer.learn(OCR.crop_box(img, b), text)
+                break
+
+
+def install_paddle_standin(det_ms: float = 20.0, rec_ms: float = 4.0, rec_call_ms: float = 0.0,
+                           device_slots: int = 0, det_mp_ms: float = 0.0):
+    # device_slots > 0: det/rec calls of all engines share that many "compute units" (a saturated
+    # CPU or one GPU); 0 = every engine runs fully in parallel
+    global _device
+    _device = threading.BoundedSemaphore(device_slots) if device_slots > 0 else None
+    StandInPaddleOCR.det_ms = float(det_ms)
+    StandInPaddleOCR.rec_ms = float(rec_ms)
+    StandInPaddleOCR.rec_call_ms = float(rec_call_ms)
+    StandInPaddleOCR.det_mp_ms = float(det_mp_ms)
+    mod = types.ModuleType("paddleocr")
+    mod.PaddleOCR = StandInPaddleOCR
+    mod.SETJA_STANDIN = True
+    sys.modules["paddleocr"] = mod
+    return mod
+
+
+# ---- translator: CTranslate2 + MarianTokenizer -------------------------------------------
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+
+class StandInMarianTokenizer:
+    def __init__(self):
+        self._vocab = {"</s>": 0, "<unk>": 1, "<pad>": 2}
+        self._inv = ["</s>", "<unk>", "<pad>"]
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_pretrained(cls, *args, **kwargs):
+        return cls()
+
+    def _id(self, tok: str) -> int:
+        with self._lock:
+            i = self._vocab.get(tok)
+            if i is None:
+                i = len(self._inv)
+                self._vocab[tok] = i
+                self._inv.append(tok)
+            return i
+
+    def __call__(self, text, add_special_tokens=True, **kwargs):
+        ids = [self._id("▁" + t) for t in _TOKEN_RE.findall(text or "")]
+        if add_special_tokens:
+            ids.append(0)
+        return {"input_ids": ids}
+
+    def convert_ids_to_tokens(self, ids):
+        return [self._inv[i] if 0 <= i < len(self._inv) else "<unk>" for i in ids]
+
+    def convert_tokens_to_ids(self, tokens):
+        return [self._id(t) for t in tokens]
+
+    def decode(self, ids, skip_special_tokens=True):
+        toks = self.convert_ids_to_tokens(ids)
+        if skip_special_tokens:
+            toks = [t for t in toks if t not in ("</s>", "<unk>", "<pad>")]
+        return "".join(t.replace("▁", " ") for t in toks).strip()
+
+
+class _Hyp:
+    __slots__ = ("hypotheses",)
+
+    def __init__(self, toks):
+        self.hypotheses = [toks]
+
+
+class StandInTranslator:
+    ms_per_batch = 8.0
+    ms_per_token = 0.6
+
+    def __init__(self, model_path=None, device="cpu", device_index=0, compute_type="default", **kwargs):
+        self._lock = threading.Lock()
+
+    def translate_batch(self, batch, beam_size=1, max_decoding_length=256, **kwargs):
+        t0 = time.perf_counter()
+        out = []
+        n_tok = 0
+        for toks in batch:
+            body = [t for t in toks if t != "</s>"][:max_decoding_length]
+            n_tok += len(body)
+            # "translation": reversed word order, so the output is visibly different
+            out.append(_Hyp(list(reversed(body))))
+        with self._lock:
+            _sleep_rest(t0, self.ms_per_batch + self.ms_per_token * n_tok)
+        return out
+
+
+def install_mt_standins(ms_per_batch: float = 8.0, ms_per_token: float = 0.6, tokenizer: bool = True):
+    # tokenizer=False keeps the real MarianTokenizer (transformers + the hf_tokenizer files)
+    StandInTranslator.ms_per_batch = float(ms_per_batch)
+    StandInTranslator.ms_per_token = float(ms_per_token)
+
+    ct2 = types.ModuleType("ctranslate2")
+    ct2.Translator = StandInTranslator
+    ct2.SETJA_STANDIN = True
+    sys.modules["ctranslate2"] = ct2
+    if tokenizer:
+        tf = types.ModuleType("transformers")
+        tf.MarianTokenizer = StandInMarianTokenizer
+        tf.SETJA_STANDIN = True
+        sys.modules["transformers"] = tf
+
+
+_device = None
+
+
+def _spend(cost_ms: float, t0: float):
+    dev = _device
+    if dev is None:
+        _sleep_rest(t0, cost_ms)
+        return
+    with dev:
+        _sleep_rest(time.perf_counter(), cost_ms)
+
+
+def _sleep_rest(t0: float, cost_ms: float):
+    rest = cost_ms / 1000.0 - (time.perf_counter() - t0)
+    if rest > 0:
+        time.sleep(rest)
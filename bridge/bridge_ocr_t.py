@@ -1,10 +1,19 @@
 import time
 import requests
 import hashlib
+import json
 import socket
+import sys
+from multiprocessing import AuthenticationError
 from dataclasses import dataclass
 from difflib import SequenceMatcher
+from pathlib import Path
 from typing import Dict, Any, Tuple
+from urllib.parse import urlencode
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "shared"))
+
+from setja_ipc import IpcClient, default_address
 
 
 @dataclass
@@ -13,9 +22,20 @@ class BridgeConfig:
     mt_url: str = "http://127.0.0.1:15199/translate"
     lang: str = "en"
     gpu: int = 1
+    # only what the bridge reads; "" asks the OCR API for the full response
+    ocr_fields: str = "text,seq,stable"
+    # hold a text back until the OCR poller's multi-frame vote calls it stable
+    wait_stable: bool = False
 
     poll_interval_ms: int = 80
 
+    # "http" or "ipc": length-prefixed frames over a Unix socket / named pipe (the services'
+    # IPC_ADDRESS, off by default there); same endpoints and bodies, without the TCP + HTTP
+    # overhead per call. Connections authenticate with setja_ipc.authkey()
+    transport: str = "http"
+    ocr_ipc: str = default_address("ocr")
+    mt_ipc: str = default_address("mt")
+
     ocr_timeout: Tuple[float, float] = (2.0, 5.0)
     mt_timeout: Tuple[float, float] = (2.0, 10.0)
 
@@ -88,19 +108,42 @@ def _appearance_gate(
     return False  # بعد الثانية: نفس النص، تخطى
 
 
-def _fetch_ocr_text(session: requests.Session, cfg: BridgeConfig) -> Dict[str, Any]:
+class IpcSession:
+    # stands in for the requests.Session that run_bridge passes around when transport == "ipc"
+    def __init__(self, cfg: "BridgeConfig"):
+        self.ocr = IpcClient(cfg.ocr_ipc)
+        self.mt = IpcClient(cfg.mt_ipc)
+
+    def close(self):
+        self.ocr.close()
+        self.mt.close()
+
+
+def open_session(cfg: BridgeConfig):
+    return IpcSession(cfg) if cfg.transport == "ipc" else requests.Session()
+
+
+def _fetch_ocr_text(session, cfg: BridgeConfig) -> Dict[str, Any]:
     params = {"lang": cfg.lang, "gpu": str(cfg.gpu)}
+    if cfg.ocr_fields:
+        params["fields"] = cfg.ocr_fields
+    if isinstance(session, IpcSession):
+        path = "/ocr_shm?" + urlencode(params)
+        return session.ocr.request("POST", path, timeout=cfg.ocr_timeout[1])[1]
     r = session.post(cfg.ocr_url, params=params, data=b"", timeout=cfg.ocr_timeout)
     return r.json()
 
 
-def _send_to_translator(session: requests.Session, cfg: BridgeConfig, text: str) -> Dict[str, Any]:
+def _send_to_translator(session, cfg: BridgeConfig, text: str) -> Dict[str, Any]:
     if cfg.unique_stream_per_text:
         sid = "bridge_" + hashlib.md5(text.encode("utf-8")).hexdigest()[:10]
     else:
         sid = cfg.stream_id
 
     payload = {"text": text, "stream_id": sid}
+    if isinstance(session, IpcSession):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        return session.mt.request("POST", "/translate", body, timeout=cfg.mt_timeout[1])[1]
     r = session.post(cfg.mt_url, json=payload, timeout=cfg.mt_timeout)
     return r.json()
 
@@ -142,7 +185,7 @@ def run_bridge(
     on_error=None,
     stop_pred=None,
 ) -> None:
-    s = requests.Session()
+    s = open_session(cfg)
 
     state = {
         "prev_ocr_text": None,
@@ -174,6 +217,8 @@ def run_bridge(
 
                 if cfg.skip_empty and not cur_text:
                     pass
+                elif cfg.wait_stable and ocr_j.get("stable") is False:
+                    pass
                 else:
                     if _appearance_gate(
                         cur_text,
@@ -188,7 +233,9 @@ def run_bridge(
                         else:
                             on_result(cur_text, mt_j)
 
-        except requests.RequestException as e:
+        except (requests.RequestException, OSError, EOFError, AuthenticationError) as e:
+            # OSError / EOFError: IPC transport, service not listening or gone; AuthenticationError:
+            # it holds a different key
             http_fail_count += 1
 
             # backoff خفيف: يزيد لحد 2 ثواني
@@ -199,7 +246,7 @@ def run_bridge(
             now = time.monotonic()
             if on_error and (now - last_http_print >= 2.0):
                 last_http_print = now
-                on_error("HTTP", str(e))
+                on_error("IPC" if cfg.transport == "ipc" else "HTTP", str(e))
 
         except ValueError as e:
             emit_err("JSON", str(e))
@@ -153,40 +153,17 @@ namespace cap {
 
                     D3D11_MAPPED_SUBRESOURCE map{};
                     if (SUCCEEDED(capdev.ctx->Map(staging, 0, D3D11_MAP_READ, 0, &map))) {
-                        const int shm_stride = w * 4;
-                        const uint32_t data_bytes = (uint32_t)(h * shm_stride);
-                        const size_t total_bytes = sizeof(shm::Header) + (size_t)data_bytes;
-
-                        if (shmw.open_or_create(total_bytes)) {
-                            auto* hdr = (shm::Header*)shmw.base;
-                            uint8_t* dst = shmw.base + sizeof(shm::Header);
-
-                            InterlockedIncrement(&hdr->seq);
-
-                            hdr->magic = shm::MAGIC;
-                            hdr->version = 1;
-                            hdr->width = w;
-                            hdr->height = h;
-                            hdr->stride = shm_stride;
-                            hdr->format = shm::FMT_BGRA8;
-                            hdr->region_left = r.left;
-                            hdr->region_top  = r.top;
-                            hdr->data_bytes  = data_bytes;
-
-                            const uint8_t* src = (const uint8_t*)map.pData;
-                            const int src_pitch = (int)map.RowPitch;
-
-                            for (int yy = 0; yy < h; yy++) {
-                                const uint8_t* srow = src + (size_t)yy * (size_t)src_pitch;
-                                uint8_t* drow = dst + (size_t)yy * (size_t)shm_stride;
-                                std::memcpy(drow, srow, (size_t)shm_stride);
-                            }
+                        const uint32_t slot_bytes = (uint32_t)capdev.deskW * (uint32_t)capdev.deskH * 4u;
 
-                            if (!g_screen_ready_once.exchange(true)) {
-                                std::cout << "Screen Capture Running Successfully\n";
-                            }                           
+                        if (shmw.open_ring(slot_bytes, shm::RING_SLOTS)) {
+                            const bool ok = shmw.write_ring_frame(
+                                (const uint8_t*)map.pData, (int)map.RowPitch,
+                                w, h, r.left, r.top
+                            );
 
-                            InterlockedIncrement(&hdr->seq);
+                            if (ok && !g_screen_ready_once.exchange(true)) {
+                                std::cout << "Screen Capture Running Successfully\n";
+                            }
                         }
 
                         capdev.ctx->Unmap(staging, 0);
@@ -1,9 +1,24 @@
 #include "sc_shm.h"
 
 namespace shm {
-    const wchar_t* NAME = L"Local\\SETJA_OCR_FRAME_V1";
+    // The mapping only ever holds the V2 ring; the name changed with the layout so a V1 reader
+    // cannot attach to it and misread the ring header as a single frame.
+    const wchar_t* NAME = L"Local\\SETJA_OCR_FRAME_V2";
+    const wchar_t* EVENT_NAME = L"Local\\SETJA_OCR_FRAME_EVENT";
     const uint32_t MAGIC = 0x4D464A53;
     const int32_t  FMT_BGRA8 = 1;
+    const uint32_t VERSION_RING = 2;
+    // Slots are sized for the full desktop (sc_capture.cpp), so moving or resizing the region
+    // never re-creates the mapping: 3 x 33 MB, about 100 MB, at 3840x2160.
+    const uint32_t RING_SLOTS = 3;
+
+    static LONG64 now_us() {
+        static LARGE_INTEGER freq{};
+        if (!freq.QuadPart) QueryPerformanceFrequency(&freq);
+        LARGE_INTEGER t{};
+        QueryPerformanceCounter(&t);
+        return (LONG64)(t.QuadPart / freq.QuadPart * 1000000LL + (t.QuadPart % freq.QuadPart) * 1000000LL / freq.QuadPart);
+    }
 
     bool Writer::open_or_create(size_t bytes) {
         if (hMap && base && size == bytes) return true;
@@ -29,13 +44,87 @@ namespace shm {
         return true;
     }
 
+    bool Writer::open_ring(uint32_t slot_data_bytes, uint32_t slots) {
+        const size_t total = sizeof(RingHeader) + (size_t)slots * (sizeof(SlotHeader) + (size_t)slot_data_bytes);
+        if (base && size == total && slot_count == slots && slot_bytes == slot_data_bytes) return true;
+        if (!open_or_create(total)) return false;
+
+        auto* rh = (RingHeader*)base;
+        slot_count = slots;
+        slot_bytes = slot_data_bytes;
+        frame_seq = 0;
+
+        // a reader that sees version 2 must already see a valid geometry and no slot
+        InterlockedExchange(&rh->latest, -1);
+        for (uint32_t i = 0; i < slots; i++) {
+            auto* sh = (SlotHeader*)(base + sizeof(RingHeader) + (size_t)i * sizeof(SlotHeader));
+            InterlockedExchange64(&sh->seq, 0);
+        }
+        rh->magic = MAGIC;
+        rh->slot_count = slots;
+        rh->slot_bytes = slot_data_bytes;
+        MemoryBarrier();
+        rh->version = VERSION_RING;
+
+        // auto-reset: wakes the OCR poller once per published frame
+        if (!hEvent) hEvent = CreateEventW(nullptr, FALSE, FALSE, EVENT_NAME);
+        return true;
+    }
+
+    bool Writer::write_ring_frame(const uint8_t* src, int src_pitch, int w, int h, int left, int top) {
+        if (!base || slot_count == 0) return false;
+
+        const int stride = w * 4;
+        const uint32_t data_bytes = (uint32_t)(h * stride);
+        if (w <= 0 || h <= 0 || data_bytes > slot_bytes) return false;
+
+        auto* rh = (RingHeader*)base;
+        const LONG cur = rh->latest;
+        const uint32_t slot = (cur < 0) ? 0 : (uint32_t)((cur + 1) % (LONG)slot_count);
+
+        auto* sh = (SlotHeader*)(base + sizeof(RingHeader) + (size_t)slot * sizeof(SlotHeader));
+        uint8_t* dst = base + sizeof(RingHeader) + (size_t)slot_count * sizeof(SlotHeader)
+                     + (size_t)slot * (size_t)slot_bytes;
+
+        frame_seq++;
+
+        InterlockedIncrement64(&sh->seq);
+
+        sh->frame_seq = frame_seq;
+        sh->ts_us = now_us();
+        sh->width = w;
+        sh->height = h;
+        sh->stride = stride;
+        sh->format = FMT_BGRA8;
+        sh->region_left = left;
+        sh->region_top = top;
+        sh->data_bytes = data_bytes;
+
+        for (int yy = 0; yy < h; yy++) {
+            std::memcpy(dst + (size_t)yy * (size_t)stride, src + (size_t)yy * (size_t)src_pitch, (size_t)stride);
+        }
+
+        InterlockedIncrement64(&sh->seq);
+
+        InterlockedExchange(&rh->latest, (LONG)slot);
+        InterlockedExchange64(&rh->frame_seq, frame_seq);
+        if (hEvent) SetEvent(hEvent);
+        return true;
+    }
+
     void Writer::close() {
         if (base) UnmapViewOfFile(base);
         if (hMap) CloseHandle(hMap);
         base = nullptr;
         hMap = nullptr;
         size = 0;
+        slot_count = 0;
+        slot_bytes = 0;
     }
 
-    Writer::~Writer() { close(); }
+    Writer::~Writer() {
+        close();
+        if (hEvent) CloseHandle(hEvent);
+        hEvent = nullptr;
+    }
 }
\ No newline at end of file
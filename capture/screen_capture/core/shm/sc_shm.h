@@ -5,6 +5,7 @@
 
 namespace shm {
     extern const wchar_t* NAME;
+    extern const wchar_t* EVENT_NAME;
 
     #pragma pack(push, 1)
     struct Header {
@@ -19,17 +20,58 @@ namespace shm {
         int32_t region_top;
         uint32_t data_bytes;
     };
+
+    // V2: N-slot ring. The reader takes `latest` and validates that slot's own seq,
+    // the writer always fills a slot other than the published one.
+    struct RingHeader {
+        uint32_t magic;
+        uint32_t version;
+        uint32_t slot_count;
+        uint32_t slot_bytes;
+        volatile LONG latest;
+        uint32_t reserved0;
+        volatile LONG64 frame_seq;
+        uint8_t reserved1[32];
+    };
+
+    struct SlotHeader {
+        volatile LONG64 seq;
+        LONG64 frame_seq;
+        LONG64 ts_us;
+        int32_t width;
+        int32_t height;
+        int32_t stride;
+        int32_t format;
+        int32_t region_left;
+        int32_t region_top;
+        uint32_t data_bytes;
+        uint32_t reserved0;
+        uint64_t reserved1;
+    };
     #pragma pack(pop)
 
+    static_assert(sizeof(Header) == 40, "Header layout");
+    static_assert(sizeof(RingHeader) == 64, "RingHeader layout");
+    static_assert(sizeof(SlotHeader) == 64, "SlotHeader layout");
+
     extern const uint32_t MAGIC;
     extern const int32_t  FMT_BGRA8;
+    extern const uint32_t VERSION_RING;
+    extern const uint32_t RING_SLOTS;
 
     struct Writer {
         HANDLE hMap = nullptr;
+        HANDLE hEvent = nullptr;
         uint8_t* base = nullptr;
         size_t size = 0;
 
+        uint32_t slot_count = 0;
+        uint32_t slot_bytes = 0;
+        LONG64 frame_seq = 0;
+
         bool open_or_create(size_t bytes);
+        bool open_ring(uint32_t slot_data_bytes, uint32_t slots);
+        bool write_ring_frame(const uint8_t* src, int src_pitch, int w, int h, int left, int top);
         void close();
         ~Writer();
     };
@@ -1,7 +1,10 @@
 import os
+import time
 # Disable PIR to prevent RuntimeError in newer Paddle versions (must be set before imports)
 os.environ["FLAGS_enable_pir_api"] = "0"
 os.environ["FLAGS_enable_pir_in_executor"] = "0"
+# survives the venv re-exec below, so /health can show the whole cold start
+os.environ.setdefault("SETJA_OCR_T0", repr(time.time()))
 
 import sys
 from pathlib import Path
@@ -10,32 +13,58 @@ sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 from core.runtime.ocr_bootstrap import bootstrap_env
 bootstrap_env(app_folder="ocr", venv_folder="ocr_env")
 
-import paddle
-try:
-    paddle.set_flags({'FLAGS_enable_pir_api': 0, 'FLAGS_enable_pir_in_executor': 0})
-except Exception:
-    pass
+from core.runtime.ocr_startup import STARTUP
 
 import argparse
+import threading
 
-import core.runtime.ocr_config as CFG
-import core.runtime.ocr_engine as OCR
-import core.services.ocr_poller as ocr_poller
-import core.api.ocr_api
+# paddle / paddleocr / onnxruntime are imported by _warm_up, after the port is already open
+with STARTUP.phase("imports"):
+    import core.runtime.ocr_config as CFG
+    import core.runtime.ocr_engine as OCR
+    import core.services.ocr_poller as ocr_poller
+    import core.api.ocr_api
+
+
+def _warm_up():
+    try:
+        with STARTUP.phase("import_backend"):
+            OCR.import_backend(OCR.POOL.backend)
+        with STARTUP.phase("load_models"):
+            ocr = OCR.POOL.get(lang=CFG.AUTO_LANG, use_gpu=CFG.AUTO_GPU, use_angle_cls=CFG.AUTO_ANGLE)
+        if CFG.WARMUP:
+            with STARTUP.phase("warmup"):
+                img = OCR.warmup_image(CFG.WARMUP_WIDTH, CFG.WARMUP_HEIGHT)
+                OCR.POOL.warm_up(ocr, img, cls=CFG.AUTO_CLS, runs=CFG.WARMUP_RUNS)
+    except Exception as e:
+        STARTUP.set_state("failed", str(e))
+        print(f"OCR START FAILED | {e}", flush=True)
+        return
+
+    ocr_poller.start()
+    STARTUP.set_state("ready")
+    device = OCR.engine_device(OCR.POOL.backend, ocr.key[1])
+    print(f"OCR RUNNING | {OCR.POOL.backend.upper()} {device} READY", flush=True)
 
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--host", default=CFG.HOST)
     ap.add_argument("--port", type=int, default=CFG.PORT)
+    ap.add_argument("--server", default=CFG.HTTP_SERVER, choices=("asyncio", "threading"))
+    ap.add_argument("--ipc", default=CFG.IPC_ADDRESS,
+                    help='Unix socket path / named pipe to serve the API on as well, "default" = the '
+                         'well-known one; off unless given')
     args = ap.parse_args()
 
-    ocr_poller.start()
-
-    OCR.POOL.get(lang="en", use_gpu=True, use_angle_cls=False)
-    print("OCR RUNNING | GPU READY", flush=True)
+    with STARTUP.phase("listen"):
+        httpd = core.api.ocr_api.create_server(args.host, args.port, mode=args.server)
+        if args.ipc:
+            import core.api.ocr_ipc as ocr_ipc
 
-    httpd = core.api.ocr_api.create_server(args.host, args.port)
+            ocr_ipc.serve(ocr_ipc.default_address("ocr") if args.ipc == "default" else args.ipc)
+    STARTUP.set_state("warming")
+    threading.Thread(target=_warm_up, daemon=True).start()
     httpd.serve_forever()
 
 
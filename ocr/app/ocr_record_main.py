@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import argparse
+import time
+
+from core.runtime.ocr_record import FrameRecording, record_shm, replay_to_shm
+from core.runtime.ocr_shm_writer import ShmFrameWriter
+
+
+def _cmd_record(args):
+    def on_frame(n, meta):
+        if n % 50 == 0:
+            print(f"recorded {n} frames (seq {meta['seq']})", flush=True)
+
+    try:
+        n = record_shm(args.path, seconds=args.seconds, max_frames=args.frames, on_frame=on_frame)
+    except KeyboardInterrupt:
+        n = None
+    rec = FrameRecording(args.path)
+    print(f"RECORDED | {len(rec)} frames | {rec.duration_s:.1f}s | {rec.data_bytes / 1e6:.1f} MB -> {args.path}")
+    rec.close()
+    return n
+
+
+def _cmd_replay(args):
+    rec = FrameRecording(args.path)
+    slot_bytes = int(max(rec.index["w"] * rec.index["h"])) * 4 if len(rec) else 4
+    writer = ShmFrameWriter(version=args.shm_version, slot_bytes=slot_bytes)
+    print(f"REPLAY | {len(rec)} frames | {rec.duration_s:.1f}s | speed x{args.speed}", flush=True)
+    try:
+        t0 = time.monotonic()
+        n = replay_to_shm(rec, writer, speed=args.speed, loop=args.loop)
+        print(f"REPLAY DONE | {n} frames in {time.monotonic() - t0:.1f}s")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close(unlink=not args.keep)
+        rec.close()
+
+
+def _cmd_info(args):
+    rec = FrameRecording(args.path)
+    idx = rec.index
+    unique = len(set(int(o) for o in idx["offset"]))
+    print(f"{args.path}: {len(rec)} frames ({unique} unique), {rec.duration_s:.2f}s, "
+          f"{rec.data_bytes / 1e6:.1f} MB pixel data")
+    if len(rec):
+        print(f"sizes: {sorted(set(zip(idx['w'].tolist(), idx['h'].tolist())))}")
+    rec.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Record the capture SHM stream / replay a recording into it")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("record")
+    p.add_argument("path")
+    p.add_argument("--seconds", type=float, default=0.0)
+    p.add_argument("--frames", type=int, default=0)
+    p.set_defaults(fn=_cmd_record)
+
+    p = sub.add_parser("replay")
+    p.add_argument("path")
+    p.add_argument("--speed", type=float, default=1.0, help="1 = original pace, 0 = as fast as possible")
+    p.add_argument("--loop", action="store_true")
+    p.add_argument("--shm-version", type=int, default=2, choices=(1, 2))
+    p.add_argument("--keep", action="store_true", help="leave the SHM file behind when done")
+    p.set_defaults(fn=_cmd_replay)
+
+    p = sub.add_parser("info")
+    p.add_argument("path")
+    p.set_defaults(fn=_cmd_info)
+
+    args = ap.parse_args()
+    args.fn(args)
+
+
+if __name__ == "__main__":
+    main()
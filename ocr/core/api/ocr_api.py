@@ -3,109 +3,251 @@ from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
 
-import json
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urlparse, parse_qs
 
 import cv2
 import numpy as np
 
+import core.api.ocr_codec as CODEC
+import core.runtime.ocr_config as CFG
+import core.runtime.ocr_metrics as M
 import core.runtime.ocr_engine as PaddleOcrPool
 import core.runtime.ocr_shm as SHM
 import core.services.ocr_poller as ocr_poller
+from core.services.ocr_coalesce import COALESCER, opts_key
+from core.runtime.ocr_startup import STARTUP
+
+
+# endpoints counted by name in ocr_http_requests_total; anything else is "other"
+_PATHS = frozenset(("/ocr", "/ocr_shm", "/health", "/latest", "/stream", "/metrics"))
+
+
+def count_request(method: str, path: str, code: int):
+    p = urlparse(path).path
+    M.REQUESTS.labels(method if method in ("GET", "POST") else "other",
+                      p if p in _PATHS else "other", str(code)).inc()
+
+
+def _qs_num(qs, name: str, cast):
+    # optional numeric query parameter; missing / empty / malformed -> None
+    try:
+        v = (qs.get(name, [""])[0] or "").strip()
+        return cast(v) if v else None
+    except ValueError:
+        return None
+
+
+def _ocr_shm(lang: str, use_gpu: bool, use_angle_cls: bool, cls_flag: bool):
+    img, meta_or_err = SHM.read_frame_bgr(direct=True)
+    if img is None:
+        return {"ok": False, "error": meta_or_err}
+    ocr = PaddleOcrPool.POOL.get(lang=lang, use_gpu=use_gpu, use_angle_cls=use_angle_cls)
+    result = PaddleOcrPool.POOL.run_ocr(ocr, img, cls=cls_flag, priority=PaddleOcrPool.PRIO_SHM,
+                                        layout=CFG.FIXED_LAYOUT)
+    text_joined, texts, boxs, scores, avg_conf = PaddleOcrPool.extract_from_paddle_result(result)
+    return {
+        "ok": True,
+        "text": text_joined,
+        "texts": texts,
+        "boxs": boxs,
+        "scores": scores,
+        "avg_conf": avg_conf,
+        "frame": meta_or_err,
+        "seq": meta_or_err["seq"],
+    }
+
+
+def get_route(path: str):
+    # -> (code, obj) for the plain GET endpoints (/stream is served by each server itself)
+    u = urlparse(path)
+    if u.path.startswith("/health"):
+        return 200, {
+            "ok": True,
+            "ready": STARTUP.ready,
+            "startup": STARTUP.health(),
+            "rec_cache": PaddleOcrPool.REC_CACHE.stats(),
+            "ocr_pool": PaddleOcrPool.POOL.health(),
+            "ocr_shm": COALESCER.stats(),
+            "stream": ocr_poller.STREAM.stats(),
+        }
+
+    if u.path == "/metrics":
+        return 200, CODEC.Raw(M.CONTENT_TYPE, M.METRICS.render())
+
+    if u.path.startswith("/latest"):
+        latest = ocr_poller.get_latest()
+        return (200 if latest.get("ok") else 503), latest
+
+    return 404, {"ok": False, "error": "not_found"}
+
+
+def post_route(path: str, body: bytes):
+    # -> (code, obj) for /ocr and /ocr_shm; blocks on OCR, so async servers run it off the loop
+    u = urlparse(path)
+    if u.path not in ("/ocr", "/ocr_shm"):
+        return 404, {"ok": False, "error": "not_found"}
+
+    if not STARTUP.ready:
+        # listening, but the engines are still loading / warming up
+        return 503, {"ok": False, "error": STARTUP.state, "startup": STARTUP.health()}
+
+    qs = parse_qs(u.query)
+    lang = (qs.get("lang", ["en"])[0] or "en")
+    use_gpu = qs.get("gpu", ["1"])[0] not in ("0", "false", "False")
+    use_angle_cls = qs.get("angle", ["0"])[0] in ("1", "true", "True")
+    cls_flag = qs.get("cls", ["0"])[0] in ("1", "true", "True")
+
+    if u.path == "/ocr_shm":
+        # freshness: by default only a result for the frame currently in SHM is reused;
+        # max_age_ms / min_seq let the client accept an older one
+        max_age_ms = _qs_num(qs, "max_age_ms", float)
+        min_seq = _qs_num(qs, "min_seq", int)
+        try:
+            res, how, age_ms = COALESCER.get(
+                opts_key(use_gpu, use_angle_cls, cls_flag),
+                SHM.frame_seq(),
+                lambda: _ocr_shm(lang, use_gpu, use_angle_cls, cls_flag),
+                max_age_ms=max_age_ms,
+                min_seq=min_seq,
+            )
+            if not res.get("ok"):
+                return 503, {"ok": False, "error": res.get("error")}
+
+            out = {
+                "ok": True,
+                "text": res["text"],
+                "texts": res["texts"],
+                "boxs": res["boxs"],
+                "scores": res["scores"],
+                "avg_conf": res["avg_conf"],
+                "lang": lang,
+                "gpu": use_gpu,
+                "source": "shm",
+                "frame": res["frame"],
+                "seq": res["seq"],
+                "coalesced": how,
+                "age_ms": round(age_ms, 1),
+            }
+            if "stable" in res:
+                # poller result: "text" is the multi-frame consensus (ocr_fusion)
+                out["raw_text"] = res["raw_text"]
+                out["stable"] = res["stable"]
+            return 200, out
+        except PaddleOcrPool.OcrBusy as e:
+            return 503, {"ok": False, "error": str(e)}
+        except Exception as e:
+            return 500, {"ok": False, "error": str(e)}
+
+    if not body:
+        return 400, {"ok": False, "error": "empty_body"}
+
+    arr = np.frombuffer(body, dtype=np.uint8)
+    img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
+    if img is None:
+        return 400, {"ok": False, "error": "bad_image"}
+
+    try:
+        ocr = PaddleOcrPool.POOL.get(lang=lang, use_gpu=use_gpu, use_angle_cls=use_angle_cls)
+        result = PaddleOcrPool.POOL.run_ocr(ocr, img, cls=cls_flag, priority=PaddleOcrPool.PRIO_UPLOAD)
+        text_joined, texts, boxs, scores, avg_conf = PaddleOcrPool.extract_from_paddle_result(result)
+
+        return 200, {
+            "ok": True,
+            "text": text_joined,
+            "texts": texts,
+            "boxs": boxs,
+            "scores": scores,
+            "avg_conf": avg_conf,
+            "lang": lang,
+            "gpu": use_gpu,
+            "source": "body",
+        }
+    except PaddleOcrPool.OcrBusy as e:
+        return 503, {"ok": False, "error": str(e)}
+    except Exception as e:
+        return 500, {"ok": False, "error": str(e)}
+
+
+def stream_changes_only(path: str) -> bool:
+    return parse_qs(urlparse(path).query).get("changes", ["0"])[0] in ("1", "true", "True")
+
+
+def sse_event(item) -> bytes:
+    # one text/event-stream frame for a PayloadStream item, or a keep-alive comment for None
+    if item is None:
+        return b": ping\n\n"
+    event_id, data = item
+    return b"id: %d\nevent: ocr\ndata: %s\n\n" % (event_id, data)
 
 
 class Handler(BaseHTTPRequestHandler):
     def log_message(self, format, *args):
         return
 
-    def _send_json(self, code: int, obj):
-        data = json.dumps(obj, ensure_ascii=False).encode("utf-8")
+    def _send(self, code: int, obj):
+        # JSON unless the request asked for fields= / fmt=msgpack / boxes=i32 (ocr_codec)
+        ctype, data = getattr(self, "_fmt", CODEC.DEFAULT).encode(obj)
         try:
             self.send_response(code)
-            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Type", ctype)
             self.send_header("Content-Length", str(len(data)))
             self.end_headers()
             self.wfile.write(data)
         except (BrokenPipeError, ConnectionAbortedError):
             return
 
-    def do_GET(self):
-        if self.path.startswith("/health"):
-            return self._send_json(200, {"ok": True})
+    def _stream(self):
+        # text/event-stream of poller payloads; ?changes=1 only sends payloads whose text changed
+        sub = ocr_poller.STREAM.subscribe(stream_changes_only(self.path))
+        count_request("GET", self.path, 200 if sub is not None else 503)
+        if sub is None:
+            return self._send(503, {"ok": False, "error": "too_many_subscribers"})
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("X-Accel-Buffering", "no")
+            self.end_headers()
+            self.wfile.write(b"retry: 1000\n\n")
+            self.wfile.flush()
+            while True:
+                self.wfile.write(sse_event(sub.take(CFG.STREAM_PING_S)))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionAbortedError, ConnectionResetError):
+            return
+        finally:
+            ocr_poller.STREAM.unsubscribe(sub)
 
-        if self.path.startswith("/latest"):
-            latest = ocr_poller.get_latest()
-            code = 200 if latest.get("ok") else 503
-            return self._send_json(code, latest)
+    def _parse_format(self):
+        self._fmt = CODEC.ResponseFormat.from_request(parse_qs(urlparse(self.path).query),
+                                                      self.headers.get("Accept", ""))
 
-        return self._send_json(404, {"ok": False, "error": "not_found"})
+    def do_GET(self):
+        self._parse_format()
+        if urlparse(self.path).path.startswith("/stream"):
+            return self._stream()
+        code, obj = get_route(self.path)
+        count_request("GET", self.path, code)
+        return self._send(code, obj)
 
     def do_POST(self):
-        u = urlparse(self.path)
-        if u.path not in ("/ocr", "/ocr_shm"):
-            return self._send_json(404, {"ok": False, "error": "not_found"})
-
-        qs = parse_qs(u.query)
-        lang = (qs.get("lang", ["en"])[0] or "en")
-        use_gpu = qs.get("gpu", ["1"])[0] not in ("0", "false", "False")
-        use_angle_cls = qs.get("angle", ["0"])[0] in ("1", "true", "True")
-        cls_flag = qs.get("cls", ["0"])[0] in ("1", "true", "True")
-
-        if u.path == "/ocr_shm":
-            img, meta_or_err = SHM.read_frame_bgr()
-            if img is None:
-                return self._send_json(503, {"ok": False, "error": meta_or_err})
-
-            try:
-                ocr = PaddleOcrPool.POOL.get(lang=lang, use_gpu=use_gpu, use_angle_cls=use_angle_cls)
-                result = PaddleOcrPool.POOL.run_ocr(ocr, img, cls=cls_flag)
-                text_joined, texts, boxs, scores, avg_conf = PaddleOcrPool.extract_from_paddle_result(result)
-
-                return self._send_json(200, {
-                    "ok": True,
-                    "text": text_joined,
-                    "texts": texts,
-                    "boxs": boxs,
-                    "scores": scores,
-                    "avg_conf": avg_conf,
-                    "lang": lang,
-                    "gpu": use_gpu,
-                    "source": "shm",
-                    "frame": meta_or_err,
-                })
-            except Exception as e:
-                return self._send_json(500, {"ok": False, "error": str(e)})
-
+        self._parse_format()
         length = int(self.headers.get("Content-Length", "0") or 0)
-        if length <= 0:
-            return self._send_json(400, {"ok": False, "error": "empty_body"})
-
-        body = self.rfile.read(length)
-        arr = np.frombuffer(body, dtype=np.uint8)
-        img = cv2.imdecode(arr, cv2.IMREAD_COLOR)
-        if img is None:
-            return self._send_json(400, {"ok": False, "error": "bad_image"})
-
-        try:
-            ocr = PaddleOcrPool.POOL.get(lang=lang, use_gpu=use_gpu, use_angle_cls=use_angle_cls)
-            result = PaddleOcrPool.POOL.run_ocr(ocr, img, cls=cls_flag)
-            text_joined, texts, boxs, scores, avg_conf = PaddleOcrPool.extract_from_paddle_result(result)
-
-            return self._send_json(200, {
-                "ok": True,
-                "text": text_joined,
-                "texts": texts,
-                "boxs": boxs,
-                "scores": scores,
-                "avg_conf": avg_conf,
-                "lang": lang,
-                "gpu": use_gpu,
-                "source": "body",
-            })
-        except Exception as e:
-            return self._send_json(500, {"ok": False, "error": str(e)})
-
-
-def create_server(host: str, port: int):
+        body = self.rfile.read(length) if length > 0 else b""
+        code, obj = post_route(self.path, body)
+        count_request("POST", self.path, code)
+        return self._send(code, obj)
+
+
+def create_server(host: str, port: int, mode: str = None):
+    # "threading": http.server, HTTP/1.0, a thread per request;
+    # "asyncio": ocr_api_async, HTTP/1.1 keep-alive, OCR on an executor
+    mode = mode or CFG.HTTP_SERVER
+    if mode == "asyncio":
+        from core.api.ocr_api_async import AsyncOcrServer
+
+        return AsyncOcrServer(host, port)
+    if mode != "threading":
+        raise ValueError(f"Unknown HTTP server mode: {mode!r} (expected 'threading' or 'asyncio')")
     return ThreadingHTTPServer((host, port), Handler)
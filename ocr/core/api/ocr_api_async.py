@@ -0,0 +1,164 @@
+import asyncio
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlparse, parse_qs
+
+import core.api.ocr_codec as CODEC
+import core.runtime.ocr_config as CFG
+import core.services.ocr_poller as ocr_poller
+from core.api.ocr_api import count_request, get_route, post_route, sse_event, stream_changes_only
+
+_MAX_BODY = 64 * 1024 * 1024
+
+
+def _head(code: int, headers, keep_alive: bool) -> bytes:
+    try:
+        reason = HTTPStatus(code).phrase
+    except ValueError:
+        reason = ""
+    lines = [f"HTTP/1.1 {code} {reason}"]
+    lines += [f"{k}: {v}" for k, v in headers]
+    lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+class AsyncOcrServer:
+    # The OCR API on one asyncio event loop: HTTP/1.1 with keep-alive, so the bridge's
+    # requests.Session reuses one connection. Parsing, routing of cheap GETs and encoding run
+    # on the loop; /ocr and /ocr_shm (which block on the OCR pool) run on an executor, and
+    # /stream subscribers wait for payloads on their own small executor.
+    # Same surface as http.server's servers: server_address, serve_forever(), shutdown().
+    def __init__(self, host: str, port: int, workers: int = None, keepalive_s: float = None):
+        # bound and listening right away, like ThreadingHTTPServer
+        self._sock = socket.create_server((host, port), backlog=128)
+        self.server_address = self._sock.getsockname()[:2]
+        self.keepalive_s = float(CFG.HTTP_KEEPALIVE_S if keepalive_s is None else keepalive_s)
+        self._executor = ThreadPoolExecutor(max_workers=int(workers or CFG.HTTP_WORKERS),
+                                            thread_name_prefix="ocr-http")
+        self._streams = ThreadPoolExecutor(max_workers=max(1, int(CFG.STREAM_MAX_SUBSCRIBERS)),
+                                           thread_name_prefix="ocr-sse")
+        self._loop = None
+        self._stop = None
+        self._ready = threading.Event()
+        self._clients = {}  # task -> writer of each open connection
+        self.connections = 0
+        self.requests = 0
+
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+    def shutdown(self):
+        self._ready.wait()
+        if self._loop is not None and self._stop is not None:
+            self._loop.call_soon_threadsafe(self._stop.set)
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop = asyncio.Event()
+        server = await asyncio.start_server(self._client, sock=self._sock)
+        self._ready.set()
+        async with server:
+            await self._stop.wait()
+            # close open connections so their tasks end on EOF instead of being cancelled by asyncio.run
+            for writer in list(self._clients.values()):
+                writer.close()
+            if self._clients:
+                await asyncio.wait(list(self._clients), timeout=1.0)
+        self._executor.shutdown(wait=False)
+        self._streams.shutdown(wait=False)
+
+    async def _client(self, reader, writer):
+        self.connections += 1
+        task = asyncio.current_task()
+        self._clients[task] = writer
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.keepalive_s)
+                except asyncio.TimeoutError:
+                    return
+                if not line:
+                    return
+                parts = line.decode("latin-1").split()
+                if len(parts) != 3:
+                    writer.write(_head(400, [("Content-Length", "0")], False))
+                    return
+                method, target, version = parts
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+
+                conn = headers.get("connection", "").lower()
+                keep_alive = (conn != "close") if version == "HTTP/1.1" else (conn == "keep-alive")
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    writer.write(_head(411, [("Content-Length", "0")], False))
+                    return
+                length = int(headers.get("content-length", "0") or 0)
+                if length > _MAX_BODY:
+                    writer.write(_head(413, [("Content-Length", "0")], False))
+                    return
+                body = await reader.readexactly(length) if length > 0 else b""
+
+                self.requests += 1
+                fmt = CODEC.ResponseFormat.from_request(parse_qs(urlparse(target).query),
+                                                        headers.get("accept", ""))
+                if method == "GET" and urlparse(target).path.startswith("/stream"):
+                    await self._stream(target, writer)
+                    return
+                if method == "GET":
+                    code, obj = get_route(target)
+                elif method == "POST":
+                    code, obj = await self._loop.run_in_executor(self._executor, post_route, target, body)
+                else:
+                    code, obj = 501, {"ok": False, "error": "unsupported_method"}
+                count_request(method, target, code)
+
+                ctype, data = fmt.encode(obj)
+                writer.write(_head(code, [("Content-Type", ctype), ("Content-Length", str(len(data)))], keep_alive)
+                             + data)
+                await writer.drain()
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError, RuntimeError):
+            # RuntimeError: executors already shut down at interpreter exit
+            return
+        except asyncio.CancelledError:
+            # idle keep-alive connections are cancelled at shutdown; close (below), then let it propagate
+            raise
+        finally:
+            self._clients.pop(task, None)
+            try:
+                writer.close()
+            except Exception:
+                pass
+
+    async def _stream(self, target: str, writer):
+        sub = ocr_poller.STREAM.subscribe(stream_changes_only(target))
+        count_request("GET", target, 200 if sub is not None else 503)
+        if sub is None:
+            ctype, data = CODEC.DEFAULT.encode({"ok": False, "error": "too_many_subscribers"})
+            writer.write(_head(503, [("Content-Type", ctype), ("Content-Length", str(len(data)))], False) + data)
+            await writer.drain()
+            return
+        try:
+            writer.write(_head(200, [
+                ("Content-Type", "text/event-stream; charset=utf-8"),
+                ("Cache-Control", "no-cache"),
+                ("X-Accel-Buffering", "no"),
+            ], False) + b"retry: 1000\n\n")
+            await writer.drain()
+            while True:
+                item = await self._loop.run_in_executor(self._streams, sub.take, CFG.STREAM_PING_S)
+                writer.write(sse_event(item))
+                await writer.drain()
+        finally:
+            ocr_poller.STREAM.unsubscribe(sub)
@@ -0,0 +1,76 @@
+import base64
+import json
+import time
+
+import msgpack
+import numpy as np
+
+import core.runtime.ocr_metrics as M
+
+# Response encodings for the OCR API. JSON stays the default; a client can ask for
+#   fields=text,seq        only these top-level keys ("ok" / "error" are always kept)
+#   fmt=msgpack            MessagePack body (or Accept: application/x-msgpack)
+#   boxes=i32 | list       boxs as packed little-endian int32 [n, 4, 2] (default with msgpack),
+#                          raw bytes in MessagePack and base64 in JSON, marked by boxs_enc="i32le"
+
+JSON_TYPE = "application/json; charset=utf-8"
+MSGPACK_TYPE = "application/x-msgpack"
+_ALWAYS = ("ok", "error")
+
+
+class Raw:
+    # a body that is already encoded (e.g. /metrics text); passed through by every format
+    __slots__ = ("ctype", "data")
+
+    def __init__(self, ctype: str, data: bytes):
+        self.ctype = ctype
+        self.data = data
+
+
+def pack_boxes(boxs) -> bytes:
+    return np.asarray(boxs, dtype="<i4").reshape(-1).tobytes()
+
+
+class ResponseFormat:
+    __slots__ = ("fmt", "fields", "pack")
+
+    def __init__(self, fmt: str = "json", fields=None, pack=None):
+        self.fmt = fmt if fmt in ("json", "msgpack") else "json"
+        self.fields = frozenset(fields) if fields else None
+        self.pack = (self.fmt == "msgpack") if pack is None else bool(pack)
+
+    @classmethod
+    def from_request(cls, qs, accept: str = ""):
+        fmt = (qs.get("fmt", [""])[0] or "").strip().lower()
+        if not fmt:
+            fmt = "msgpack" if MSGPACK_TYPE in (accept or "") else "json"
+        raw = (qs.get("fields", [""])[0] or "").strip()
+        fields = [f.strip() for f in raw.split(",") if f.strip()] if raw else None
+        boxes = (qs.get("boxes", [""])[0] or "").strip().lower()
+        pack = {"i32": True, "list": False}.get(boxes)
+        return cls(fmt, fields, pack)
+
+    def shape(self, obj):
+        if self.fields is not None and isinstance(obj, dict):
+            obj = {k: v for k, v in obj.items() if k in self.fields or k in _ALWAYS}
+        if self.pack and isinstance(obj, dict) and isinstance(obj.get("boxs"), list):
+            packed = pack_boxes(obj["boxs"])
+            obj = dict(obj, boxs=packed if self.fmt == "msgpack" else base64.b64encode(packed).decode("ascii"),
+                       boxs_enc="i32le")
+        return obj
+
+    def encode(self, obj):
+        # -> (content type, body)
+        if isinstance(obj, Raw):
+            return obj.ctype, obj.data
+        t0 = time.perf_counter()
+        obj = self.shape(obj)
+        if self.fmt == "msgpack":
+            out = MSGPACK_TYPE, msgpack.packb(obj, use_bin_type=True)
+        else:
+            out = JSON_TYPE, json.dumps(obj, ensure_ascii=False).encode("utf-8")
+        M.ENCODE.labels(self.fmt).since(t0)
+        return out
+
+
+DEFAULT = ResponseFormat()
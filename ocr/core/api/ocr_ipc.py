@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "shared"))
+
+import core.api.ocr_codec as CODEC
+from core.api.ocr_api import count_request, get_route, post_route
+from setja_ipc import ENC_JSON, ENC_MSGPACK, ENC_OTHER, RESP, IpcServer, default_address, parse  # noqa: F401
+
+# The OCR API over the local transport (shared/setja_ipc.py): the same routes, bodies, fields=
+# and fmt= as HTTP, counted in /metrics. /stream is HTTP only.
+_ENCODINGS = {CODEC.JSON_TYPE: ENC_JSON, CODEC.MSGPACK_TYPE: ENC_MSGPACK}
+
+
+def handle(msg: bytes) -> bytes:
+    # one request frame -> one response frame
+    name, path, body = parse(msg)
+    if name == "GET":
+        code, obj = get_route(path)
+    elif name == "POST":
+        code, obj = post_route(path, body)
+    else:
+        code, obj = 501, {"ok": False, "error": "unsupported_method"}
+    count_request(name, path, code)
+
+    ctype, data = CODEC.ResponseFormat.from_request(parse_qs(urlparse(path).query)).encode(obj)
+    return RESP.pack(code, _ENCODINGS.get(ctype, ENC_OTHER)) + data
+
+
+def serve(address: str) -> IpcServer:
+    # listening on `address` right away, served on a background thread
+    server = IpcServer(address, handle, name="ocr-ipc")
+    server.start()
+    return server
@@ -0,0 +1,156 @@
+import threading
+import time
+
+import core.runtime.ocr_shm as SHM
+
+
+class Frame:
+    __slots__ = ("img", "meta", "error", "fp", "seq", "slot", "t_ready", "acquire_ms")
+
+    def __init__(self, img, meta, error, fp, slot: int, acquire_ms: float):
+        self.img = img
+        self.meta = meta
+        self.error = error
+        self.fp = fp
+        self.seq = meta["seq"] if meta else None
+        self.slot = slot
+        self.t_ready = time.monotonic()
+        self.acquire_ms = acquire_ms
+
+
+class FrameAcquirer:
+    # Acquisition stage of the pipelined poller. A thread reads and converts every newly published
+    # SHM frame into one of three BGR buffers and hands over only the newest (latest-wins: a frame
+    # nobody took yet is replaced, never queued), so the inference stage never waits on SHM reads
+    # or color conversion. `prepare(img, meta, step=None)` runs here as well (the change-detector
+    # fingerprint). With `changed(fp)` given, each frame is first fingerprinted from a borrowed view
+    # subsampled by `view_step`; one that has not changed is handed over without a read (img None).
+    # Buffers: one held by the consumer until release(), one pending, one being written.
+    def __init__(self, wait_ms: float = 500.0, frame_events: bool = True, poll_ms: float = 60.0,
+                 prepare=None, changed=None, view_step: int = 1, max_spin: int = 200):
+        self.wait_ms = float(wait_ms)
+        self.frame_events = bool(frame_events)
+        self.poll_ms = max(1.0, float(poll_ms))
+        self.prepare = prepare
+        self.changed = changed if prepare is not None else None
+        self.view_step = max(1, int(view_step))
+        self.max_spin = max_spin
+        self._buffers = [None, None, None]
+        self._free = [0, 1, 2]
+        self._pending = None
+        self._cond = threading.Condition()
+        self._stop = False
+        self._rescan = False
+        self._busy_ms = 0.0  # time spent reading and fingerprinting, since take_busy_ms()
+        self.frames = 0
+        self.unchanged = 0  # frames handed over without a read
+        self.dropped = 0  # frames replaced before the inference stage took them
+        self.errors = 0
+
+    def start(self):
+        t = threading.Thread(target=self._run, name="ocr-acquire", daemon=True)
+        t.start()
+        return t
+
+    def stop(self):
+        with self._cond:
+            self._stop = True
+            self._cond.notify_all()
+
+    def _wait_new(self, last_seq):
+        if self._rescan:
+            return SHM.frame_seq()
+        if self.frame_events:
+            return SHM.wait_frame(last_seq, self.wait_ms)
+        seq = SHM.frame_seq()
+        if seq is not None and seq == last_seq:
+            time.sleep(self.poll_ms / 1000.0)
+            seq = SHM.frame_seq()
+        return seq
+
+    def _borrow_unchanged(self):
+        # -> (fp, meta) when the current frame matches the last OCR'd one, else (None, None)
+        view, meta = SHM.borrow_frame_bgra(step=self.view_step, max_spin=self.max_spin)
+        if view is None:
+            return None, None
+        fp = self.prepare(view, meta, step=1)
+        del view
+        if not SHM.borrow_still_valid(meta) or self.changed(fp):
+            return None, None
+        del meta["token"]  # pins the mapping
+        return fp, meta
+
+    def _run(self):
+        last_seq = None
+        while not self._stop:
+            seq = self._wait_new(last_seq)
+            rescan, self._rescan = self._rescan, False
+            if seq is not None and seq == last_seq and not rescan:
+                continue  # nothing new
+            t0 = time.perf_counter()
+            if self.changed is not None and not rescan:
+                fp, meta = self._borrow_unchanged()
+                if fp is not None:
+                    fr = Frame(None, meta, None, fp, None, (time.perf_counter() - t0) * 1000.0)
+                    last_seq = fr.seq
+                    self.unchanged += 1
+                    self._publish(fr)
+                    continue
+            with self._cond:
+                slot = self._free.pop()
+            img, meta_or_err = SHM.read_frame_bgr(self.max_spin, out=self._buffers[slot], direct=True)
+            if img is None:
+                with self._cond:
+                    self._free.append(slot)
+                self.errors += 1
+                last_seq = None
+                fr = Frame(None, None, meta_or_err, None, None, (time.perf_counter() - t0) * 1000.0)
+                if seq is not None or not self.frame_events:
+                    # (without a capture, wait_frame has already waited wait_ms)
+                    time.sleep(self.poll_ms / 1000.0)
+            else:
+                self._buffers[slot] = img
+                fp = self.prepare(img, meta_or_err) if self.prepare is not None else None
+                fr = Frame(img, meta_or_err, None, fp, slot, (time.perf_counter() - t0) * 1000.0)
+                last_seq = fr.seq
+                self.frames += 1
+            self._publish(fr)
+
+    def _publish(self, fr: Frame):
+        with self._cond:
+            self._busy_ms += fr.acquire_ms
+            old = self._pending
+            if old is not None:
+                self.dropped += 1
+                if old.slot is not None:
+                    self._free.append(old.slot)
+            self._pending = fr
+            self._cond.notify_all()
+
+    def take(self, timeout_s: float):
+        # -> newest Frame not taken yet, or None after timeout_s; release() it when done
+        with self._cond:
+            if self._pending is None:
+                self._cond.wait_for(lambda: self._pending is not None or self._stop, timeout_s)
+            fr, self._pending = self._pending, None
+            return fr
+
+    def rescan(self):
+        # read the next frame in full even if it looks unchanged or is the same seq: a frame handed
+        # over without a read was checked against a reference the inference stage has since replaced
+        self._rescan = True
+
+    def take_busy_ms(self) -> float:
+        with self._cond:
+            busy, self._busy_ms = self._busy_ms, 0.0
+        return busy
+
+    def release(self, fr: Frame):
+        if fr is not None and fr.slot is not None:
+            with self._cond:
+                self._free.append(fr.slot)
+            fr.slot = None
+            fr.img = None
+
+    def stats(self):
+        return {"frames": self.frames, "unchanged": self.unchanged, "dropped": self.dropped, "errors": self.errors}
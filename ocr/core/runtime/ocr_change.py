@@ -0,0 +1,66 @@
+import time
+
+import numpy as np
+import cv2
+
+
+def thumbnail(img, step: int = 1):
+    # Subsampled copy that keeps every color channel, so red or blue text on a dark background
+    # (nearly flat in any single channel) still shows up. BGRA views are copied as one uint32
+    # per pixel, which costs about as much as the old single-channel gather.
+    v = img[::step, ::step]
+    if v.ndim == 3 and v.shape[2] == 4 and v.strides[2] == 1:
+        return v.view(np.uint32).copy().view(np.uint8)
+    return v[..., :3].copy() if v.ndim == 3 else v.copy()
+
+
+def channel_max(a):
+    # per-pixel max over B, G, R (alpha ignored); 2-D input is returned as is
+    if a.ndim == 2:
+        return a
+    out = np.maximum(a[..., 0], a[..., 1])
+    np.maximum(out, a[..., 2], out=out)
+    return out
+
+
+class FrameChangeDetector:
+    # Cheap "did the region change?" check: a subsampled color thumbnail of the frame, compared
+    # against the thumbnail of the last frame that actually went through OCR. A pixel counts as
+    # changed when any of its channels moved by more than pixel_tol.
+    def __init__(self, step: int = 4, pixel_tol: int = 24, min_pixels: int = 3, refresh_ms: float = 0.0):
+        self.step = max(1, int(step))
+        self.pixel_tol = int(pixel_tol)
+        self.min_pixels = max(1, int(min_pixels))
+        self.refresh_ms = float(refresh_ms)
+        self._ref = None
+        self._ref_key = None
+        self._ref_t = 0.0
+
+    def fingerprint(self, img, meta=None, step: int = None):
+        # img: BGR/BGRA frame or an already subsampled view (pass step=1 then)
+        step = self.step if step is None else max(1, int(step))
+        key = None
+        if meta:
+            key = (meta.get("w"), meta.get("h"), meta.get("left"), meta.get("top"))
+        return key, thumbnail(img, step)
+
+    def commit(self, fp):
+        self._ref_key, self._ref = fp
+        self._ref_t = time.monotonic()
+
+    def reset(self):
+        self._ref = None
+        self._ref_key = None
+
+    def changed(self, fp) -> bool:
+        key, g = fp
+        ref = self._ref
+        if ref is None or key != self._ref_key or g.ndim != ref.ndim or g.shape[:2] != ref.shape[:2]:
+            return True
+        if self.refresh_ms > 0 and (time.monotonic() - self._ref_t) * 1000.0 >= self.refresh_ms:
+            return True
+        if g.ndim == 3 and g.shape[2] != ref.shape[2]:
+            # a BGR thumbnail (full read) against a BGRA one (borrowed view)
+            g, ref = g[..., :3], ref[..., :3]
+        diff = channel_max(cv2.absdiff(g, ref))
+        return int(np.count_nonzero(diff > self.pixel_tol)) >= self.min_pixels
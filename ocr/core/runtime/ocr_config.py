@@ -1,10 +1,120 @@
+import os
+
 HOST = "127.0.0.1"
 PORT = 15188
 
 POLL_INTERVAL_MS = 60
 STABLE_MS = 120
 
+# adaptive poll scheduling (ocr_schedule.PollScheduler): new text -> POLL_MIN_MS, then the delay
+# grows by POLL_BACKOFF per poll up to POLL_INTERVAL_MS (frame moving, same text),
+# POLL_STABLE_MAX_MS (frame unchanged) or POLL_ERROR_MAX_MS (no capture / OCR errors).
+# With FRAME_EVENTS the wait for a new frame comes on top, so an idle capture costs nothing.
+ADAPTIVE_POLL = True
+POLL_MIN_MS = 0
+POLL_STABLE_MAX_MS = 120     # bounds the extra latency before a new subtitle is noticed
+POLL_ERROR_MAX_MS = 2000
+POLL_BACKOFF = 1.5
+POLL_DUTY_BUDGET = 0.6       # max share of wall time the poller spends working (reads, checks, OCR, payloads)
+
+# pipelined poller: frame acquisition (SHM read + BGRA->BGR) and payload building run on their
+# own threads around the OCR stage, newest frame wins; False = one thread does everything in turn
+POLL_PIPELINE = True
+
+# wake the poller on "new frame published" from the capture writer instead of a fixed timer
+FRAME_EVENTS = True
+FRAME_WAIT_TIMEOUT_MS = 500
+
 AUTO_LANG = "en"
 AUTO_GPU = True
 AUTO_ANGLE = False
 AUTO_CLS = False
+
+# change detector in front of OCR: reuse the last payload while the region is unchanged
+SKIP_UNCHANGED = True
+CHANGE_STEP = 4          # thumbnail subsampling (pixels)
+CHANGE_PIXEL_TOL = 24    # per-pixel grey difference treated as noise
+CHANGE_MIN_PIXELS = 3    # changed thumbnail pixels needed to re-run OCR
+CHANGE_REFRESH_MS = 5000 # re-run OCR at least this often anyway, 0 = never
+
+# line-level incremental OCR in the poller (ocr_lines.LineTracker)
+INCREMENTAL_OCR = True
+INCR_REDETECT_EVERY = 30  # frames between forced full detections
+INCR_IOU_MATCH = 0.5      # box overlap that keeps a line ID across detections
+
+# multi-frame fusion of the poller's lines (ocr_fusion.TextFusion): "text"/"texts" become the
+# score-weighted vote over the last FUSION_WINDOW readings of each line, "raw_text" is this frame's
+FUSION = True
+FUSION_WINDOW = 5
+FUSION_MIN_FRAMES = 2     # readings a line needs before it can be stable
+FUSION_AGREE = 0.6        # weight share backing the consensus for a line to be stable
+FUSION_RESET_SIM = 0.5    # a reading less similar than this to the consensus starts a new line
+
+# recognition cache: normalized line-crop hash -> (text, score), 0 disables
+REC_CACHE_MB = 16
+REC_CACHE_HEIGHT = 32
+
+# OCR worker pool: engine instances per config and the bounded request queue in front of them
+OCR_WORKERS = 2
+OCR_QUEUE_DEPTH = 16
+OCR_QUEUE_WAIT_MS = 200  # how long /ocr and /ocr_shm wait for a queue slot before answering busy
+SHM_JOIN_WAIT_MS = 1000  # how long /ocr_shm waits on another caller's inference before running its own
+
+# cross-request micro-batching of recognition (ocr_engine.RecBatcher): crops of concurrent
+# requests that reach recognition while every engine is busy go through one recognizer call
+REC_BATCH = True
+REC_BATCH_WINDOW_MS = 4   # extra time a picked-up batch waits for requests still in detection
+REC_BATCH_MAX = 32        # crops per recognizer call
+
+# fixed-layout mode for region frames (/ocr_shm, poller without INCREMENTAL_OCR): learn the text
+# line rows per setja_region.json + frame size and recognize them without running the detector.
+# Opt-in until it is verified on the real engine
+FIXED_LAYOUT = False
+LAYOUT_MIN_HITS = 2         # detections that must agree on a line row before it is trusted
+LAYOUT_REDETECT_EVERY = 60  # frames between forced detections
+LAYOUT_MIN_CONF = 0.8       # mean recognition score below this re-runs detection on the frame
+LAYOUT_INK_TOL = 40         # horizontal gradient that counts as text ink
+
+# preprocessing ahead of the detector: crop to the text rows, shrink large text, size the
+# detector input from the region, never above the engine's det limit (boxes are mapped back,
+# recognition uses the original frame). Opt-in until it is measured on the real engine
+PREPROCESS = False
+PREPROC_TEXT_HEIGHT = 32     # target ink height in px; text is only ever shrunk
+PREPROC_MARGIN = 12          # px kept around the text rows/columns
+PREPROC_INK_TOL = 24         # horizontal gradient that counts as text ink
+
+# OCR engine backend: "paddle" (PaddleOCR, CPU/GPU) or "onnx" (ONNX Runtime, CPU only)
+OCR_BACKEND = "paddle"
+# PP-OCR inference models exported with paddle2onnx, plus the recognizer's character dict
+ONNX_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "models", "onnx")
+ONNX_DET_MODEL = "det.onnx"
+ONNX_REC_MODEL = "rec.onnx"
+ONNX_CLS_MODEL = "cls.onnx"    # only loaded when angle classification is requested
+ONNX_REC_DICT = "en_dict.txt"
+ONNX_THREADS = 0               # intra-op threads per engine, 0 = ONNX Runtime default
+
+# start-up: listen right away ("warming"), load the engines and run synthetic frames before "ready"
+WARMUP = True
+WARMUP_RUNS = 2          # full det+rec passes per worker engine
+WARMUP_WIDTH = 1280      # synthetic frame size, roughly a subtitle region
+WARMUP_HEIGHT = 200
+
+# engine registry: groups are keyed by the model actually built (always English), and idle ones are
+# evicted least-recently-used first while the estimated engine memory is over budget
+ENGINE_MEM_BUDGET_MB = 4096  # 0 = never evict
+ENGINE_MIN_IDLE_S = 30       # a group must be unused this long before it can be evicted
+
+# GET /stream: server-sent events with each poller payload (latest-only per subscriber)
+STREAM_MAX_SUBSCRIBERS = 16
+STREAM_PING_S = 15.0         # comment line sent when idle, so dead clients are noticed
+
+# HTTP server: "threading" (http.server, HTTP/1.0, one thread and connection per request) or,
+# opt-in, "asyncio" (HTTP/1.1 keep-alive, one event loop, OCR on HTTP_WORKERS threads)
+HTTP_SERVER = "threading"
+HTTP_WORKERS = 32
+HTTP_KEEPALIVE_S = 30.0      # idle keep-alive connections are closed after this
+
+# local IPC next to HTTP (ocr_ipc): the same routes as length-prefixed frames over a Unix socket,
+# or a named pipe on Windows; the bridge uses it with BridgeConfig.transport = "ipc". Off unless
+# set (e.g. setja_ipc.default_address("ocr")); clients must hold the key from setja_ipc.authkey()
+IPC_ADDRESS = None
@@ -1,5 +1,25 @@
+import hashlib
+import itertools
+import os
+import queue
+import sys
 import threading
-from paddleocr import PaddleOCR
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import cv2
+
+try:
+    import psutil
+except ImportError:  # engine memory is then estimated from peak RSS
+    psutil = None
+
+import core.runtime.ocr_config as CFG
+import core.runtime.ocr_metrics as M
+from core.runtime.ocr_layout import FixedLayout, region_ltrb
+from core.runtime.ocr_preprocess import Preprocessor, det_limit, own_det_limit
 
 _LANG_ALIASES = {
     "ar": "arabic",
@@ -25,52 +45,819 @@ _LANG_ALIASES = {
     "chinese_cht": "chinese_cht",
 }
 
+def sorted_boxes(dt_boxes):
+    # same reading order as PaddleOCR's TextSystem: top to bottom, then left to right per row
+    boxes = sorted((np.asarray(b, dtype=np.float32) for b in dt_boxes), key=lambda b: (b[0][1], b[0][0]))
+    for i in range(len(boxes) - 1):
+        for j in range(i, -1, -1):
+            if abs(boxes[j + 1][0][1] - boxes[j][0][1]) < 10 and boxes[j + 1][0][0] < boxes[j][0][0]:
+                boxes[j], boxes[j + 1] = boxes[j + 1], boxes[j]
+            else:
+                break
+    return boxes
+
+
+def crop_box(img, box):
+    # perspective crop of a 4-point text box (PaddleOCR get_rotate_crop_image)
+    pts = np.asarray(box, dtype=np.float32)
+    w = int(max(np.linalg.norm(pts[0] - pts[1]), np.linalg.norm(pts[2] - pts[3])))
+    h = int(max(np.linalg.norm(pts[0] - pts[3]), np.linalg.norm(pts[1] - pts[2])))
+    w = max(1, w)
+    h = max(1, h)
+    dst = np.float32([[0, 0], [w, 0], [w, h], [0, h]])
+    m = cv2.getPerspectiveTransform(pts, dst)
+    crop = cv2.warpPerspective(img, m, (w, h), borderMode=cv2.BORDER_REPLICATE, flags=cv2.INTER_CUBIC)
+    if h * 1.0 / w >= 1.5:
+        crop = np.rot90(crop)
+    return crop
+
+
+def crop_hash(crop, height: int = 32, cls: bool = False) -> bytes:
+    # normalized line-crop key: grey, fixed height, Otsu text mask (ignores background/noise levels)
+    g = crop if crop.ndim == 2 else cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    h, w = g.shape[:2]
+    nw = max(1, int(round(w * height / float(max(1, h)))))
+    g = cv2.resize(g, (nw, height), interpolation=cv2.INTER_AREA)
+    _, mask = cv2.threshold(g, 0, 1, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    d = hashlib.blake2b(digest_size=16)
+    d.update(b"c" if cls else b"-")
+    d.update(nw.to_bytes(4, "little"))
+    d.update(np.packbits(mask).tobytes())
+    return d.digest()
+
+
+class RecCache:
+    # LRU of crop_hash -> (text, score), bounded by approximate memory
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._d = OrderedDict()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _cost(k, v) -> int:
+        return sys.getsizeof(k) + sys.getsizeof(v[0]) + 64
+
+    def get(self, k):
+        with self._lock:
+            v = self._d.get(k)
+            if v is None:
+                self.misses += 1
+                return None
+            self._d.move_to_end(k)
+            self.hits += 1
+            return v
+
+    def set(self, k, v):
+        if self.max_bytes <= 0:
+            return
+        with self._lock:
+            old = self._d.pop(k, None)
+            if old is not None:
+                self.bytes -= self._cost(k, old)
+            self._d[k] = v
+            self.bytes += self._cost(k, v)
+            while self.bytes > self.max_bytes and self._d:
+                ok, ov = self._d.popitem(last=False)
+                self.bytes -= self._cost(ok, ov)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._d),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / total) if total else 0.0,
+                "evictions": self.evictions,
+            }
+
+
+# job priorities: lower runs first
+PRIO_POLLER = 0   # background poller, latency critical
+PRIO_SHM = 1      # /ocr_shm (bridge)
+PRIO_UPLOAD = 2   # ad-hoc /ocr uploads
+_PRIO_STOP = 99
+
+
+class OcrBusy(RuntimeError):
+    # the engine queue is full (or its group was just evicted); the caller should answer "busy"
+    # instead of piling up
+    pass
+
+
+_PRIO_NAMES = {PRIO_POLLER: "poller", PRIO_SHM: "shm", PRIO_UPLOAD: "upload"}
+
+
+class _Job:
+    __slots__ = ("prio", "seq", "fn", "future", "t_submit")
+
+    def __init__(self, prio: int, seq: int, fn, future):
+        self.prio = prio
+        self.seq = seq
+        self.fn = fn
+        self.future = future
+        self.t_submit = time.perf_counter()
+
+    def __lt__(self, other):
+        return (self.prio, self.seq) < (other.prio, other.seq)
+
+
+class OcrWorker(threading.Thread):
+    # owns one engine instance; runs jobs from its group's queue one at a time
+    def __init__(self, group, index: int, engine):
+        super().__init__(name=f"ocr-worker-{index}", daemon=True)
+        self.group = group
+        self.index = index
+        self.engine = engine
+        self.jobs = 0
+        self.errors = 0
+        self.last_error = None
+        self.last_ms = 0.0
+        self.total_ms = 0.0
+        self._busy_since = None
+
+    def run(self):
+        q = self.group.queue
+        while True:
+            job = q.get()
+            if job.fn is None:
+                self.engine = None  # evicted / closed: let the model go
+                return
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            t0 = time.perf_counter()
+            M.QUEUE_WAIT.labels(_PRIO_NAMES.get(job.prio, str(job.prio))).observe(t0 - job.t_submit)
+            self._busy_since = t0
+            try:
+                job.future.set_result(job.fn(self.engine))
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                job.future.set_exception(e)
+            finally:
+                self._busy_since = None
+                self.last_ms = (time.perf_counter() - t0) * 1000.0
+                self.total_ms += self.last_ms
+                self.jobs += 1
+
+    @property
+    def busy(self) -> bool:
+        return self._busy_since is not None
+
+    def health(self):
+        busy_since = self._busy_since
+        return {
+            "index": self.index,
+            "alive": self.is_alive(),
+            "state": "busy" if busy_since is not None else "idle",
+            "busy_ms": round((time.perf_counter() - busy_since) * 1000.0, 1) if busy_since is not None else 0.0,
+            "jobs": self.jobs,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_ms": round(self.last_ms, 2),
+            "avg_ms": round(self.total_ms / self.jobs, 2) if self.jobs else 0.0,
+        }
+
+
+class _RecBatch:
+    __slots__ = ("crops", "cls", "callers", "results", "error", "done")
+
+    def __init__(self, crops, cls: bool):
+        self.crops = list(crops)
+        self.cls = cls
+        self.callers = 1
+        self.results = None
+        self.error = None
+        self.done = False
+
+
+class RecBatcher:
+    # Cross-request micro-batching of recognition (group commit), outside the engine workers. The
+    # first caller to reach recognition opens a batch and queues it on the group's workers right
+    # away; callers arriving while it waits for a free engine add their crops to it. The worker
+    # that picks it up closes it (after holding it up to window_ms more while announce()d callers
+    # are still detecting), runs one recognizer call, and every caller takes its own slice. So a
+    # batch grows exactly while all engines are busy, can hold every concurrent request however
+    # many workers there are, and an idle engine never waits for one.
+    def __init__(self, enabled: bool, window_ms: float, max_crops: int):
+        self.enabled = bool(enabled)
+        self.window_s = max(0.0, float(window_ms)) / 1000.0
+        self.max_crops = max(1, int(max_crops))
+        self._cond = threading.Condition()
+        self._open = {}      # cls -> queued batch still taking crops
+        self._incoming = 0   # announced callers that have not reached recognition yet
+        self.batches = 0
+        self.crops = 0
+        self.merged = 0
+        self.largest = 0
+
+    def announce(self):
+        with self._cond:
+            self._incoming += 1
+
+    def withdraw(self):
+        # an announced caller that will not come (detection failed, nothing to recognize)
+        with self._cond:
+            self._incoming -= 1
+            self._cond.notify_all()
+
+    def run(self, group, crops, cls: bool, priority: int, announced: bool = False):
+        if not self.enabled:
+            if announced:
+                self.withdraw()
+            return group.call(lambda engine: recognize_on(engine, crops, cls), priority)
+
+        with self._cond:
+            if announced:
+                self._incoming -= 1
+            b = self._open.get(cls)
+            if b is not None and len(b.crops) + len(crops) <= self.max_crops:
+                start = len(b.crops)
+                b.crops.extend(crops)
+                b.callers += 1
+                self._cond.notify_all()
+                return self._wait(b, start, len(crops))
+            b = _RecBatch(crops, cls)
+            self._open[cls] = b
+
+        try:
+            group.submit(lambda engine: self._run_batch(engine, b), priority)
+        except Exception as e:
+            with self._cond:
+                self._finish_locked(b, None, e)
+        with self._cond:
+            return self._wait(b, 0, len(crops))
+
+    def _wait(self, b: _RecBatch, start: int, n: int):
+        # under self._cond
+        while not b.done:
+            self._cond.wait()
+        if b.error is not None:
+            raise b.error
+        return b.results[start:start + n]
+
+    def _run_batch(self, engine, b: _RecBatch):
+        # on the worker that picked the batch up
+        with self._cond:
+            deadline = time.perf_counter() + self.window_s
+            while len(b.crops) < self.max_crops and self._incoming > 0:
+                rest = deadline - time.perf_counter()
+                if rest <= 0:
+                    break
+                self._cond.wait(rest)
+            if self._open.get(b.cls) is b:
+                del self._open[b.cls]
+            crops = list(b.crops)
+        results, error = None, None
+        try:
+            results = recognize_on(engine, crops, b.cls)
+        except Exception as e:
+            error = e
+        with self._cond:
+            self._finish_locked(b, results, error)
+
+    def _finish_locked(self, b: _RecBatch, results, error):
+        if self._open.get(b.cls) is b:
+            del self._open[b.cls]
+        b.results, b.error, b.done = results, error, True
+        self.batches += 1
+        self.crops += len(b.crops)
+        self.merged += b.callers - 1
+        self.largest = max(self.largest, len(b.crops))
+        self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "window_ms": self.window_s * 1000.0,
+                "max_crops": self.max_crops,
+                "batches": self.batches,
+                "crops": self.crops,
+                "merged_requests": self.merged,
+                "avg_batch": round(self.crops / self.batches, 2) if self.batches else 0.0,
+                "largest": self.largest,
+            }
+
+
+def recognize_on(engine, crops, cls: bool):
+    # (angle classifier +) recognizer on one engine: [(text, score)] in crop order
+    if cls and getattr(engine, "use_angle_cls", False):
+        crops, _, _ = engine.text_classifier(crops)
+    rec_res, _ = engine.text_recognizer(crops)
+    return [(str(t), float(sc)) for t, sc in rec_res]
+
+
+class OcrWorkerGroup:
+    # N engine instances for one (lang, gpu, angle) config behind one bounded priority queue.
+    # This is what PaddleOcrPool.get() hands out; pass it back to run_ocr/detect/recognize.
+    def __init__(self, key, engines, queue_depth: int, batch: bool = False, batch_window_ms: float = 0.0,
+                 batch_max: int = 32):
+        self.key = key
+        self.queue_depth = max(1, int(queue_depth))
+        self.queue = queue.PriorityQueue(maxsize=self.queue_depth)
+        self.rejected = 0
+        self._seq = itertools.count()
+        self._state = threading.Condition()
+        self._submitting = 0
+        self.closed = False
+        self.engine_bytes = [0] * len(engines)
+        self.created = time.monotonic()
+        self.last_used = self.created
+        self.requested = set()  # lang names that were asked for and landed on this model
+        self.use_angle_cls = bool(getattr(engines[0], "use_angle_cls", key[2]))
+        self.drop_score = float(getattr(engines[0], "drop_score", 0.5))
+        self.workers = [OcrWorker(self, i, e) for i, e in enumerate(engines)]
+        self.batcher = RecBatcher(batch, batch_window_ms, batch_max)
+        for w in self.workers:
+            w.start()
+
+    def submit(self, fn, priority: int = PRIO_UPLOAD) -> Future:
+        fut = Future()
+        job = _Job(int(priority), next(self._seq), fn, fut)
+        with self._state:
+            if self.closed:
+                # evicted between POOL.get() and here; the caller can simply retry
+                raise OcrBusy("ocr_engine_evicted")
+            self._submitting += 1
+        try:
+            if priority <= PRIO_POLLER:
+                # the poller never gets rejected: it waits for a slot and then jumps the queue
+                self.queue.put(job)
+                return fut
+            try:
+                self.queue.put(job, timeout=max(0.0, CFG.OCR_QUEUE_WAIT_MS) / 1000.0)
+            except queue.Full:
+                self.rejected += 1
+                raise OcrBusy("ocr_busy") from None
+            return fut
+        finally:
+            with self._state:
+                self._submitting -= 1
+                self._state.notify_all()
+
+    def busy_workers(self) -> int:
+        return sum(1 for w in self.workers if w.busy)
+
+    def call(self, fn, priority: int = PRIO_UPLOAD):
+        return self.submit(fn, priority).result()
+
+    @property
+    def mem_bytes(self) -> int:
+        return sum(self.engine_bytes)
+
+    def idle_for(self, now: float) -> float:
+        # seconds since last handed out, or 0 while it still has work
+        if self.queue.qsize() or self.busy_workers():
+            return 0.0
+        return max(0.0, now - self.last_used)
+
+    def close(self):
+        with self._state:
+            if self.closed:
+                return
+            self.closed = True
+            # stop jobs sort after everything already queued; wait for puts still in progress
+            while self._submitting:
+                self._state.wait()
+        for _ in self.workers:
+            self.queue.put(_Job(_PRIO_STOP, next(self._seq), None, None))
+
+    def health(self):
+        lang, gpu, angle = self.key
+        return {
+            "lang": lang,
+            "gpu": gpu,
+            "angle": angle,
+            "queued": self.queue.qsize(),
+            "queue_depth": self.queue_depth,
+            "rejected": self.rejected,
+            "requested_as": sorted(self.requested),
+            "mem_mb": round(self.mem_bytes / 1048576.0, 1),
+            "idle_s": round(self.idle_for(time.monotonic()), 1),
+            "rec_batch": self.batcher.stats(),
+            "workers": [w.health() for w in self.workers],
+        }
+
+
+# engine backends: anything with text_detector / text_recognizer / text_classifier / ocr() /
+# drop_score / use_angle_cls in PaddleOCR's shapes can sit behind the pool
+def _new_paddle_engine(pool, use_gpu: bool, use_angle_cls: bool):
+    from paddleocr import PaddleOCR
+
+    # قمنا بتثبيت lang="en" لضمان الحصول على النسخة الإنجليزية فقط كما طلبت
+    return PaddleOCR(
+        use_angle_cls=use_angle_cls,
+        lang="en",
+        use_gpu=use_gpu,
+        show_log=pool._show_log,
+        rec_model_dir=None,
+        det_model_dir=None
+    )
+
+
+def _new_onnx_engine(pool, use_gpu: bool, use_angle_cls: bool):
+    # CPU only; use_gpu is ignored
+    from core.runtime.ocr_onnx import OnnxOCR
+
+    def model(name):
+        return os.path.join(CFG.ONNX_MODEL_DIR, name) if name else None
+
+    return OnnxOCR(
+        det_model=model(CFG.ONNX_DET_MODEL),
+        rec_model=model(CFG.ONNX_REC_MODEL),
+        rec_dict=model(CFG.ONNX_REC_DICT),
+        cls_model=model(CFG.ONNX_CLS_MODEL),
+        use_angle_cls=use_angle_cls,
+        threads=CFG.ONNX_THREADS,
+    )
+
+
+_BACKENDS = {
+    "paddle": _new_paddle_engine,
+    "onnx": _new_onnx_engine,
+}
+# backends whose engines honour use_gpu; the rest build the same CPU model either way
+_GPU_BACKENDS = ("paddle",)
+# every backend factory builds the English models, whatever lang was asked for
+_MODEL_LANG = "en"
+
+
+def _rss_bytes() -> int:
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        import resource
+
+        # peak, not current, RSS (KiB on Linux); good enough for the growth caused by a new model
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return 0
+
+
+def import_backend(backend: str):
+    # the heavy imports, paid once up front instead of inside the first request
+    if backend == "paddle":
+        import paddle
+
+        try:
+            paddle.set_flags({"FLAGS_enable_pir_api": 0, "FLAGS_enable_pir_in_executor": 0})
+        except Exception:
+            pass
+        import paddleocr  # noqa: F401
+    elif backend == "onnx":
+        import onnxruntime  # noqa: F401
+
+
+def engine_device(backend: str, use_gpu: bool) -> str:
+    # where a group's engines actually run: PaddleOCR quietly uses the CPU on a build without CUDA
+    if not use_gpu or backend not in _GPU_BACKENDS:
+        return "CPU"
+    try:
+        import paddle
+
+        return "GPU" if paddle.device.is_compiled_with_cuda() else "CPU"
+    except Exception:
+        return "GPU"
+
+
+def warmup_image(width: int, height: int):
+    # a subtitle-like frame: two lines of light text on a dark band
+    img = np.full((height, width, 3), 24, dtype=np.uint8)
+    scale = max(0.5, height / 160.0)
+    thick = max(1, int(round(scale * 2)))
+    for i, text in enumerate(("Warming up the text detector", "and the recognizer, 0123456789.")):
+        (tw, th), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, scale, thick)
+        y = int(height * (0.4 + 0.35 * i))
+        cv2.putText(img, text, (max(0, (width - tw) // 2), y), cv2.FONT_HERSHEY_SIMPLEX, scale,
+                    (235, 235, 235), thick, cv2.LINE_AA)
+    return img
+
+
 class PaddleOcrPool:
-    def __init__(self, show_log: bool = False):
-        self._cache = {}
+    def __init__(self, show_log: bool = False, rec_cache: RecCache = None, size: int = 1, queue_depth: int = 16,
+                 batch: bool = False, batch_window_ms: float = 0.0, batch_max: int = 32,
+                 preprocessor: Preprocessor = None, backend: str = "paddle", mem_budget_mb: float = 0.0,
+                 min_idle_s: float = 30.0):
+        if backend not in _BACKENDS:
+            raise ValueError(f"Unknown OCR backend: {backend!r} (expected one of {sorted(_BACKENDS)})")
+        self.backend = backend
+        # engine registry: effective model key -> OcrWorkerGroup, least recently used first
+        self._cache = OrderedDict()
+        self.mem_budget = max(0.0, float(mem_budget_mb)) * 1048576.0
+        self.min_idle_s = max(0.0, float(min_idle_s))
+        self._mem_total = 0
+        self.evicted = 0
         self._lock = threading.Lock()
+        # model key -> Future of a group being built; engines are built outside _lock, so /health
+        # and requests for other models never wait on a model load
+        self._building = {}
         self._show_log = show_log
-        self._run_lock = threading.Lock()
+        self.rec_cache = rec_cache
+        self.size = max(1, int(size))
+        self.queue_depth = max(1, int(queue_depth))
+        self.batch = bool(batch)
+        self.batch_window_ms = max(0.0, float(batch_window_ms))
+        self.batch_max = max(1, int(batch_max))
+        self._layouts = OrderedDict()
+        self._layouts_lock = threading.Lock()
+        self.preprocessor = preprocessor
+
+    def _new_engine(self, use_gpu: bool, use_angle_cls: bool):
+        return _BACKENDS[self.backend](self, use_gpu, use_angle_cls)
+
+    def model_key(self, use_gpu: bool, use_angle_cls: bool):
+        # what actually gets built, so requests that differ only in lang (or gpu on a CPU backend) share it
+        return (_MODEL_LANG, bool(use_gpu) and self.backend in _GPU_BACKENDS, bool(use_angle_cls))
 
     def get(self, lang: str, use_gpu: bool, use_angle_cls: bool):
         # توحيد اسم اللغة بناءً على القاموس أعلاه
         lang = (lang or "en").strip().lower()
         lang = _LANG_ALIASES.get(lang, lang)
-        key = (lang, bool(use_gpu), bool(use_angle_cls))
+        key = self.model_key(use_gpu, use_angle_cls)
+        now = time.monotonic()
+
+        while True:
+            with self._lock:
+                # التأكد من وجود الكائن في الكاش
+                group = self._cache.get(key)
+                if group is not None:
+                    self._cache.move_to_end(key)
+                    group.last_used = now
+                    if len(group.requested) < 16:
+                        group.requested.add(lang)
+                    evicted = self._evict_locked(key, now) if self.mem_budget and self._mem_total > self.mem_budget else []
+                    break
+                # reserve the key: the first caller builds, the others wait for its result
+                pending = self._building.get(key)
+                build = pending is None
+                if build:
+                    pending = self._building[key] = Future()
+            if build:
+                self._build(key, pending)
+            else:
+                pending.result()  # re-raises the builder's error
 
+        for g in evicted:
+            g.close()
+        return group
+
+    def _build(self, key, pending: Future):
+        try:
+            # every worker gets its own engine (separate predictors, no shared run lock)
+            engines, sizes = [], []
+            for _ in range(self.size):
+                before = _rss_bytes()
+                engines.append(self._new_engine(key[1], key[2]))
+                sizes.append(max(0, _rss_bytes() - before))
+            group = OcrWorkerGroup(key, engines, self.queue_depth, self.batch, self.batch_window_ms,
+                                   self.batch_max)
+            group.engine_bytes = sizes
+        except BaseException as e:
+            with self._lock:
+                del self._building[key]
+            pending.set_exception(e)
+            raise
+        with self._lock:
+            del self._building[key]
+            self._cache[key] = group
+            self._mem_total += group.mem_bytes
+        pending.set_result(group)
+
+    def _evict_locked(self, keep, now: float):
+        # least recently used idle groups go first until the registry fits the budget again
+        out = []
+        for key, g in list(self._cache.items()):
+            if self._mem_total <= self.mem_budget:
+                break
+            if key == keep or g.idle_for(now) < self.min_idle_s:
+                continue
+            del self._cache[key]
+            self._mem_total -= g.mem_bytes
+            self.evicted += 1
+            out.append(g)
+        return out
+
+    def health(self):
+        with self._lock:
+            groups = list(self._cache.values())
+            building = len(self._building)
+        with self._layouts_lock:
+            layouts = list(self._layouts.values())
+        return {
+            "backend": self.backend,
+            "size": self.size,
+            "queue_depth": self.queue_depth,
+            "registry": {
+                "engines": sum(len(g.workers) for g in groups),
+                "building": building,
+                "mem_mb": round(sum(g.mem_bytes for g in groups) / 1048576.0, 1),
+                "budget_mb": round(self.mem_budget / 1048576.0, 1),
+                "min_idle_s": self.min_idle_s,
+                "evicted": self.evicted,
+            },
+            "groups": [g.health() for g in groups],
+            "layouts": [dict(l.stats(), region=l.key[0], frame=list(l.key[1:])) for l in layouts],
+            "preprocess": self.preprocessor.stats() if self.preprocessor is not None else None,
+        }
+
+    def warm_up(self, ocr: OcrWorkerGroup, img_bgr, cls: bool = False, runs: int = 1):
+        # one full det(+cls)+rec pass on every worker's engine, so graph building, kernel selection
+        # and allocator growth happen here rather than in the first real request
+        n = len(ocr.workers)
+        for _ in range(max(1, int(runs))):
+            # each job holds its worker at the barrier, so every worker takes exactly one
+            barrier = threading.Barrier(n)
+
+            def job(engine):
+                barrier.wait(timeout=60.0)
+                return engine.ocr(img_bgr, cls=bool(cls))
+
+            futs = [ocr.submit(job, PRIO_POLLER) for _ in range(n)]
+            for f in futs:
+                f.result()
+
+    def close(self):
         with self._lock:
-            # التأكد من وجود الكائن في الكاش
-            ocr_instance = self._cache.get(key)
-            if ocr_instance is not None:
-                return ocr_instance
-
-            # التعديل الأساسي: إنشاء الكائن في متغير محلي أولاً ثم تخزينه
-            # قمنا بتثبيت lang="en" لضمان الحصول على النسخة الإنجليزية فقط كما طلبت
-            ocr_instance = PaddleOCR(
-                use_angle_cls=use_angle_cls, 
-                lang="en", 
-                use_gpu=use_gpu, 
-                show_log=self._show_log,
-                rec_model_dir=None,
-                det_model_dir=None
-            )
-            
-            self._cache[key] = ocr_instance
-            return ocr_instance
-
-    def run_ocr(self, ocr: PaddleOCR, img_bgr, cls: bool):
-        with self._run_lock:
-            # تأكد أن ocr ليس None قبل التشغيل
-            if ocr is None:
-                raise ValueError("OCR engine is not initialized. Check your configurations.")
-            return ocr.ocr(img_bgr, cls=bool(cls))
-
-
-def extract_from_paddle_result(result):
+            groups = list(self._cache.values())
+            self._cache.clear()
+            self._mem_total = 0
+        for g in groups:
+            g.close()
+
+    def run_ocr(self, ocr: OcrWorkerGroup, img_bgr, cls: bool, priority: int = PRIO_UPLOAD, layout: bool = False):
+        # تأكد أن ocr ليس None قبل التشغيل
+        if ocr is None:
+            raise ValueError("OCR engine is not initialized. Check your configurations.")
+        if layout:
+            # frames of the selected capture region: fixed-layout mode
+            return ocr.call(lambda engine: self._run_ocr_layout(ocr, engine, img_bgr, cls), priority)
+        if ocr.batcher.enabled:
+            return self._run_ocr_batched(ocr, img_bgr, cls, priority)
+        if (self.rec_cache is not None and self.rec_cache.max_bytes > 0) or self.preprocessor is not None:
+            return ocr.call(lambda engine: self._run_ocr_split(engine, img_bgr, cls), priority)
+        return ocr.call(lambda engine: engine.ocr(img_bgr, cls=bool(cls)), priority)
+
+    def _run_ocr_split(self, engine, img_bgr, cls: bool):
+        # det -> crops -> cache / recognizer, same output shape as PaddleOCR.ocr (runs on a worker)
+        boxes = self._detect(engine, img_bgr)
+        rec = self._recognize(engine, [crop_box(img_bgr, b) for b in boxes], cls)
+        return self._result(engine, boxes, rec)
+
+    def _run_ocr_batched(self, group, img_bgr, cls: bool, priority: int):
+        # detection is one worker job; recognition joins the group's batch from this thread, so the
+        # worker is free for the next request's detection meanwhile
+        group.batcher.announce()
+        try:
+            boxes = group.call(lambda engine: self._detect(engine, img_bgr), priority)
+        except BaseException:
+            group.batcher.withdraw()
+            raise
+        rec = self._recognize_batched(group, [crop_box(img_bgr, b) for b in boxes], cls, priority, announced=True)
+        return self._result(group, boxes, rec)
+
+    @staticmethod
+    def _result(engine, boxes, rec):
+        # engine: an engine or its OcrWorkerGroup (both carry drop_score)
+        drop_score = getattr(engine, "drop_score", 0.5)
+        lines = [[b.tolist(), r] for b, r in zip(boxes, rec) if r[1] >= drop_score]
+        return [lines or None]
+
+    def _layout_for(self, img_bgr) -> FixedLayout:
+        h, w = img_bgr.shape[:2]
+        key = (region_ltrb(), w, h)
+        with self._layouts_lock:
+            lay = self._layouts.get(key)
+            if lay is None:
+                lay = FixedLayout(
+                    key,
+                    min_hits=CFG.LAYOUT_MIN_HITS,
+                    redetect_every=CFG.LAYOUT_REDETECT_EVERY,
+                    ink_tol=CFG.LAYOUT_INK_TOL,
+                )
+                self._layouts[key] = lay
+                while len(self._layouts) > 4:
+                    self._layouts.popitem(last=False)
+            else:
+                self._layouts.move_to_end(key)
+            return lay
+
+    def _run_ocr_layout(self, group, engine, img_bgr, cls: bool):
+        # recognition only on the learned line bands; the detector runs to learn the layout,
+        # periodically, when text shows up outside the known bands or when confidence drops
+        lay = self._layout_for(img_bgr)
+        with lay.lock:
+            boxes = lay.plan(img_bgr)
+        if boxes is not None:
+            rec = self._recognize(engine, [crop_box(img_bgr, b) for b in boxes], cls)
+            scores = [sc for _, sc in rec]
+            drop_score = getattr(engine, "drop_score", 0.5)
+            if not scores or (min(scores) >= drop_score and sum(scores) / len(scores) >= CFG.LAYOUT_MIN_CONF):
+                return self._result(engine, boxes, rec)
+            with lay.lock:
+                lay.invalidate()
+
+        boxes = self._detect(engine, img_bgr)
+        with lay.lock:
+            lay.learn(boxes, img_bgr.shape[0])
+        rec = self._recognize(engine, [crop_box(img_bgr, b) for b in boxes], cls)
+        return self._result(engine, boxes, rec)
+
+    def detect(self, ocr: OcrWorkerGroup, img_bgr, priority: int = PRIO_UPLOAD):
+        if ocr is None:
+            raise ValueError("OCR engine is not initialized. Check your configurations.")
+        return ocr.call(lambda engine: self._detect(engine, img_bgr), priority)
+
+    def recognize(self, ocr: OcrWorkerGroup, crops, cls: bool = False, priority: int = PRIO_UPLOAD):
+        if ocr is None:
+            raise ValueError("OCR engine is not initialized. Check your configurations.")
+        crops = list(crops)
+        if not crops:
+            return []
+        if ocr.batcher.enabled:
+            return self._recognize_batched(ocr, crops, cls, priority)
+        return ocr.call(lambda engine: self._recognize(engine, crops, cls), priority)
+
+    def _detect(self, engine, img_bgr):
+        t0 = time.perf_counter()
+        try:
+            return self._detect_boxes(engine, img_bgr)
+        finally:
+            M.DETECT.since(t0)
+
+    def _detect_boxes(self, engine, img_bgr):
+        prep = None
+        det_img = img_bgr
+        if self.preprocessor is not None:
+            prep = self.preprocessor.prepare(img_bgr, own_det_limit(engine))
+            det_img = prep.img
+        with det_limit(engine, prep.det_limit if prep is not None else 0):
+            dt_boxes, _ = engine.text_detector(det_img)
+        if dt_boxes is None or len(dt_boxes) == 0:
+            return []
+        if prep is not None:
+            h, w = img_bgr.shape[:2]
+            dt_boxes = prep.to_frame(dt_boxes, w, h)
+        return sorted_boxes(dt_boxes)
+
+    def _recognize(self, engine, crops, cls: bool):
+        # on a worker, with its engine
+        cls = bool(cls and getattr(engine, "use_angle_cls", False))
+        return self._cached(crops, cls, lambda todo: recognize_on(engine, todo, cls))
+
+    def _recognize_batched(self, group, crops, cls: bool, priority: int, announced: bool = False):
+        # in the caller's thread: cache misses go through the group's RecBatcher
+        cls = bool(cls and group.use_angle_cls)
+        if not crops:
+            if announced:
+                group.batcher.withdraw()
+            return []
+        return self._cached(crops, cls, lambda todo: group.batcher.run(group, todo, cls, priority, announced),
+                            lambda: group.batcher.withdraw() if announced else None)
+
+    def _cached(self, crops, cls: bool, run, on_all_hits=None):
+        if not crops:
+            return []
+        t0 = time.perf_counter()
+        try:
+            cache = self.rec_cache if self.rec_cache is not None and self.rec_cache.max_bytes > 0 else None
+            out = [None] * len(crops)
+            keys = [None] * len(crops)
+            if cache is not None:
+                for i, c in enumerate(crops):
+                    keys[i] = crop_hash(c, CFG.REC_CACHE_HEIGHT, cls)
+                    out[i] = cache.get(keys[i])
+            todo = [i for i, v in enumerate(out) if v is None]
+            if not todo:
+                if on_all_hits is not None:
+                    on_all_hits()
+                return out
+
+            rec_res = run([crops[i] for i in todo])
+            for i, r in zip(todo, rec_res):
+                out[i] = r
+                if cache is not None:
+                    cache.set(keys[i], r)
+            return out
+        finally:
+            M.RECOGNIZE.since(t0)
+
+
+def extract_from_paddle_result(result, with_lines: bool = False):
+    t0 = time.perf_counter()
     texts = []
     boxs = []
     scores = []
-    
+    line_ids = []
+    lines_reused = []
+
     # PaddleOCR يرجع قائمة تحتوي على نتائج كل صفحة (نحن نتعامل مع صورة واحدة لذا نأخذ result[0])
     if result and len(result) > 0 and result[0]:
         for line in result[0]:
@@ -80,10 +867,33 @@ def extract_from_paddle_result(result):
             boxs.append([[int(p[0]), int(p[1])] for p in box])
             texts.append(text)
             scores.append(score)
+            # tracked results (ocr_lines.LineTracker) append [line_id, reused]
+            line_ids.append(line[2] if len(line) > 2 else None)
+            lines_reused.append(bool(line[3]) if len(line) > 3 else False)
 
     text_joined = "\n".join(texts).strip()
     avg_conf = (sum(scores) / len(scores)) if scores else 0.0
+    M.EXTRACT.since(t0)
+    if with_lines:
+        return text_joined, texts, boxs, scores, avg_conf, line_ids, lines_reused
     return text_joined, texts, boxs, scores, avg_conf
 
 
-POOL = PaddleOcrPool(show_log=False)
\ No newline at end of file
+REC_CACHE = RecCache(int(CFG.REC_CACHE_MB * 1024 * 1024))
+POOL = PaddleOcrPool(
+    show_log=False,
+    rec_cache=REC_CACHE,
+    size=CFG.OCR_WORKERS,
+    queue_depth=CFG.OCR_QUEUE_DEPTH,
+    batch=CFG.REC_BATCH,
+    batch_window_ms=CFG.REC_BATCH_WINDOW_MS,
+    batch_max=CFG.REC_BATCH_MAX,
+    preprocessor=Preprocessor(
+        text_height=CFG.PREPROC_TEXT_HEIGHT,
+        margin=CFG.PREPROC_MARGIN,
+        ink_tol=CFG.PREPROC_INK_TOL,
+    ) if CFG.PREPROCESS else None,
+    backend=CFG.OCR_BACKEND,
+    mem_budget_mb=CFG.ENGINE_MEM_BUDGET_MB,
+    min_idle_s=CFG.ENGINE_MIN_IDLE_S,
+)
\ No newline at end of file
@@ -0,0 +1,160 @@
+from collections import Counter, deque
+from difflib import SequenceMatcher
+
+
+def _rect_of(box):
+    xs = [p[0] for p in box]
+    ys = [p[1] for p in box]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _iou(a, b) -> float:
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+def vote(obs):
+    # obs: [(text, weight)], oldest first -> (consensus, support)
+    # A reading holding half the weight wins outright. Otherwise the readings of the
+    # best-supported length are voted per character position; ties go to the newest reading.
+    total = sum(w for _, w in obs)
+    if total <= 0:
+        return obs[-1][0], 0.0
+    by_text = Counter()
+    for t, w in reversed(obs):
+        by_text[t] += w
+    best, best_w = max(by_text.items(), key=lambda kv: kv[1])
+    if best_w * 2 >= total:
+        return best, best_w / total
+
+    by_len = Counter()
+    for t, w in obs:
+        by_len[len(t)] += w
+    n = max(by_len.items(), key=lambda kv: kv[1])[0]
+    same = [(t, w) for t, w in reversed(obs) if len(t) == n]
+    chars = []
+    for i in range(n):
+        tally = {}
+        for t, w in same:
+            tally[t[i]] = tally.get(t[i], 0.0) + w
+        chars.append(max(tally, key=tally.get))
+    text = "".join(chars)
+    return text, by_text.get(text, 0.0) / total
+
+
+class _Slot:
+    __slots__ = ("key", "rect", "obs", "text", "support")
+
+    def __init__(self, key, rect, window: int):
+        self.key = key
+        self.rect = rect
+        self.obs = deque(maxlen=window)
+        self.text = None
+        self.support = 0.0
+
+
+class TextFusion:
+    # Temporal fusion of the poller's per-line OCR results. Every line keeps the readings of the
+    # last `window` frames (matched by LineTracker ID, else by box overlap) and reports the
+    # score-weighted vote over them, so a character misread on one frame does not change the text.
+    # A reading that differs from the consensus by more than `reset_sim` is a new line, not a
+    # misread: the history is dropped and the new text shows at once.
+    # A line is stable once `min_frames` readings are in and `agree` of their weight backs the
+    # consensus; the frame is stable when every line is. Frames the poller does not OCR again
+    # (unchanged, or no new frame at all) go through repeat(), so text that stays put gets there.
+    def __init__(self, window: int = 5, min_frames: int = 2, agree: float = 0.6,
+                 reset_sim: float = 0.5, iou_match: float = 0.5):
+        self.window = max(1, int(window))
+        self.min_frames = max(1, min(self.window, int(min_frames)))
+        self.agree = float(agree)
+        self.reset_sim = float(reset_sim)
+        self.iou_match = float(iou_match)
+        self.frames = 0
+        self.raw_changes = 0  # frames whose raw text differed from the previous frame's
+        self.changes = 0      # frames whose fused text differed from the previous fused text
+        self.reset()
+
+    def reset(self):
+        self._slots = []
+        self._last_raw = None
+        self._last_text = None
+
+    def _match(self, old, key, rect):
+        if key is not None:
+            for s in old:
+                if s.key == key:
+                    return s
+        best, best_iou = None, self.iou_match
+        for s in old:
+            v = _iou(rect, s.rect)
+            if v >= best_iou:
+                best, best_iou = s, v
+        return best
+
+    def update(self, texts, scores, boxs, line_ids=None):
+        # -> (fused texts, stable, stats); one entry per line of this frame, in its order
+        line_ids = line_ids or [None] * len(texts)
+        old = list(self._slots)
+        slots = []
+        fused = []
+        stable = True
+        for text, score, box, key in zip(texts, scores, boxs, line_ids):
+            rect = _rect_of(box)
+            slot = self._match(old, key, rect)
+            if slot is None:
+                slot = _Slot(key, rect, self.window)
+            else:
+                old.remove(slot)
+                slot.key = key if key is not None else slot.key
+                slot.rect = rect
+                if slot.text is not None and text != slot.text and \
+                        SequenceMatcher(None, text, slot.text).ratio() < self.reset_sim:
+                    slot.obs.clear()
+            slot.obs.append((text, max(1e-3, float(score))))
+            slot.text, slot.support = vote(slot.obs)
+            slots.append(slot)
+            fused.append(slot.text)
+            stable = stable and len(slot.obs) >= self.min_frames and slot.support >= self.agree
+        self._slots = slots
+
+        raw = "\n".join(texts).strip()
+        text = "\n".join(fused).strip()
+        self.frames += 1
+        if self._last_raw is not None and raw != self._last_raw:
+            self.raw_changes += 1
+        if self._last_text is not None and text != self._last_text:
+            self.changes += 1
+        self._last_raw = raw
+        self._last_text = text
+        return fused, stable, self.stats()
+
+    def repeat(self):
+        # -> like update(), for a frame that showed the same lines again: the last reading of
+        # every line counts once more
+        fused = []
+        stable = True
+        for slot in self._slots:
+            slot.obs.append(slot.obs[-1])
+            slot.text, slot.support = vote(slot.obs)
+            fused.append(slot.text)
+            stable = stable and len(slot.obs) >= self.min_frames and slot.support >= self.agree
+        text = "\n".join(fused).strip()
+        if self._last_text is not None and text != self._last_text:
+            self.changes += 1
+        self._last_text = text
+        return fused, stable, self.stats()
+
+    def stats(self):
+        return {
+            "window": self.window,
+            "support": round(min((s.support for s in self._slots), default=1.0), 3),
+            "frames": self.frames,
+            "raw_changes": self.raw_changes,
+            "changes": self.changes,
+        }
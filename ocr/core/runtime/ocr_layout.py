@@ -0,0 +1,147 @@
+import json
+import os
+import tempfile
+import threading
+
+import numpy as np
+
+from core.runtime.ocr_preprocess import ink_mask, ink_runs
+
+# same file the region selector writes and the capture reads
+REGION_FILE = os.environ.get("SETJA_REGION_FILE") or os.path.join(
+    tempfile.gettempdir(), "setja_region.json"
+)
+
+_region_lock = threading.Lock()
+_region_cache = (None, None)  # (mtime, ltrb)
+
+
+def region_ltrb(path: str = REGION_FILE):
+    # (left, top, right, bottom) of the selected region, re-read only when the file changes
+    global _region_cache
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _region_lock:
+        if _region_cache[0] == mtime:
+            return _region_cache[1]
+    ltrb = None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            d = json.load(f)
+        if all(k in d for k in ("left", "top", "right", "bottom")):
+            ltrb = (int(d["left"]), int(d["top"]), int(d["right"]), int(d["bottom"]))
+        elif all(k in d for k in ("x", "y", "width", "height")):
+            x, y = int(d["x"]), int(d["y"])
+            ltrb = (x, y, x + int(d["width"]), y + int(d["height"]))
+    except Exception:
+        ltrb = None
+    with _region_lock:
+        _region_cache = (mtime, ltrb)
+    return ltrb
+
+
+class _Band:
+    __slots__ = ("y0", "y1", "hits", "last_det")
+
+    def __init__(self, y0: int, y1: int, det: int):
+        self.y0 = y0
+        self.y1 = y1
+        self.hits = 1
+        self.last_det = det
+
+
+def _overlap(a0, a1, b0, b1) -> int:
+    return max(0, min(a1, b1) - max(a0, b0))
+
+
+class FixedLayout:
+    # Learned text-line rows for one region (setja_region.json + frame size).
+    # Detection boxes teach the rows ("bands"); a cheap ink profile of each frame then says which
+    # bands hold text and how wide it is, so recognition can run on them without the detector.
+    def __init__(self, key, min_hits: int = 2, redetect_every: int = 60, ink_tol: int = 40,
+                 forget_after: int = 20, step: int = 2):
+        self.key = key
+        self.min_hits = max(1, int(min_hits))
+        self.redetect_every = max(1, int(redetect_every))
+        self.ink_tol = int(ink_tol)
+        self.forget_after = max(1, int(forget_after))
+        self.step = max(1, int(step))
+        self.lock = threading.Lock()
+        self._bands = []
+        self._since_detect = 0
+        self._force = True
+        self.detections = 0
+        self.skipped = 0
+        self.fallbacks = 0
+
+    def _match(self, run):
+        y0, y1 = run[0], run[1]
+        best, best_ov = None, 0
+        for b in self._bands:
+            if b.hits < self.min_hits:
+                continue
+            ov = _overlap(y0, y1, b.y0, b.y1)
+            if ov >= 0.6 * (y1 - y0) and ov >= 0.4 * (b.y1 - b.y0) and ov > best_ov:
+                best, best_ov = b, ov
+        return best
+
+    def plan(self, img):
+        # -> list of 4-point boxes to recognize, or None when the detector has to run
+        if self._force or self._since_detect >= self.redetect_every:
+            return None
+        h, w = img.shape[:2]
+        runs = ink_runs(ink_mask(img, self.step, self.ink_tol), self.step)
+        if not runs:
+            return None  # no ink at all: let the detector confirm the frame is empty
+        boxes = []
+        for run in runs:
+            band = self._match(run)
+            if band is None:
+                return None  # text where no known line is: layout changed
+            pad = max(2, (band.y1 - band.y0) // 2)
+            x0 = max(0, run[2] - pad)
+            x1 = min(w, run[3] + pad)
+            boxes.append(np.array([[x0, band.y0], [x1, band.y0], [x1, band.y1], [x0, band.y1]], dtype=np.float32))
+        self._since_detect += 1
+        self.skipped += 1
+        return boxes
+
+    def learn(self, boxes, h: int):
+        self.detections += 1
+        for box in boxes:
+            y0 = max(0, int(np.floor(box[:, 1].min())))
+            y1 = min(h, int(np.ceil(box[:, 1].max())) + 1)
+            best, best_ov = None, 0
+            for b in self._bands:
+                ov = _overlap(y0, y1, b.y0, b.y1)
+                if ov >= 0.5 * min(y1 - y0, b.y1 - b.y0) and ov > best_ov:
+                    best, best_ov = b, ov
+            if best is None:
+                self._bands.append(_Band(y0, y1, self.detections))
+                continue
+            if abs(best.y0 - y0) + abs(best.y1 - y1) <= 4:
+                best.y0 = min(best.y0, y0)
+                best.y1 = max(best.y1, y1)
+                best.hits += 1
+            else:
+                # same row, different geometry (font/size change): start over for this band
+                best.y0, best.y1, best.hits = y0, y1, 1
+            best.last_det = self.detections
+        self._bands = [b for b in self._bands if self.detections - b.last_det < self.forget_after]
+        self._since_detect = 0
+        self._force = False
+
+    def invalidate(self):
+        self._force = True
+        self.fallbacks += 1
+
+    def stats(self):
+        return {
+            "bands": sum(1 for b in self._bands if b.hits >= self.min_hits),
+            "learning": sum(1 for b in self._bands if b.hits < self.min_hits),
+            "detections": self.detections,
+            "detect_skipped": self.skipped,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,165 @@
+import numpy as np
+import cv2
+
+from core.runtime.ocr_change import channel_max, thumbnail
+from core.runtime.ocr_engine import crop_box, PRIO_POLLER
+
+
+class TrackedLine:
+    __slots__ = ("id", "box", "rect", "thumb", "text", "score")
+
+    def __init__(self, line_id: int, box, rect, thumb):
+        self.id = line_id
+        self.box = box
+        self.rect = rect
+        self.thumb = thumb
+        self.text = ""
+        self.score = 0.0
+
+
+def _rect_of(box, w: int, h: int):
+    x0, y0 = np.floor(box.min(axis=0)).astype(int)
+    x1, y1 = np.ceil(box.max(axis=0)).astype(int)
+    return max(0, x0), max(0, y0), min(w, x1 + 1), min(h, y1 + 1)
+
+
+def _iou(a, b) -> float:
+    ix = max(0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    if inter <= 0:
+        return 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    return inter / float(area_a + area_b - inter)
+
+
+class LineTracker:
+    # Incremental OCR for one stream (the poller). Keeps the detected text lines with stable IDs:
+    # - detection runs only when pixels change outside the known lines, the frame size changes,
+    #   a re-read line drops below drop_score, or every `redetect_every` frames;
+    # - recognition runs only for lines whose pixels changed since they were last read.
+    def __init__(self, redetect_every: int = 30, iou_match: float = 0.5, step: int = 4,
+                 pixel_tol: int = 24, min_pixels: int = 3, margin: int = 4):
+        self.redetect_every = max(1, int(redetect_every))
+        self.iou_match = float(iou_match)
+        self.step = max(1, int(step))
+        self.pixel_tol = int(pixel_tol)
+        self.min_pixels = max(1, int(min_pixels))
+        self.margin = int(margin)
+        self.detections = 0
+        self.recognitions = 0
+        self._id_seq = 0
+        self.reset()
+
+    def reset(self):
+        self._lines = []
+        self._shape = None
+        self._ref = None
+        self._since_detect = 0
+        self._force_detect = True
+
+    def _frame_thumb(self, img):
+        return thumbnail(img, self.step)
+
+    def _line_thumb(self, img, rect):
+        x0, y0, x1, y1 = rect
+        return thumbnail(img[y0:y1, x0:x1], 2)
+
+    def _differs(self, a, b, mask=None) -> bool:
+        # same rule as the frame change detector: any color channel moved by more than pixel_tol
+        if a is None or b is None or a.shape != b.shape:
+            return True
+        diff = channel_max(cv2.absdiff(a, b)) > self.pixel_tol
+        if mask is not None:
+            diff &= mask
+        return int(np.count_nonzero(diff)) >= self.min_pixels
+
+    def _changed_outside_lines(self, ref) -> bool:
+        mask = np.ones(ref.shape[:2], dtype=bool)
+        s = self.step
+        for ln in self._lines:
+            x0, y0, x1, y1 = ln.rect
+            mask[max(0, (y0 - self.margin) // s):(y1 + self.margin) // s + 1,
+                 max(0, (x0 - self.margin) // s):(x1 + self.margin) // s + 1] = False
+        return self._differs(ref, self._ref, mask)
+
+    def _need_detect(self, img, ref) -> bool:
+        return (
+            self._force_detect
+            or self._shape != img.shape
+            or self._since_detect >= self.redetect_every
+            or self._changed_outside_lines(ref)
+        )
+
+    def _detect(self, pool, ocr, img, priority: int):
+        h, w = img.shape[:2]
+        boxes = pool.detect(ocr, img, priority=priority)
+        old = list(self._lines)
+        lines = []
+        for box in boxes:
+            rect = _rect_of(box, w, h)
+            best, best_iou = None, self.iou_match
+            for ln in old:
+                v = _iou(rect, ln.rect)
+                if v >= best_iou:
+                    best, best_iou = ln, v
+            if best is not None:
+                old.remove(best)
+                if max(abs(a - b) for a, b in zip(best.rect, rect)) > 2:
+                    # moved or resized: keep the ID, but the old crop no longer applies
+                    best.thumb = None
+                    best.box = box
+                    best.rect = rect
+                lines.append(best)
+            else:
+                lines.append(TrackedLine(self._next_id(), box, rect, None))
+        self._lines = lines
+        self.detections += 1
+        self._since_detect = 0
+
+    def _next_id(self) -> int:
+        self._id_seq += 1
+        return self._id_seq
+
+    def run(self, pool, ocr, img, cls: bool = False, drop_score: float = 0.5, priority: int = PRIO_POLLER):
+        ref = self._frame_thumb(img)
+        detected = self._need_detect(img, ref)
+        if detected:
+            self._detect(pool, ocr, img, priority)
+            self._ref = ref
+            self._shape = img.shape
+            self._force_detect = False
+        else:
+            self._since_detect += 1
+
+        todo = []
+        reused = {}
+        for ln in self._lines:
+            thumb = self._line_thumb(img, ln.rect)
+            if ln.thumb is not None and not self._differs(thumb, ln.thumb):
+                reused[ln.id] = True
+                continue
+            ln.thumb = thumb
+            reused[ln.id] = False
+            todo.append(ln)
+
+        if todo:
+            rec = pool.recognize(ocr, [crop_box(img, ln.box) for ln in todo], cls=cls, priority=priority)
+            self.recognitions += len(todo)
+            for ln, (text, score) in zip(todo, rec):
+                ln.text = text
+                ln.score = score
+                if score < drop_score:
+                    # the line probably vanished or grew past its box: re-detect
+                    self._force_detect = True
+            if self._force_detect and not detected:
+                # now, not on the next frame: the poller skips frames that look unchanged, so a
+                # subtitle replaced inside the old line boxes might never be read again
+                return self.run(pool, ocr, img, cls=cls, drop_score=drop_score, priority=priority)
+
+        out = []
+        for ln in self._lines:
+            if ln.text and ln.score >= drop_score:
+                out.append([ln.box.astype(int).tolist(), (ln.text, ln.score), ln.id, reused[ln.id]])
+        return [out or None]
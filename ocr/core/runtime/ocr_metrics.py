@@ -0,0 +1,184 @@
+import threading
+import time
+from bisect import bisect_left
+
+# Prometheus text exposition (format 0.0.4) without the prometheus_client dependency. Recording is
+# a bisect and a few additions under an uncontended lock (about a microsecond), so it stays on.
+# Times are observed in seconds, as Prometheus expects.
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+TIME_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+SPIN_BUCKETS = (1, 2, 3, 5, 10, 25, 50, 100, 200)
+
+
+def _labels(names, values, extra=None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in pairs) + "}"
+
+
+def _num(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, v: float):
+        i = bisect_left(self.buckets, v)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += v
+
+    def since(self, t0: float):
+        # observe the seconds elapsed since a time.perf_counter() stamp
+        self.observe(time.perf_counter() - t0)
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum
+
+
+class _CounterChild:
+    __slots__ = ("value", "lock")
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, n=1):
+        with self.lock:
+            self.value += n
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, doc: str, labelnames=()):
+        self.name = name
+        self.doc = doc
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        self._default = self._new() if not self.labelnames else None
+
+    def _new(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new())
+        return child
+
+    def _items(self):
+        if self._default is not None:
+            return [((), self._default)]
+        with self._lock:
+            return sorted(self._children.items(), key=lambda kv: tuple(str(v) for v in kv[0]))
+
+    def render(self, out: list):
+        out.append(f"# HELP {self.name} {self.doc}")
+        out.append(f"# TYPE {self.name} {self.kind}")
+        for values, child in self._items():
+            self._render_child(out, values, child)
+
+    def _render_child(self, out: list, values, child):
+        raise NotImplementedError
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, buckets=TIME_BUCKETS, labelnames=()):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, doc, labelnames)
+
+    def _new(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, v: float):
+        self._default.observe(v)
+
+    def since(self, t0: float):
+        self._default.since(t0)
+
+    def _render_child(self, out: list, values, child):
+        counts, total = child.snapshot()
+        acc = 0
+        for le, n in zip(self.buckets + (float("inf"),), counts):
+            acc += n
+            out.append(f"{self.name}_bucket{_labels(self.labelnames, values, ('le', _num(le)))} {acc}")
+        out.append(f"{self.name}_sum{_labels(self.labelnames, values)} {_num(total)}")
+        out.append(f"{self.name}_count{_labels(self.labelnames, values)} {acc}")
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new(self):
+        return _CounterChild()
+
+    def inc(self, n=1):
+        self._default.inc(n)
+
+    def _render_child(self, out: list, values, child):
+        out.append(f"{self.name}_total{_labels(self.labelnames, values)} {_num(child.value)}")
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, doc: str, buckets=TIME_BUCKETS, labelnames=()) -> Histogram:
+        return self._add(Histogram(name, doc, buckets, labelnames))
+
+    def counter(self, name: str, doc: str, labelnames=()) -> Counter:
+        return self._add(Counter(name, doc, labelnames))
+
+    def render(self) -> bytes:
+        out = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for m in metrics:
+            m.render(out)
+        return ("\n".join(out) + "\n").encode("utf-8")
+
+
+METRICS = Registry()
+
+SHM_READ = METRICS.histogram("ocr_shm_read_seconds", "Seqlock read of the SHM frame, including retries.",
+                             labelnames=("mode",))
+SHM_SPINS = METRICS.histogram("ocr_shm_read_spins", "Attempts a SHM frame read took.", SPIN_BUCKETS,
+                              labelnames=("mode",))
+SHM_TORN = METRICS.counter("ocr_shm_torn_reads", "SHM reads discarded because the writer republished meanwhile.")
+SHM_FAILED = METRICS.counter("ocr_shm_read_failures", "SHM reads that returned no frame.", ("reason",))
+CONVERT = METRICS.histogram("ocr_bgra_to_bgr_seconds", "BGRA to BGR conversion of a SHM frame.")
+DETECT = METRICS.histogram("ocr_detect_seconds", "Text detection on one frame, preprocessing included.")
+RECOGNIZE = METRICS.histogram("ocr_recognize_seconds", "Recognition of one frame's line crops, cache lookups included.")
+EXTRACT = METRICS.histogram("ocr_extract_seconds", "Turning an OCR result into text/boxes/scores.")
+ENCODE = METRICS.histogram("ocr_encode_seconds", "Response body encoding.", labelnames=("format",))
+REQUESTS = METRICS.counter("ocr_http_requests", "HTTP requests by endpoint and status.", ("method", "path", "code"))
+QUEUE_WAIT = METRICS.histogram("ocr_queue_wait_seconds", "Time an OCR job waited for an engine worker.",
+                               labelnames=("priority",))
+POLL_WORK = METRICS.histogram("ocr_poller_work_seconds", "Busy part of one poller iteration.")
+POLL_OVERRUNS = METRICS.counter("ocr_poller_overruns", "Poller iterations whose work exceeded POLL_INTERVAL_MS.")
@@ -0,0 +1,251 @@
+import math
+import time
+
+import numpy as np
+import cv2
+
+try:
+    import pyclipper
+except ImportError:  # the ONNX-only install may not have it; fall back to growing the min-area rect
+    pyclipper = None
+
+# PP-OCR detection / angle classification / recognition on ONNX Runtime (CPU), exposing the same
+# surface the pool uses from PaddleOCR: text_detector, text_classifier, text_recognizer, ocr(),
+# drop_score, use_angle_cls. Models are the PP-OCR inference models exported with paddle2onnx.
+
+
+def _session(path: str, threads: int):
+    import onnxruntime as ort
+
+    so = ort.SessionOptions()
+    if threads > 0:
+        so.intra_op_num_threads = threads
+        so.inter_op_num_threads = 1
+    so.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    sess = ort.InferenceSession(path, sess_options=so, providers=["CPUExecutionProvider"])
+    return sess, sess.get_inputs()[0].name
+
+
+class _DetResize:
+    # same knobs as PaddleOCR's DetResizeForTest, so ocr_preprocess.det_limit works on both
+    def __init__(self, limit_side_len: int = 960, limit_type: str = "max"):
+        self.limit_side_len = limit_side_len
+        self.limit_type = limit_type
+
+    def __call__(self, img):
+        h, w = img.shape[:2]
+        limit = self.limit_side_len
+        if self.limit_type == "max":
+            ratio = float(limit) / max(h, w) if max(h, w) > limit else 1.0
+        else:
+            ratio = float(limit) / min(h, w) if min(h, w) < limit else 1.0
+        rh = max(32, int(round(h * ratio / 32)) * 32)
+        rw = max(32, int(round(w * ratio / 32)) * 32)
+        return cv2.resize(img, (rw, rh)), rh / float(h), rw / float(w)
+
+
+class OnnxTextDetector:
+    # DB text detection + DBPostProcess (thresh 0.3, box_thresh 0.6, unclip 1.5, score_mode fast)
+    _MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape((1, 1, 3))
+    _STD = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape((1, 1, 3))
+
+    def __init__(self, model_path: str, threads: int = 0, thresh: float = 0.3, box_thresh: float = 0.6,
+                 unclip_ratio: float = 1.5, max_candidates: int = 1000, min_size: int = 3):
+        self.sess, self.input_name = _session(model_path, threads)
+        self.resize = _DetResize()
+        self.preprocess_op = [self.resize]
+        self.thresh = thresh
+        self.box_thresh = box_thresh
+        self.unclip_ratio = unclip_ratio
+        self.max_candidates = max_candidates
+        self.min_size = min_size
+
+    def __call__(self, img):
+        t0 = time.perf_counter()
+        h, w = img.shape[:2]
+        x, ratio_h, ratio_w = self.resize(img)
+        x = (x.astype(np.float32) * (1.0 / 255.0) - self._MEAN) / self._STD
+        x = np.ascontiguousarray(x.transpose((2, 0, 1))[None])
+        pred = self.sess.run(None, {self.input_name: x})[0][0, 0]
+        boxes = self._boxes(pred, w, h)
+        return boxes, time.perf_counter() - t0
+
+    def _boxes(self, pred, dest_w: int, dest_h: int):
+        ph, pw = pred.shape
+        bitmap = (pred > self.thresh).astype(np.uint8)
+        contours, _ = cv2.findContours(bitmap, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        out = []
+        for contour in contours[:self.max_candidates]:
+            pts, sside = self._mini_box(contour)
+            if sside < self.min_size:
+                continue
+            if self._score(pred, pts) < self.box_thresh:
+                continue
+            pts, sside = self._mini_box(self._unclip(pts).reshape((-1, 1, 2)))
+            if sside < self.min_size + 2:
+                continue
+            pts[:, 0] = np.clip(np.round(pts[:, 0] / pw * dest_w), 0, dest_w)
+            pts[:, 1] = np.clip(np.round(pts[:, 1] / ph * dest_h), 0, dest_h)
+            box = self._order_clockwise(pts)
+            box[:, 0] = np.clip(box[:, 0], 0, dest_w - 1)
+            box[:, 1] = np.clip(box[:, 1], 0, dest_h - 1)
+            if int(np.linalg.norm(box[0] - box[1])) <= 3 or int(np.linalg.norm(box[0] - box[3])) <= 3:
+                continue
+            out.append(box)
+        return np.array(out, dtype=np.float32).reshape((-1, 4, 2))
+
+    @staticmethod
+    def _mini_box(contour):
+        rect = cv2.minAreaRect(contour)
+        pts = sorted(cv2.boxPoints(rect).tolist(), key=lambda p: p[0])
+        if pts[1][1] > pts[0][1]:
+            i1, i4 = 0, 1
+        else:
+            i1, i4 = 1, 0
+        if pts[3][1] > pts[2][1]:
+            i2, i3 = 2, 3
+        else:
+            i2, i3 = 3, 2
+        box = np.array([pts[i1], pts[i2], pts[i3], pts[i4]], dtype=np.float32)
+        return box, min(rect[1])
+
+    @staticmethod
+    def _score(pred, box):
+        h, w = pred.shape
+        xmin = int(np.clip(np.floor(box[:, 0].min()), 0, w - 1))
+        xmax = int(np.clip(np.ceil(box[:, 0].max()), 0, w - 1))
+        ymin = int(np.clip(np.floor(box[:, 1].min()), 0, h - 1))
+        ymax = int(np.clip(np.ceil(box[:, 1].max()), 0, h - 1))
+        mask = np.zeros((ymax - ymin + 1, xmax - xmin + 1), dtype=np.uint8)
+        pts = box.copy()
+        pts[:, 0] -= xmin
+        pts[:, 1] -= ymin
+        cv2.fillPoly(mask, pts.reshape((1, -1, 2)).astype(np.int32), 1)
+        return cv2.mean(pred[ymin:ymax + 1, xmin:xmax + 1], mask)[0]
+
+    def _unclip(self, box):
+        area = cv2.contourArea(box)
+        length = cv2.arcLength(box.reshape((-1, 1, 2)), True)
+        if length <= 0:
+            return box
+        distance = area * self.unclip_ratio / length
+        if pyclipper is not None:
+            off = pyclipper.PyclipperOffset()
+            off.AddPath(box.astype(np.int64).tolist(), pyclipper.JT_ROUND, pyclipper.ET_CLOSEDPOLYGON)
+            expanded = off.Execute(distance)
+            if expanded:
+                return np.array(expanded[0], dtype=np.float32)
+        (cx, cy), (rw, rh), angle = cv2.minAreaRect(box)
+        return cv2.boxPoints(((cx, cy), (rw + 2 * distance, rh + 2 * distance), angle)).astype(np.float32)
+
+    @staticmethod
+    def _order_clockwise(pts):
+        rect = np.zeros((4, 2), dtype=np.float32)
+        s = pts.sum(axis=1)
+        rect[0] = pts[np.argmin(s)]
+        rect[2] = pts[np.argmax(s)]
+        rest = np.delete(pts, (np.argmin(s), np.argmax(s)), axis=0)
+        diff = np.diff(rest, axis=1)
+        rect[1] = rest[np.argmin(diff)]
+        rect[3] = rest[np.argmax(diff)]
+        return rect
+
+
+def _norm_resize(img, h: int, w: int, max_w: int):
+    # keep aspect, height h, width up to w; normalized to [-1, 1] and right-padded to max_w
+    ih, iw = img.shape[:2]
+    rw = min(w, int(math.ceil(h * iw / float(max(1, ih)))))
+    x = cv2.resize(img, (max(1, rw), h)).astype(np.float32)
+    x = (x * (1.0 / 255.0) - 0.5) / 0.5
+    out = np.zeros((3, h, max_w), dtype=np.float32)
+    out[:, :, :x.shape[1]] = x.transpose((2, 0, 1))
+    return out
+
+
+class OnnxTextClassifier:
+    # text direction (0 / 180), same batching and threshold as PaddleOCR's TextClassifier
+    def __init__(self, model_path: str, threads: int = 0, batch: int = 6, thresh: float = 0.9):
+        self.sess, self.input_name = _session(model_path, threads)
+        self.batch = batch
+        self.thresh = thresh
+
+    def __call__(self, crops):
+        t0 = time.perf_counter()
+        crops = list(crops)
+        res = [("0", 0.0)] * len(crops)
+        order = np.argsort([c.shape[1] / float(c.shape[0]) for c in crops])
+        for i in range(0, len(crops), self.batch):
+            idx = order[i:i + self.batch]
+            x = np.stack([_norm_resize(crops[j], 48, 192, 192) for j in idx])
+            prob = self.sess.run(None, {self.input_name: x})[0]
+            for j, p in zip(idx, prob):
+                k = int(p.argmax())
+                label = ("0", "180")[k]
+                res[j] = (label, float(p[k]))
+                if label == "180" and p[k] > self.thresh:
+                    crops[j] = cv2.rotate(crops[j], cv2.ROTATE_180)
+        return crops, res, time.perf_counter() - t0
+
+
+class OnnxTextRecognizer:
+    # CRNN/SVTR recognition with CTC greedy decoding (PaddleOCR's TextRecognizer + CTCLabelDecode)
+    def __init__(self, model_path: str, dict_path: str, threads: int = 0, batch: int = 6, height: int = 48,
+                 base_width: int = 320):
+        self.sess, self.input_name = _session(model_path, threads)
+        with open(dict_path, "r", encoding="utf-8") as f:
+            chars = [ln.rstrip("\r\n") for ln in f]
+        self.chars = ["blank"] + chars + [" "]
+        self.batch = batch
+        self.height = height
+        self.base_width = base_width
+
+    def __call__(self, crops):
+        t0 = time.perf_counter()
+        crops = list(crops)
+        res = [("", 0.0)] * len(crops)
+        ratios = [c.shape[1] / float(max(1, c.shape[0])) for c in crops]
+        order = np.argsort(ratios)
+        for i in range(0, len(crops), self.batch):
+            idx = order[i:i + self.batch]
+            max_ratio = max(self.base_width / float(self.height), max(ratios[j] for j in idx))
+            max_w = int(math.ceil(self.height * max_ratio))
+            x = np.stack([_norm_resize(crops[j], self.height, max_w, max_w) for j in idx])
+            prob = self.sess.run(None, {self.input_name: x})[0]
+            for j, p in zip(idx, prob):
+                res[j] = self._decode(p)
+        return res, time.perf_counter() - t0
+
+    def _decode(self, prob):
+        ids = prob.argmax(axis=1)
+        conf = prob.max(axis=1)
+        keep = ids != 0
+        keep[1:] &= ids[1:] != ids[:-1]
+        ids = ids[keep]
+        if ids.size == 0:
+            return "", 0.0
+        text = "".join(self.chars[i] for i in ids if i < len(self.chars))
+        return text, float(conf[keep].mean())
+
+
+class OnnxOCR:
+    def __init__(self, det_model: str, rec_model: str, rec_dict: str, cls_model: str = None,
+                 use_angle_cls: bool = False, threads: int = 0, drop_score: float = 0.5):
+        self.text_detector = OnnxTextDetector(det_model, threads)
+        self.text_recognizer = OnnxTextRecognizer(rec_model, rec_dict, threads)
+        self.use_angle_cls = bool(use_angle_cls and cls_model)
+        self.text_classifier = OnnxTextClassifier(cls_model, threads) if self.use_angle_cls else None
+        self.drop_score = drop_score
+
+    def ocr(self, img, cls: bool = False):
+        from core.runtime.ocr_engine import crop_box, sorted_boxes
+
+        dt_boxes, _ = self.text_detector(img)
+        if dt_boxes is None or len(dt_boxes) == 0:
+            return [None]
+        boxes = sorted_boxes(dt_boxes)
+        crops = [crop_box(img, b) for b in boxes]
+        if cls and self.use_angle_cls:
+            crops, _, _ = self.text_classifier(crops)
+        rec, _ = self.text_recognizer(crops)
+        lines = [[b.tolist(), r] for b, r in zip(boxes, rec) if r[1] >= self.drop_score]
+        return [lines or None]
@@ -0,0 +1,176 @@
+import threading
+import weakref
+from contextlib import contextmanager
+
+import numpy as np
+import cv2
+
+from core.runtime.ocr_change import channel_max, thumbnail
+
+
+def ink_mask(img, step: int = 2, tol: int = 40):
+    # subsampled map of "text-like" pixels: strong horizontal gradients in any color channel
+    g = thumbnail(img, step)
+    return channel_max(cv2.absdiff(g[:, 1:], g[:, :-1])) > tol
+
+
+def ink_runs(ink, step: int = 2, min_pixels: int = 2):
+    # active row runs of an ink_mask in full-frame coordinates: [(y0, y1, x0, x1)]
+    rows = np.count_nonzero(ink, axis=1) >= min_pixels
+    if not rows.any():
+        return []
+    idx = np.flatnonzero(np.diff(np.concatenate(([0], rows.view(np.int8), [0]))))
+    runs = []
+    for r0, r1 in zip(idx[::2], idx[1::2]):
+        if runs and r0 - runs[-1][1] <= 1:
+            runs[-1][1] = r1
+            continue
+        runs.append([r0, r1])
+    out = []
+    for r0, r1 in runs:
+        cols = np.flatnonzero(ink[r0:r1].any(axis=0))
+        out.append((int(r0) * step, int(r1) * step, int(cols[0]) * step, (int(cols[-1]) + 2) * step))
+    return out
+
+
+class Prepared:
+    # what the detector sees, and how to map its boxes back to the original frame
+    __slots__ = ("img", "x0", "y0", "scale", "det_limit", "empty")
+
+    def __init__(self, img, x0: int = 0, y0: int = 0, scale: float = 1.0, det_limit: int = 0, empty: bool = False):
+        self.img = img
+        self.x0 = x0
+        self.y0 = y0
+        self.scale = scale
+        self.det_limit = det_limit
+        self.empty = empty
+
+    def to_frame(self, boxes, w: int, h: int):
+        if self.scale == 1.0 and self.x0 == 0 and self.y0 == 0:
+            return boxes
+        off = np.array([self.x0, self.y0], dtype=np.float32)
+        hi = np.array([w - 1, h - 1], dtype=np.float32)
+        # whole pixels, like the detector's own boxes
+        return [np.clip(np.round(np.asarray(b, dtype=np.float32) / self.scale + off), 0, hi) for b in boxes]
+
+
+def det_pixels(h: int, w: int, limit: int) -> float:
+    # pixels the detector runs on after its own resize (longest side down to `limit`, never up)
+    r = min(1.0, float(limit) / max(h, w)) if limit > 0 else 1.0
+    return h * w * r * r
+
+
+class Preprocessor:
+    # Ahead of the text detector: crop to the rows/columns with text energy, downscale so the
+    # text is about `text_height` px tall, and size the detector input from the result (see
+    # det_limit: only ever below the engine's own limit). Recognition still crops from the original frame.
+    # When the crop would not spare the detector at least 1 - max_det_share of what it runs on for
+    # the whole frame (text spread over the screen), the frame goes through unchanged.
+    def __init__(self, text_height: int = 32, margin: int = 12, ink_tol: int = 24, step: int = 2,
+                 min_scale: float = 0.25, max_det_share: float = 0.75):
+        self.text_height = max(8, int(text_height))
+        self.margin = max(0, int(margin))
+        self.ink_tol = int(ink_tol)
+        self.step = max(1, int(step))
+        self.min_scale = float(min_scale)
+        self.max_det_share = float(max_det_share)
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.pixels_in = 0
+        self.pixels_out = 0
+        self.empty = 0
+        self.whole = 0  # frames passed through because the crop saved too little
+
+    def _count(self, pixels_in: int, pixels_out: int, empty: bool = False, whole: bool = False):
+        with self._lock:
+            self.frames += 1
+            self.pixels_in += pixels_in
+            self.pixels_out += pixels_out
+            self.empty += int(empty)
+            self.whole += int(whole)
+
+    def prepare(self, img, limit: int = 0) -> Prepared:
+        # limit: the engine's own det limit_side_len (0 = unknown)
+        h, w = img.shape[:2]
+        runs = ink_runs(ink_mask(img, self.step, self.ink_tol), self.step)
+        if not runs:
+            # no ink found: the detector still gets the whole frame at its usual size, the mask is
+            # only a shortcut
+            self._count(h * w, h * w, empty=True)
+            return Prepared(img, empty=True)
+
+        m = self.margin
+        x0 = max(0, min(r[2] for r in runs) - m)
+        x1 = min(w, max(r[3] for r in runs) + m)
+        y0 = max(0, runs[0][0] - m)
+        y1 = min(h, runs[-1][1] + m)
+
+        # ink rows cover roughly the glyph height; only shrink, and only when it is worth a resample
+        text_h = float(np.median([r[1] - r[0] for r in runs]))
+        scale = 1.0
+        if text_h > self.text_height:
+            scale = max(self.min_scale, self.text_height / text_h)
+            if scale > 0.85:
+                scale = 1.0
+        cw, ch = max(1, int(round((x1 - x0) * scale))), max(1, int(round((y1 - y0) * scale)))
+        if det_pixels(ch, cw, limit) > self.max_det_share * det_pixels(h, w, limit):
+            self._count(h * w, h * w, whole=True)
+            return Prepared(img)
+        crop = np.ascontiguousarray(img[y0:y1, x0:x1])
+        if scale < 1.0:
+            crop = cv2.resize(crop, (cw, ch), interpolation=cv2.INTER_AREA)
+
+        ch, cw = crop.shape[:2]
+        self._count(h * w, ch * cw)
+        return Prepared(crop, x0, y0, scale, ((max(ch, cw) + 31) // 32) * 32)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "empty": self.empty,
+                "whole": self.whole,
+                "pixel_ratio": round(self.pixels_out / self.pixels_in, 4) if self.pixels_in else 0.0,
+            }
+
+
+_ORIG_LIMITS = weakref.WeakKeyDictionary()  # resize op -> its own (limit_side_len, limit_type)
+
+
+def _det_resize_op(engine):
+    # PaddleOCR's TextDetector resizes with DetResizeForTest(limit_side_len, limit_type)
+    det = getattr(engine, "text_detector", None)
+    for op in getattr(det, "preprocess_op", None) or ():
+        if hasattr(op, "limit_side_len"):
+            return op
+    return None
+
+
+def own_det_limit(engine) -> int:
+    # the engine's own limit_side_len, as it was before det_limit() ever touched it; 0 if unknown
+    op = _det_resize_op(engine)
+    if op is None:
+        return 0
+    orig = _ORIG_LIMITS.get(op)
+    if orig is None:
+        orig = _ORIG_LIMITS.setdefault(op, (int(op.limit_side_len), op.limit_type))
+    return orig[0] if orig[1] == "max" else 0
+
+
+@contextmanager
+def det_limit(engine, limit: int):
+    # Caps the detector's input side at `limit` for one call, never above the engine's own
+    # limit_side_len (960 by default: the detector never ran at more), and puts it back after.
+    op = _det_resize_op(engine) if limit > 0 else None
+    if op is None:
+        yield
+        return
+    orig = _ORIG_LIMITS.get(op)
+    if orig is None:
+        orig = _ORIG_LIMITS.setdefault(op, (int(op.limit_side_len), op.limit_type))
+    op.limit_side_len = min(orig[0], int(limit))
+    op.limit_type = "max"  # "min" would upscale a short crop to limit_side_len
+    try:
+        yield
+    finally:
+        op.limit_side_len, op.limit_type = orig
@@ -0,0 +1,237 @@
+import hashlib
+import mmap
+import struct
+import time
+
+import numpy as np
+
+import core.runtime.ocr_shm as SHM
+
+# Recording container (little endian):
+#   header | unique BGR frames, 64-byte aligned | index (one _INDEX_DTYPE row per captured frame)
+# Repeated frames are stored once and referenced from several index rows.
+_REC_MAGIC = b"SETJAREC"
+_REC_VERSION = 1
+_REC_HEADER = struct.Struct("<8sIIQQQ24x")
+_REC_ALIGN = 64
+
+_INDEX_DTYPE = np.dtype([
+    ("ts_us", "<i8"),
+    ("seq", "<i8"),
+    ("offset", "<u8"),
+    ("nbytes", "<u8"),
+    ("w", "<i4"),
+    ("h", "<i4"),
+    ("left", "<i4"),
+    ("top", "<i4"),
+])
+
+
+class FrameRecorder:
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "wb")
+        self._f.write(bytes(_REC_HEADER.size))
+        self._end = _REC_HEADER.size
+        self._rows = []
+        self._by_hash = {}
+        self.unique = 0
+
+    def _align(self):
+        pad = (-self._end) % _REC_ALIGN
+        if pad:
+            self._f.write(bytes(pad))
+            self._end += pad
+
+    def add(self, img_bgr, meta, ts_us: int = None) -> int:
+        img = np.ascontiguousarray(img_bgr)
+        h, w = img.shape[:2]
+        if ts_us is None:
+            ts_us = meta.get("ts_us") or time.monotonic_ns() // 1000
+
+        digest = hashlib.blake2b(img.data, digest_size=16).digest() + struct.pack("<ii", w, h)
+        offset = self._by_hash.get(digest)
+        if offset is None:
+            self._align()
+            offset = self._end
+            self._f.write(img.data)
+            self._end += img.nbytes
+            self._by_hash[digest] = offset
+            self.unique += 1
+
+        self._rows.append((int(ts_us), int(meta.get("seq", len(self._rows) + 1)), offset, img.nbytes,
+                           w, h, int(meta.get("left", 0)), int(meta.get("top", 0))))
+        return len(self._rows)
+
+    def close(self):
+        if self._f is None:
+            return
+        self._align()
+        index_off = self._end
+        self._f.write(np.array(self._rows, dtype=_INDEX_DTYPE).tobytes())
+        self._f.seek(0)
+        self._f.write(_REC_HEADER.pack(_REC_MAGIC, _REC_VERSION, len(self._rows), index_off,
+                                       index_off - _REC_HEADER.size, int(time.time() * 1000)))
+        self._f.close()
+        self._f = None
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def record_shm(path: str, seconds: float = 0.0, max_frames: int = 0, stop_pred=None, on_frame=None) -> int:
+    # Records every frame published on the capture SHM until seconds/max_frames/stop_pred.
+    reader = SHM.FrameReader()
+    t_end = time.monotonic() + seconds if seconds > 0 else None
+    last_seq = None
+    with FrameRecorder(path) as rec:
+        while True:
+            if stop_pred and stop_pred():
+                break
+            if t_end is not None and time.monotonic() >= t_end:
+                break
+            if max_frames and len(rec) >= max_frames:
+                break
+
+            seq = SHM.wait_frame(last_seq, 250)
+            if seq is None or seq == last_seq:
+                continue
+            img, meta = reader.read()
+            if img is None:
+                continue
+            last_seq = meta["seq"]
+            n = rec.add(img, meta)
+            if on_frame:
+                on_frame(n, meta)
+        return len(rec)
+
+
+class FrameRecording:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, count, index_off, data_bytes, created_ms = _REC_HEADER.unpack_from(self._mm, 0)
+        if magic != _REC_MAGIC or version != _REC_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a SETJA frame recording.")
+        self.index = np.frombuffer(self._mm, dtype=_INDEX_DTYPE, count=count, offset=index_off)
+        self.data_bytes = int(data_bytes)
+        self.created_ms = int(created_ms)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def duration_s(self) -> float:
+        if len(self.index) < 2:
+            return 0.0
+        return (int(self.index["ts_us"][-1]) - int(self.index["ts_us"][0])) / 1e6
+
+    def frame(self, i: int):
+        # read-only BGR view into the recording (no copy)
+        row = self.index[i]
+        h, w = int(row["h"]), int(row["w"])
+        img = np.frombuffer(self._mm, dtype=np.uint8, count=int(row["nbytes"]), offset=int(row["offset"]))
+        meta = {
+            "w": w,
+            "h": h,
+            "left": int(row["left"]),
+            "top": int(row["top"]),
+            "seq": int(row["seq"]),
+            "ts_us": int(row["ts_us"]),
+        }
+        return img.reshape((h, w, 3)), meta
+
+    def at_time(self, t_s: float) -> int:
+        # index of the frame on screen t_s seconds into the recording
+        if not len(self.index):
+            return -1
+        ts = self.index["ts_us"]
+        target = int(ts[0]) + int(t_s * 1e6)
+        return max(0, int(np.searchsorted(ts, target, side="right")) - 1)
+
+    def close(self):
+        self.index = None
+        try:
+            self._mm.close()
+        except BufferError:
+            pass
+
+
+class ReplaySource:
+    # Drop-in for FrameReader: read() -> (img, meta) | (None, error).
+    # speed > 0: returns the frame that is "on screen" at speed x wall clock (frames can repeat or
+    # be skipped, like live capture). speed == 0: every frame exactly once, in order (deterministic).
+    def __init__(self, recording: FrameRecording, speed: float = 1.0, loop: bool = False):
+        self.rec = recording
+        self.speed = float(speed)
+        self.loop = loop
+        self.rewind()
+
+    def rewind(self):
+        self._i = 0
+        self._done = False
+        self._t0 = time.monotonic()
+
+    def _index(self):
+        n = len(self.rec)
+        if n == 0:
+            return -1
+
+        if self.speed <= 0:
+            i = self._i
+            self._i += 1
+            if i >= n:
+                if not self.loop:
+                    return -1
+                i %= n
+            return i
+
+        t = (time.monotonic() - self._t0) * self.speed
+        dur = self.rec.duration_s
+        if t > dur:
+            if self.loop:
+                return self.rec.at_time(t % dur if dur > 0 else 0.0)
+            if self._done:
+                return -1
+            # the last frame is always served once before reporting the end
+            self._done = True
+            return n - 1
+        return self.rec.at_time(t)
+
+    def read(self):
+        i = self._index()
+        if i < 0:
+            return None, "Replay finished."
+        return self.rec.frame(i)
+
+
+def replay_to_shm(recording: FrameRecording, writer, speed: float = 1.0, loop: bool = False, stop_pred=None) -> int:
+    # Publishes the recording through a ShmFrameWriter at its original pace (scaled by speed,
+    # speed <= 0 = as fast as possible), so live consumers (poller, /ocr_shm) see a real stream.
+    n = len(recording)
+    if n == 0:
+        return 0
+    published = 0
+    ts = recording.index["ts_us"]
+    while True:
+        t0 = time.monotonic()
+        for i in range(n):
+            if stop_pred and stop_pred():
+                return published
+            if speed > 0:
+                delay = (int(ts[i]) - int(ts[0])) / 1e6 / speed - (time.monotonic() - t0)
+                if delay > 0:
+                    time.sleep(delay)
+            img, meta = recording.frame(i)
+            writer.write_frame(img, left=meta["left"], top=meta["top"])
+            published += 1
+        if not loop:
+            return published
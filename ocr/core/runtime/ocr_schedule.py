@@ -0,0 +1,75 @@
+import time
+
+# what one poller iteration ended with
+CHANGED = "changed"      # OCR ran and the text is new
+SAME = "same"            # OCR ran (the frame changed) but the text did not
+UNCHANGED = "unchanged"  # no new frame, or one identical to the last OCR'd frame: nothing ran
+ERROR = "error"          # no frame / OCR failed
+
+
+class PollScheduler:
+    # Delay between poller iterations. New text snaps the interval down to `min_ms`; repeated
+    # text, unchanged frames and errors grow it by `backoff` up to base_ms / stable_ms / error_ms.
+    # On top of that the poller's busy time is held to `duty_budget` of wall time: after a
+    # 40 ms inference with a 0.5 budget it waits at least 40 ms, however fast text is changing.
+    def __init__(self, min_ms: float = 0.0, base_ms: float = 60.0, stable_ms: float = 120.0, error_ms: float = 2000.0,
+                 backoff: float = 1.5, duty_budget: float = 0.6, step_ms: float = 10.0, alpha: float = 0.2):
+        self.min_ms = max(0.0, float(min_ms))
+        self.base_ms = max(self.min_ms, float(base_ms))
+        self.stable_ms = max(self.base_ms, float(stable_ms))
+        self.error_ms = max(self.base_ms, float(error_ms))
+        self.backoff = max(1.0, float(backoff))
+        self.duty_budget = min(1.0, max(0.01, float(duty_budget)))
+        self.step_ms = max(1.0, float(step_ms))
+        self.alpha = float(alpha)
+        self.interval_ms = self.base_ms
+        self.delay_ms = self.base_ms
+        self.state = "start"
+        self._last_tick = None
+        self._period_ms = None  # EWMA of the time between ticks (the effective poll period)
+        self._busy_ms = 0.0     # EWMA of the busy part of it
+        self.throttled = 0      # ticks where the duty budget, not the interval, set the delay
+
+    def _grow(self, cap: float) -> float:
+        if self.interval_ms >= cap:
+            return cap
+        return min(cap, max(self.interval_ms, self.step_ms) * self.backoff)
+
+    def tick(self, outcome: str, busy_ms: float) -> float:
+        # -> ms to sleep before the next iteration
+        now = time.monotonic()
+        if self._last_tick is not None:
+            period = (now - self._last_tick) * 1000.0
+            self._period_ms = period if self._period_ms is None else \
+                self._period_ms + self.alpha * (period - self._period_ms)
+        self._last_tick = now
+        self._busy_ms += self.alpha * (max(0.0, busy_ms) - self._busy_ms)
+
+        if outcome == CHANGED:
+            self.interval_ms = self.min_ms
+        elif outcome == SAME:
+            # content is moving: stay around the normal rate
+            self.interval_ms = min(self._grow(self.base_ms), self.base_ms)
+        elif outcome == UNCHANGED:
+            self.interval_ms = self._grow(self.stable_ms)
+        else:
+            self.interval_ms = self._grow(self.error_ms)
+        self.state = outcome
+
+        duty_floor = busy_ms * (1.0 - self.duty_budget) / self.duty_budget
+        self.delay_ms = max(self.interval_ms, duty_floor)
+        if duty_floor > self.interval_ms:
+            self.throttled += 1
+        return self.delay_ms
+
+    def stats(self):
+        period = self._period_ms
+        return {
+            "state": self.state,
+            "interval_ms": round(self.interval_ms, 1),
+            "delay_ms": round(self.delay_ms, 1),
+            "rate_hz": round(1000.0 / period, 2) if period else 0.0,
+            "duty": round(min(1.0, self._busy_ms / period), 3) if period else 0.0,
+            "duty_budget": self.duty_budget,
+            "throttled": self.throttled,
+        }
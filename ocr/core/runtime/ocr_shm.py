@@ -1,31 +1,92 @@
 import ctypes
-from ctypes import wintypes
+import mmap
+import os
+import select
+import struct
+import sys
+import tempfile
+import threading
+import time
+import weakref
+
 import numpy as np
 import cv2
 
-_SHM_NAME  = "Local\\SETJA_OCR_FRAME_V1"
+import core.runtime.ocr_metrics as M
+
+_SHM_NAME  = "Local\\SETJA_OCR_FRAME_V2"
+_SHM_NAME_V1 = "Local\\SETJA_OCR_FRAME_V1"
 _SHM_MAGIC = 0x4D464A53
 _SHM_FMT_BGRA8 = 1
 
-kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+# V1: one seqlock-protected frame. V2: N-slot ring with a published "latest" slot.
+# The capture writer (sc_shm.cpp) only writes V2, under a mapping named _V2 so that a V1-only
+# reader finds nothing instead of misreading the ring. On Windows, V1 writers publish under _V1;
+# the reader falls back to that mapping while no _V2 one exists and goes by the header version.
+_SHM_VERSION_SINGLE = 1
+_SHM_VERSION_RING = 2
+
+# Linux/macOS stand-in for the Windows named mapping: a plain file mapped with mmap.
+_SHM_BACKEND = os.environ.get("SETJA_SHM_BACKEND") or ("win32" if sys.platform == "win32" else "posix")
+_SHM_PATH = os.environ.get("SETJA_SHM_PATH") or os.path.join(
+    "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(),
+    "SETJA_OCR_FRAME_V2",
+)
+
+# "new frame published" signal: auto-reset named event on Windows, FIFO doorbell elsewhere
+_EVT_NAME = "Local\\SETJA_OCR_FRAME_EVENT"
+_EVT_PATH = os.environ.get("SETJA_SHM_EVENT_PATH") or f"{_SHM_PATH}.evt"
+_EVT_FALLBACK_POLL_S = 0.005
 
-OpenFileMappingW = kernel32.OpenFileMappingW
-OpenFileMappingW.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.LPCWSTR]
-OpenFileMappingW.restype = wintypes.HANDLE
+FILE_MAP_READ = 0x0004
+FILE_MAP_ALL_ACCESS = 0x000F001F
+PAGE_READWRITE = 0x04
+SYNCHRONIZE = 0x00100000
+EVENT_MODIFY_STATE = 0x0002
+WAIT_OBJECT_0 = 0
+INVALID_HANDLE_VALUE = ctypes.c_void_p(-1).value
 
-MapViewOfFile = kernel32.MapViewOfFile
-MapViewOfFile.argtypes = [wintypes.HANDLE, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD, ctypes.c_size_t]
-MapViewOfFile.restype = wintypes.LPVOID
+if _SHM_BACKEND == "win32":
+    from ctypes import wintypes
 
-UnmapViewOfFile = kernel32.UnmapViewOfFile
-UnmapViewOfFile.argtypes = [wintypes.LPCVOID]
-UnmapViewOfFile.restype = wintypes.BOOL
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
 
-CloseHandle = kernel32.CloseHandle
-CloseHandle.argtypes = [wintypes.HANDLE]
-CloseHandle.restype = wintypes.BOOL
+    OpenFileMappingW = kernel32.OpenFileMappingW
+    OpenFileMappingW.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.LPCWSTR]
+    OpenFileMappingW.restype = wintypes.HANDLE
 
-FILE_MAP_READ = 0x0004
+    CreateFileMappingW = kernel32.CreateFileMappingW
+    CreateFileMappingW.argtypes = [wintypes.HANDLE, wintypes.LPVOID, wintypes.DWORD,
+                                   wintypes.DWORD, wintypes.DWORD, wintypes.LPCWSTR]
+    CreateFileMappingW.restype = wintypes.HANDLE
+
+    MapViewOfFile = kernel32.MapViewOfFile
+    MapViewOfFile.argtypes = [wintypes.HANDLE, wintypes.DWORD, wintypes.DWORD, wintypes.DWORD, ctypes.c_size_t]
+    MapViewOfFile.restype = wintypes.LPVOID
+
+    UnmapViewOfFile = kernel32.UnmapViewOfFile
+    UnmapViewOfFile.argtypes = [wintypes.LPCVOID]
+    UnmapViewOfFile.restype = wintypes.BOOL
+
+    CloseHandle = kernel32.CloseHandle
+    CloseHandle.argtypes = [wintypes.HANDLE]
+    CloseHandle.restype = wintypes.BOOL
+
+    OpenEventW = kernel32.OpenEventW
+    OpenEventW.argtypes = [wintypes.DWORD, wintypes.BOOL, wintypes.LPCWSTR]
+    OpenEventW.restype = wintypes.HANDLE
+
+    CreateEventW = kernel32.CreateEventW
+    CreateEventW.argtypes = [wintypes.LPVOID, wintypes.BOOL, wintypes.BOOL, wintypes.LPCWSTR]
+    CreateEventW.restype = wintypes.HANDLE
+
+    SetEvent = kernel32.SetEvent
+    SetEvent.argtypes = [wintypes.HANDLE]
+    SetEvent.restype = wintypes.BOOL
+
+    WaitForSingleObject = kernel32.WaitForSingleObject
+    WaitForSingleObject.argtypes = [wintypes.HANDLE, wintypes.DWORD]
+    WaitForSingleObject.restype = wintypes.DWORD
 
 
 class _ShmHeader(ctypes.Structure):
@@ -33,7 +94,7 @@ class _ShmHeader(ctypes.Structure):
     _fields_ = [
         ("magic", ctypes.c_uint32),
         ("version", ctypes.c_uint32),
-        ("seq", ctypes.c_long),  # LONG
+        ("seq", ctypes.c_int32),  # LONG, 32-bit on Windows (c_long is 64-bit on Linux)
         ("width", ctypes.c_int32),
         ("height", ctypes.c_int32),
         ("stride", ctypes.c_int32),
@@ -44,109 +105,641 @@ class _ShmHeader(ctypes.Structure):
     ]
 
 
-_shm_handle = None
-_shm_view = None
-_shm_view_size = 0
+class _ShmRingHeader(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [
+        ("magic", ctypes.c_uint32),
+        ("version", ctypes.c_uint32),
+        ("slot_count", ctypes.c_uint32),
+        ("slot_bytes", ctypes.c_uint32),
+        ("latest", ctypes.c_int32),      # index of the newest complete slot, -1 = none yet
+        ("reserved0", ctypes.c_uint32),
+        ("frame_seq", ctypes.c_int64),   # frame number published in `latest`
+        ("reserved1", ctypes.c_uint8 * 32),
+    ]
 
 
-def shm_close():
-    global _shm_handle, _shm_view, _shm_view_size
-    if _shm_view:
-        UnmapViewOfFile(_shm_view)
-    if _shm_handle:
-        CloseHandle(_shm_handle)
-    _shm_view = None
-    _shm_handle = None
-    _shm_view_size = 0
+class _ShmSlotHeader(ctypes.Structure):
+    _pack_ = 1
+    _fields_ = [
+        ("seq", ctypes.c_int64),         # per-slot seqlock, odd while the writer is inside
+        ("frame_seq", ctypes.c_int64),
+        ("ts_us", ctypes.c_int64),       # writer monotonic clock
+        ("width", ctypes.c_int32),
+        ("height", ctypes.c_int32),
+        ("stride", ctypes.c_int32),
+        ("format", ctypes.c_int32),
+        ("region_left", ctypes.c_int32),
+        ("region_top", ctypes.c_int32),
+        ("data_bytes", ctypes.c_uint32),
+        ("reserved0", ctypes.c_uint32),
+        ("reserved1", ctypes.c_uint64),
+    ]
 
 
-def _shm_open_min():
-    global _shm_handle, _shm_view, _shm_view_size
-    if _shm_handle and _shm_view and _shm_view_size >= ctypes.sizeof(_ShmHeader):
+_V1_SEQ_OFF = _ShmHeader.seq.offset
+_RING_LATEST_OFF = _ShmRingHeader.latest.offset
+_RING_HDR_SIZE = ctypes.sizeof(_ShmRingHeader)
+_SLOT_HDR_SIZE = ctypes.sizeof(_ShmSlotHeader)
+_MIN_VIEW = ctypes.sizeof(_ShmHeader)
+
+
+def ring_total_size(slot_count: int, slot_bytes: int) -> int:
+    return _RING_HDR_SIZE + int(slot_count) * (_SLOT_HDR_SIZE + int(slot_bytes))
+
+
+def ring_slot_offsets(slot_count: int, slot_bytes: int, slot: int):
+    hdr_off = _RING_HDR_SIZE + int(slot) * _SLOT_HDR_SIZE
+    data_off = _RING_HDR_SIZE + int(slot_count) * _SLOT_HDR_SIZE + int(slot) * int(slot_bytes)
+    return hdr_off, data_off
+
+
+class _Win32Mapping:
+    def __init__(self, name: str = _SHM_NAME, fallbacks=()):
+        self.name = name
+        self.fallbacks = tuple(fallbacks)  # older mapping names, read only while `name` is missing
+        self.opened = None                 # name the current handle was opened under
+        self.handle = None
+        self.view = None
+        self.size = 0
+        self.buf = None
+        self._owner = None  # weakref to the ctypes array every memoryview/ndarray of the view keeps alive
+        self._retired = []  # (view, owner) of views replaced while arrays still pointed into them
+
+    def _set_view(self, view, size):
+        # a subclass so the array can be weak-referenced
+        arr = type("_MappedView", (ctypes.c_ubyte * size,), {}).from_address(view)
+        self.view = view
+        self.size = size
+        self._owner = weakref.ref(arr)
+        self.buf = memoryview(arr).cast("B")
+
+    def _unmap(self):
+        if self.view:
+            self._retired.append((self.view, self._owner))
+        self.buf = None
+        self._owner = None
+        self.view = None
+        self.size = 0
+        self._reap()
+
+    def _reap(self):
+        # A replaced view is unmapped only once no borrowed or pinned array points into it any
+        # more; until then it stays mapped (stale but valid memory).
+        keep = []
+        for view, owner in self._retired:
+            if owner is not None and owner() is not None:
+                keep.append((view, owner))
+                continue
+            UnmapViewOfFile(view)
+        self._retired = keep
+
+    def attach(self, min_size: int) -> bool:
+        if self.handle and self.view and self.size >= min_size:
+            if self.opened == self.name:
+                return True
+            # on a fallback mapping: switch as soon as the current writer's one shows up
+            h = OpenFileMappingW(FILE_MAP_READ, False, self.name)
+            if not h:
+                return True
+            CloseHandle(h)
+        self.close()
+
+        for name in (self.name,) + self.fallbacks:
+            h = OpenFileMappingW(FILE_MAP_READ, False, name)
+            if h:
+                break
+        else:
+            return False
+        view = MapViewOfFile(h, FILE_MAP_READ, 0, 0, min_size)
+        if not view:
+            CloseHandle(h)
+            return False
+        self.handle = h
+        self.opened = name
+        self._set_view(view, min_size)
         return True
 
-    shm_close()
+    def remap(self, size: int) -> bool:
+        if self.view and self.size == size:
+            return True
+        self._unmap()
+        view = MapViewOfFile(self.handle, FILE_MAP_READ, 0, 0, size)
+        if not view:
+            self.close()
+            return False
+        self._set_view(view, size)
+        return True
 
-    h = OpenFileMappingW(FILE_MAP_READ, False, _SHM_NAME)
-    if not h:
-        return False
+    def create(self, size: int) -> bool:
+        self.close()
+        h = CreateFileMappingW(INVALID_HANDLE_VALUE, None, PAGE_READWRITE,
+                               (size >> 32) & 0xFFFFFFFF, size & 0xFFFFFFFF, self.name)
+        if not h:
+            return False
+        view = MapViewOfFile(h, FILE_MAP_ALL_ACCESS, 0, 0, size)
+        if not view:
+            CloseHandle(h)
+            return False
+        self.handle = h
+        self.opened = self.name
+        self._set_view(view, size)
+        return True
 
-    view = MapViewOfFile(h, FILE_MAP_READ, 0, 0, ctypes.sizeof(_ShmHeader))
-    if not view:
-        CloseHandle(h)
-        return False
+    def close(self, unlink: bool = False):
+        self._unmap()
+        if self.handle:
+            CloseHandle(self.handle)
+        self.handle = None
+        self.opened = None
+
+
+class _PosixMapping:
+    def __init__(self, path: str = _SHM_PATH):
+        self.path = path
+        self.mm = None
+        self.ino = None
+        self.size = 0
+        self.buf = None
+
+    def _map(self, size: int, writable: bool) -> bool:
+        flags = os.O_RDWR if writable else os.O_RDONLY
+        try:
+            fd = os.open(self.path, flags)
+        except OSError:
+            return False
+        try:
+            st = os.fstat(fd)
+            if st.st_size < size:
+                return False
+            access = mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            self.mm = mmap.mmap(fd, size, access=access)
+            self.ino = st.st_ino
+        finally:
+            os.close(fd)
+        self.size = size
+        self.buf = memoryview(self.mm)
+        return True
 
-    _shm_handle = h
-    _shm_view = view
-    _shm_view_size = ctypes.sizeof(_ShmHeader)
-    return True
+    def _unmap(self):
+        if self.buf is not None:
+            try:
+                self.buf.release()
+            except BufferError:
+                pass
+        self.buf = None
+        if self.mm is not None:
+            try:
+                self.mm.close()
+            except BufferError:
+                # a borrowed view still points into the old mapping; it is freed with that view
+                pass
+        self.mm = None
+        self.size = 0
+
+    def _replaced(self) -> bool:
+        try:
+            return os.stat(self.path).st_ino != self.ino
+        except OSError:
+            return True
+
+    def attach(self, min_size: int) -> bool:
+        if self.mm is not None and self.size >= min_size and not self._replaced():
+            return True
+        self.close()
+        return self._map(min_size, writable=False)
+
+    def remap(self, size: int) -> bool:
+        if self.mm is not None and self.size == size:
+            return True
+        self._unmap()
+        if not self._map(size, writable=False):
+            self.close()
+            return False
+        return True
+
+    def create(self, size: int) -> bool:
+        self.close()
+        tmp = f"{self.path}.tmp{os.getpid()}"
+        fd = os.open(tmp, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            os.ftruncate(fd, size)
+        finally:
+            os.close(fd)
+        # readers only ever see a fully sized file
+        os.replace(tmp, self.path)
+        return self._map(size, writable=True)
+
+    def close(self, unlink: bool = False):
+        self._unmap()
+        self.ino = None
+        if unlink:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class _Win32Signal:
+    def __init__(self, name: str = _EVT_NAME):
+        self.name = name
+        self.handle = None
+
+    def open_writer(self) -> bool:
+        self.handle = CreateEventW(None, False, False, self.name)
+        return bool(self.handle)
+
+    def notify(self):
+        if self.handle:
+            SetEvent(self.handle)
+
+    def wait(self, timeout_s: float) -> bool:
+        if not self.handle:
+            self.handle = OpenEventW(SYNCHRONIZE, False, self.name)
+        if not self.handle:
+            time.sleep(min(timeout_s, _EVT_FALLBACK_POLL_S))
+            return False
+        return WaitForSingleObject(self.handle, max(0, int(timeout_s * 1000.0))) == WAIT_OBJECT_0
+
+    def close(self, unlink: bool = False):
+        if self.handle:
+            CloseHandle(self.handle)
+        self.handle = None
+
+
+class _FifoSignal:
+    # Single-consumer doorbell: the writer drops a byte per frame, the reader select()s and drains.
+    def __init__(self, path: str = _EVT_PATH):
+        self.path = path
+        self.fd = None
+        self.ino = None
+
+    def _open(self) -> bool:
+        try:
+            self.fd = os.open(self.path, os.O_RDWR | os.O_NONBLOCK)
+            self.ino = os.fstat(self.fd).st_ino
+        except OSError:
+            self.fd = None
+        return self.fd is not None
+
+    def open_writer(self) -> bool:
+        try:
+            os.mkfifo(self.path, 0o600)
+        except FileExistsError:
+            pass
+        except (OSError, AttributeError):
+            return False
+        return self._open()
+
+    def notify(self):
+        if self.fd is None:
+            return
+        try:
+            os.write(self.fd, b"\1")
+        except (BlockingIOError, OSError):
+            pass
+
+    def wait(self, timeout_s: float) -> bool:
+        if self.fd is None and not self._open():
+            time.sleep(min(timeout_s, _EVT_FALLBACK_POLL_S))
+            return False
+
+        r, _, _ = select.select([self.fd], [], [], max(0.0, timeout_s))
+        if not r:
+            try:
+                if os.stat(self.path).st_ino != self.ino:
+                    self.close()
+            except OSError:
+                self.close()
+            return False
+
+        try:
+            while os.read(self.fd, 4096):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        return True
+
+    def close(self, unlink: bool = False):
+        if self.fd is not None:
+            os.close(self.fd)
+        self.fd = None
+        self.ino = None
+        if unlink:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def make_signal(backend: str = None, name: str = None):
+    backend = backend or _SHM_BACKEND
+    if backend == "win32":
+        return _Win32Signal(name or _EVT_NAME)
+    return _FifoSignal(name or _EVT_PATH)
+
+
+def make_mapping(backend: str = None, name: str = None):
+    backend = backend or _SHM_BACKEND
+    if backend == "win32":
+        return _Win32Mapping(name) if name else _Win32Mapping(_SHM_NAME, (_SHM_NAME_V1,))
+    return _PosixMapping(name or _SHM_PATH)
+
+
+_mapping = make_mapping()
+_signal = make_signal()
+# The poller, the frame acquirer and HTTP threads share _mapping: attach/remap/close happen under
+# _map_lock, and each read pins the current view (_pin) so a remap elsewhere cannot unmap it.
+_map_lock = threading.Lock()
+
+
+def shm_close():
+    with _map_lock:
+        _mapping.close()
+    _signal.close()
+
+
+def _shm_open_min():
+    return _mapping.attach(_MIN_VIEW)
 
 
 def _shm_remap_full(total_size: int):
-    global _shm_view, _shm_view_size
+    return _mapping.remap(total_size)
 
-    if _shm_view and _shm_view_size == total_size:
-        return True
 
-    if _shm_view:
-        UnmapViewOfFile(_shm_view)
-        _shm_view = None
-        _shm_view_size = 0
+def _pin():
+    # uint8 array over the whole current view; it holds a buffer export, so the view stays
+    # mapped for as long as this array (or anything sliced from it) is alive
+    return np.frombuffer(_mapping.buf, dtype=np.uint8)
 
-    view = MapViewOfFile(_shm_handle, FILE_MAP_READ, 0, 0, total_size)
-    if not view:
-        shm_close()
-        return False
 
-    _shm_view = view
-    _shm_view_size = total_size
-    return True
+_NOT_STABLE = "Waiting for a stable frame…"
 
 
-def read_frame_bgr(max_spin: int = 200):
-    if not _shm_open_min():
-        return None, "Waiting for screen capture…"
+class _Frame:
+    __slots__ = ("seq_off", "seq_fmt", "seq", "data_off", "w", "h", "stride", "meta")
 
-    hdr0 = _ShmHeader.from_address(_shm_view)
+    def __init__(self, seq_off, seq_fmt, seq, data_off, w, h, stride, meta):
+        self.seq_off = seq_off
+        self.seq_fmt = seq_fmt
+        self.seq = seq
+        self.data_off = data_off
+        self.w = w
+        self.h = h
+        self.stride = stride
+        self.meta = meta
 
-    if hdr0.magic != _SHM_MAGIC or hdr0.version != 1:
-        return None, "Capture stream is not ready yet."
-    if hdr0.format != _SHM_FMT_BGRA8:
-        return None, "Capture format not supported."
-    if hdr0.width <= 0 or hdr0.height <= 0 or hdr0.stride <= 0 or hdr0.data_bytes <= 0:
-        return None, "Capture region is invalid."
+    def seq_now(self, buf):
+        return struct.unpack_from(self.seq_fmt, buf, self.seq_off)[0]
 
-    total_size = ctypes.sizeof(_ShmHeader) + int(hdr0.data_bytes)
-    if not _shm_remap_full(total_size):
-        return None, "Cannot read the capture stream."
+    def bgra_view(self, buf):
+        raw = np.frombuffer(buf, dtype=np.uint8, count=self.h * self.stride, offset=self.data_off)
+        return raw.reshape((self.h, self.stride))[:, : self.w * 4].reshape((self.h, self.w, 4))
 
-    hdr = _ShmHeader.from_address(_shm_view)
-    base = (ctypes.c_ubyte * total_size).from_address(_shm_view)
-    offset = ctypes.sizeof(_ShmHeader)
 
-    for _ in range(max_spin):
-        s1 = hdr.seq
-        if s1 & 1:
-            continue
+def _bgra_to_bgr(raw, w: int, h: int, stride: int):
+    t0 = time.perf_counter()
+    rows = raw.reshape((h, stride))
+    bgra = rows[:, : w * 4].reshape((h, w, 4))
+    out = cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+    M.CONVERT.since(t0)
+    return out
 
-        raw = np.frombuffer(base, dtype=np.uint8, count=int(hdr.data_bytes), offset=offset).copy()
 
-        s2 = hdr.seq
-        if s1 == s2 and not (s2 & 1):
-            h = int(hdr.height)
-            w = int(hdr.width)
-            stride = int(hdr.stride)
+def _open_stream():
+    # -> (attempts, locate, pinned view) or error string
+    with _map_lock:
+        opened = _open_stream_locked()
+        if isinstance(opened, str):
+            return opened
+        return opened + (_pin(),)
+
+
+def _open_stream_locked():
+    if not _shm_open_min():
+        return "Waiting for screen capture…"
+
+    hdr0 = _ShmHeader.from_buffer_copy(_mapping.buf)
 
-            rows = raw.reshape((h, stride))
-            bgra = rows[:, : w * 4].reshape((h, w, 4))
-            bgr = cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR)
+    if hdr0.magic != _SHM_MAGIC:
+        return "Capture stream is not ready yet."
 
-            meta = {
-                "w": w,
-                "h": h,
-                "left": int(hdr.region_left),
-                "top": int(hdr.region_top),
-            }
-            return bgr, meta
+    if hdr0.version == _SHM_VERSION_RING:
+        slot_count, slot_bytes = struct.unpack_from("<II", _mapping.buf, _ShmRingHeader.slot_count.offset)
+        if slot_count <= 0 or slot_bytes <= 0:
+            return "Capture region is invalid."
+        if not _shm_remap_full(ring_total_size(slot_count, slot_bytes)):
+            return "Cannot read the capture stream."
+        # The writer never touches the published slot until it has filled every other slot,
+        # so a failed check only happens when we were lapped; retry on the new latest slot.
+        return slot_count, lambda buf: _locate_ring(buf, slot_count, slot_bytes)
 
-    return None, "Waiting for a stable frame…"
+    if hdr0.version != _SHM_VERSION_SINGLE:
+        return "Capture stream is not ready yet."
+    if hdr0.format != _SHM_FMT_BGRA8:
+        return "Capture format not supported."
+    if hdr0.width <= 0 or hdr0.height <= 0 or hdr0.stride <= 0 or hdr0.data_bytes <= 0:
+        return "Capture region is invalid."
+
+    total_size = ctypes.sizeof(_ShmHeader) + int(hdr0.data_bytes)
+    if not _shm_remap_full(total_size):
+        return "Cannot read the capture stream."
+    return None, _locate_single
+
+
+def _locate_single(buf):
+    s1 = struct.unpack_from("<i", buf, _V1_SEQ_OFF)[0]
+    if s1 & 1:
+        return None
+
+    hdr = _ShmHeader.from_buffer_copy(buf)
+    w = int(hdr.width)
+    h = int(hdr.height)
+    stride = int(hdr.stride)
+    if w <= 0 or h <= 0 or stride < w * 4 or ctypes.sizeof(hdr) + h * stride > len(buf):
+        return None
+
+    meta = {
+        "w": w,
+        "h": h,
+        "left": int(hdr.region_left),
+        "top": int(hdr.region_top),
+        "seq": s1 >> 1,
+    }
+    return _Frame(_V1_SEQ_OFF, "<i", s1, ctypes.sizeof(_ShmHeader), w, h, stride, meta)
+
+
+def _locate_ring(buf, slot_count: int, slot_bytes: int):
+    slot = struct.unpack_from("<i", buf, _RING_LATEST_OFF)[0]
+    if slot < 0 or slot >= slot_count:
+        return "Capture stream is not ready yet."
+
+    hdr_off, data_off = ring_slot_offsets(slot_count, slot_bytes, slot)
+    s1 = struct.unpack_from("<q", buf, hdr_off)[0]
+    if s1 & 1:
+        return None
+
+    sh = _ShmSlotHeader.from_buffer_copy(buf, hdr_off)
+    w = int(sh.width)
+    h = int(sh.height)
+    stride = int(sh.stride)
+    if sh.format != _SHM_FMT_BGRA8:
+        return "Capture format not supported."
+    if w <= 0 or h <= 0 or stride < w * 4 or sh.data_bytes < h * stride or sh.data_bytes > slot_bytes:
+        return None
+
+    meta = {
+        "w": w,
+        "h": h,
+        "left": int(sh.region_left),
+        "top": int(sh.region_top),
+        "seq": int(sh.frame_seq),
+        "ts_us": int(sh.ts_us),
+    }
+    return _Frame(hdr_off, "<q", s1, data_off, w, h, stride, meta)
+
+
+def frame_seq():
+    # Number of the newest published frame (V1: seqlock count / 2), None if no stream.
+    with _map_lock:
+        if not _shm_open_min():
+            return None
+        buf = _pin()
+    magic, version = struct.unpack_from("<II", buf, 0)
+    if magic != _SHM_MAGIC:
+        return None
+    if version == _SHM_VERSION_RING:
+        return struct.unpack_from("<q", buf, _ShmRingHeader.frame_seq.offset)[0]
+    if version == _SHM_VERSION_SINGLE:
+        return struct.unpack_from("<i", buf, _V1_SEQ_OFF)[0] >> 1
+    return None
+
+
+def wait_frame(last_seq, timeout_ms: float):
+    # Blocks until a frame newer than last_seq is published or the timeout expires;
+    # returns the current frame_seq(). Falls back to short sleeps if the writer has no signal.
+    deadline = time.monotonic() + max(0.0, timeout_ms) / 1000.0
+    while True:
+        seq = frame_seq()
+        if seq is not None and seq != last_seq:
+            return seq
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return seq
+        if seq is None:
+            time.sleep(min(remaining, 0.05))
+            continue
+        _signal.wait(remaining)
+
+
+def _read(max_spin: int, consume, mode: str):
+    # mode labels the metrics: "copy" / "bgr" (full frame) or "borrow" (change-detector look)
+    t0 = time.perf_counter()
+    opened = _open_stream()
+    if isinstance(opened, str):
+        M.SHM_FAILED.labels("unavailable").inc()
+        return None, opened
+    attempts, locate, buf = opened
+
+    spins = 0
+    torn = 0
+    try:
+        for _ in range(attempts or max_spin):
+            spins += 1
+            fr = locate(buf)
+            if fr is None:
+                continue
+            if isinstance(fr, str):
+                M.SHM_FAILED.labels("bad_header").inc()
+                return None, fr
+
+            out = consume(buf, fr)
+
+            if fr.seq_now(buf) == fr.seq:
+                M.SHM_READ.labels(mode).since(t0)
+                return out, fr
+            torn += 1
+
+        M.SHM_FAILED.labels("not_stable").inc()
+        return None, _NOT_STABLE
+    finally:
+        M.SHM_SPINS.labels(mode).observe(spins)
+        if torn:
+            M.SHM_TORN.inc(torn)
+
+
+def _consume_copy(buf, fr):
+    return np.frombuffer(buf, dtype=np.uint8, count=fr.h * fr.stride, offset=fr.data_off).copy()
+
+
+def read_frame_bgr(max_spin: int = 200, out=None, direct: bool = False):
+    # direct/out: convert straight from the mapped view (no staging copy of the padded BGRA
+    # buffer) into `out` when its shape fits; the seqlock is re-checked after the conversion.
+    if out is None and not direct:
+        raw, fr = _read(max_spin, _consume_copy, "copy")
+        if raw is None:
+            return None, fr
+        return _bgra_to_bgr(raw, fr.w, fr.h, fr.stride), fr.meta
+
+    def consume(buf, fr):
+        dst = out
+        if dst is None or dst.shape != (fr.h, fr.w, 3) or dst.dtype != np.uint8:
+            dst = np.empty((fr.h, fr.w, 3), dtype=np.uint8)
+        t0 = time.perf_counter()
+        cv2.cvtColor(fr.bgra_view(buf), cv2.COLOR_BGRA2BGR, dst=dst)
+        M.CONVERT.since(t0)
+        return dst
+
+    bgr, fr = _read(max_spin, consume, "bgr")
+    if bgr is None:
+        return None, fr
+    return bgr, fr.meta
+
+
+class FrameReader:
+    # Owns one reusable BGR buffer; the returned image is overwritten by the next read().
+    def __init__(self, max_spin: int = 200):
+        self.max_spin = max_spin
+        self._out = None
+
+    def read(self):
+        img, meta_or_err = read_frame_bgr(self.max_spin, out=self._out, direct=True)
+        if img is not None:
+            self._out = img
+        return img, meta_or_err
+
+
+def borrow_frame_bgra(step: int = 1, roi=None, max_spin: int = 200):
+    # Zero-copy look at the current frame: a read-only BGRA view into the mapping, optionally
+    # cropped to roi=(x, y, w, h) and subsampled by `step`. The view is only meaningful while
+    # borrow_still_valid(meta) is True; check it after using the pixels.
+    step = max(1, int(step))
+    pinned = []
+
+    def consume(buf, fr):
+        pinned[:] = [buf]
+        view = fr.bgra_view(buf)
+        if roi is not None:
+            x, y, w, h = (int(v) for v in roi)
+            x = min(max(0, x), fr.w)
+            y = min(max(0, y), fr.h)
+            view = view[y:y + max(0, h), x:x + max(0, w)]
+        return view[::step, ::step]
+
+    view, fr = _read(max_spin, consume, "borrow")
+    if view is None:
+        return None, fr
+
+    meta = dict(fr.meta)
+    meta["token"] = (pinned[0], fr.seq_off, fr.seq_fmt, fr.seq)
+    return view, meta
+
+
+def borrow_still_valid(meta) -> bool:
+    # checks the seqlock in the view the frame was borrowed from, not the current mapping
+    if not meta or "token" not in meta:
+        return False
+    buf, seq_off, seq_fmt, seq = meta["token"]
+    if seq_off + struct.calcsize(seq_fmt) > len(buf):
+        return False
+    return struct.unpack_from(seq_fmt, buf, seq_off)[0] == seq
@@ -0,0 +1,103 @@
+import ctypes
+import struct
+import time
+
+import numpy as np
+import cv2
+
+import core.runtime.ocr_shm as SHM
+
+
+class ShmFrameWriter:
+    # Pure-Python counterpart of capture/screen_capture/core/shm (used for replay and benchmarks).
+    def __init__(self, version: int = SHM._SHM_VERSION_RING, slot_count: int = 3,
+                 slot_bytes: int = 1920 * 1080 * 4, backend: str = None, name: str = None):
+        self.version = int(version)
+        self.slot_count = max(2, int(slot_count)) if self.version == SHM._SHM_VERSION_RING else 1
+        self.slot_bytes = int(slot_bytes)
+        self.frame_seq = 0
+        self._latest = -1
+        mapping_name = name
+        if name is None and self.version == SHM._SHM_VERSION_SINGLE and (backend or SHM._SHM_BACKEND) == "win32":
+            mapping_name = SHM._SHM_NAME_V1  # where V1 writers publish on Windows
+        self._mapping = SHM.make_mapping(backend, mapping_name)
+        self._signal = SHM.make_signal(backend, None if name is None else f"{name}.evt")
+
+        if self.version == SHM._SHM_VERSION_RING:
+            size = SHM.ring_total_size(self.slot_count, self.slot_bytes)
+        else:
+            size = ctypes.sizeof(SHM._ShmHeader) + self.slot_bytes
+        if not self._mapping.create(size):
+            raise OSError("Cannot create the capture shared memory.")
+
+        buf = self._mapping.buf
+        np.frombuffer(buf, dtype=np.uint8, count=size)[:] = 0
+
+        if self.version == SHM._SHM_VERSION_RING:
+            hdr = SHM._ShmRingHeader(magic=SHM._SHM_MAGIC, version=self.version,
+                                     slot_count=self.slot_count, slot_bytes=self.slot_bytes,
+                                     latest=-1, frame_seq=0)
+            buf[:ctypes.sizeof(hdr)] = bytes(hdr)
+
+        self._signal.open_writer()
+
+    def _as_bgra(self, img):
+        if img.ndim == 2:
+            return cv2.cvtColor(img, cv2.COLOR_GRAY2BGRA)
+        if img.shape[2] == 3:
+            return cv2.cvtColor(img, cv2.COLOR_BGR2BGRA)
+        return img
+
+    def _copy_rows(self, offset: int, bgra, stride: int):
+        h, w = bgra.shape[:2]
+        dst = np.frombuffer(self._mapping.buf, dtype=np.uint8, count=h * stride, offset=offset)
+        dst.reshape((h, stride))[:, : w * 4] = bgra.reshape((h, w * 4))
+        del dst
+
+    def write_frame(self, img, left: int = 0, top: int = 0, ts_us: int = None) -> int:
+        bgra = self._as_bgra(np.ascontiguousarray(img))
+        h, w = bgra.shape[:2]
+        stride = w * 4
+        data_bytes = h * stride
+        if data_bytes > self.slot_bytes:
+            raise ValueError(f"Frame {w}x{h} does not fit a {self.slot_bytes} byte slot.")
+
+        buf = self._mapping.buf
+        self.frame_seq += 1
+        if ts_us is None:
+            ts_us = time.monotonic_ns() // 1000
+
+        if self.version != SHM._SHM_VERSION_RING:
+            seq = struct.unpack_from("<i", buf, SHM._V1_SEQ_OFF)[0]
+            struct.pack_into("<i", buf, SHM._V1_SEQ_OFF, seq + 1)
+            hdr = SHM._ShmHeader(magic=SHM._SHM_MAGIC, version=self.version, seq=seq + 1,
+                                 width=w, height=h, stride=stride, format=SHM._SHM_FMT_BGRA8,
+                                 region_left=int(left), region_top=int(top), data_bytes=data_bytes)
+            buf[:ctypes.sizeof(hdr)] = bytes(hdr)
+            self._copy_rows(ctypes.sizeof(hdr), bgra, stride)
+            struct.pack_into("<i", buf, SHM._V1_SEQ_OFF, seq + 2)
+            self._signal.notify()
+            return self.frame_seq
+
+        slot = (self._latest + 1) % self.slot_count
+        hdr_off, data_off = SHM.ring_slot_offsets(self.slot_count, self.slot_bytes, slot)
+
+        seq = struct.unpack_from("<q", buf, hdr_off)[0]
+        struct.pack_into("<q", buf, hdr_off, seq + 1)
+        sh = SHM._ShmSlotHeader(seq=seq + 1, frame_seq=self.frame_seq, ts_us=int(ts_us),
+                                width=w, height=h, stride=stride, format=SHM._SHM_FMT_BGRA8,
+                                region_left=int(left), region_top=int(top), data_bytes=data_bytes)
+        buf[hdr_off:hdr_off + ctypes.sizeof(sh)] = bytes(sh)
+        self._copy_rows(data_off, bgra, stride)
+        struct.pack_into("<q", buf, hdr_off, seq + 2)
+
+        # publish: slot index first, the frame number is informational
+        self._latest = slot
+        struct.pack_into("<i", buf, SHM._RING_LATEST_OFF, slot)
+        struct.pack_into("<q", buf, SHM._ShmRingHeader.frame_seq.offset, self.frame_seq)
+        self._signal.notify()
+        return self.frame_seq
+
+    def close(self, unlink: bool = True):
+        self._mapping.close(unlink=unlink)
+        self._signal.close(unlink=unlink)
@@ -0,0 +1,60 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# wall-clock time the launcher first ran, set before bootstrap_env may re-exec into the venv python
+T0_ENV = "SETJA_OCR_T0"
+
+
+class Startup:
+    # Cold-start bookkeeping for /health: readiness state plus the time spent in each phase.
+    # starting -> warming (listening, models loading / warm-up running) -> ready | failed
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._t0 = time.monotonic()
+        self.state = "starting"
+        self.error = None
+        self.phases = []  # [(name, ms)] in the order they finished
+        self.ready_ms = None
+        try:
+            launched = float(os.environ.get(T0_ENV, ""))
+        except ValueError:
+            launched = None
+        # launcher -> this interpreter, incl. the venv re-exec and interpreter start-up
+        if launched is not None:
+            self.phases.append(("launch", max(0.0, (time.time() - launched) * 1000.0)))
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            ms = (time.perf_counter() - t0) * 1000.0
+            with self._lock:
+                self.phases.append((name, ms))
+
+    def set_state(self, state: str, error: str = None):
+        with self._lock:
+            self.state = state
+            self.error = error
+            if state == "ready":
+                self.ready_ms = (time.monotonic() - self._t0) * 1000.0
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def health(self):
+        with self._lock:
+            return {
+                "state": self.state,
+                "error": self.error,
+                "uptime_ms": round((time.monotonic() - self._t0) * 1000.0, 1),
+                "ready_ms": round(self.ready_ms, 1) if self.ready_ms is not None else None,
+                "phases_ms": {name: round(ms, 1) for name, ms in self.phases},
+            }
+
+
+STARTUP = Startup()
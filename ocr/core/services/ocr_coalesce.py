@@ -0,0 +1,132 @@
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+
+import core.runtime.ocr_config as CFG
+import core.runtime.ocr_engine as OCR
+
+
+def opts_key(use_gpu: bool, use_angle_cls: bool, cls: bool):
+    # results are interchangeable when the same model ran with the same classifier setting
+    return OCR.POOL.model_key(use_gpu, use_angle_cls), bool(cls)
+
+
+class _Flight:
+    __slots__ = ("key", "future")
+
+    def __init__(self, key):
+        self.key = key
+        self.future = Future()
+
+
+class ShmCoalescer:
+    # One OCR result per SHM frame: /ocr_shm answers from the newest result for the frame (the
+    # poller's or an earlier request's), or joins the inference already running for it, and only
+    # runs its own when neither exists. Results are {"ok", "text", "texts", "boxs", "scores",
+    # "avg_conf", "frame", "seq"} dicts (or {"ok": False, "error"}); callers add their own envelope.
+    # A joined inference that does not finish within join_wait_ms is given up on and the request
+    # runs its own, so a stuck owner cannot hang every waiting request.
+    def __init__(self, join_wait_ms: float = 1000.0):
+        self.join_wait_s = max(0.0, float(join_wait_ms)) / 1000.0
+        self._lock = threading.Lock()
+        self._flights = {}  # (seq, opts) -> _Flight
+        self._last = {}     # opts -> (seq, monotonic ts, result)
+        self.requests = 0
+        self.from_latest = 0
+        self.shared = 0
+        self.runs = 0
+        self.join_timeouts = 0
+
+    @staticmethod
+    def fresh(seq, ts: float, cur, now: float, max_age_ms=None, min_seq=None) -> bool:
+        # no constraints given: only the current frame will do
+        if max_age_ms is None and min_seq is None:
+            return cur is not None and seq >= cur
+        if min_seq is not None and seq < min_seq:
+            return False
+        if max_age_ms is not None and (now - ts) * 1000.0 > max_age_ms:
+            return False
+        return True
+
+    def publish(self, opts, seq, result):
+        # a finished result for frame `seq` (poller payloads included); older ones never replace newer
+        with self._lock:
+            last = self._last.get(opts)
+            if last is None or seq >= last[0]:
+                self._last[opts] = (seq, time.monotonic(), result)
+
+    def begin(self, seq, opts):
+        # register an inference for (seq, opts); None if one is already running for it
+        key = (seq, opts)
+        with self._lock:
+            if key in self._flights:
+                return None
+            flight = self._flights[key] = _Flight(key)
+            return flight
+
+    def finish(self, flight, result=None, error: BaseException = None):
+        if flight is None:
+            return
+        with self._lock:
+            if self._flights.get(flight.key) is not flight:
+                return  # already finished
+            del self._flights[flight.key]
+        if error is not None:
+            flight.future.set_exception(error)
+            return
+        if result.get("ok"):
+            self.publish(flight.key[1], result["seq"], result)
+        flight.future.set_result(result)
+
+    def get(self, opts, cur, compute, max_age_ms=None, min_seq=None):
+        # -> (result, how, age_ms) with how in "latest" / "shared" / "run"; compute() reads the
+        # frame and runs OCR
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            last = self._last.get(opts)
+            if last is not None and self.fresh(last[0], last[1], cur, now, max_age_ms, min_seq):
+                self.from_latest += 1
+                return last[2], "latest", (now - last[1]) * 1000.0
+            joined = self._flights.get((cur, opts)) if cur is not None else None
+            if joined is not None:
+                self.shared += 1
+            else:
+                self.runs += 1
+                flight = None
+                if cur is not None:
+                    flight = self._flights[(cur, opts)] = _Flight((cur, opts))
+
+        if joined is not None:
+            try:
+                return joined.future.result(timeout=self.join_wait_s), "shared", 0.0
+            except FutureTimeout:
+                with self._lock:
+                    self.join_timeouts += 1
+                    self.shared -= 1
+                    self.runs += 1
+                # private run, not registered: the stuck flight keeps its key
+                return compute(), "run", 0.0
+        try:
+            result = compute()
+        except BaseException as e:
+            self.finish(flight, error=e)
+            raise
+        self.finish(flight, result)
+        return result, "run", 0.0
+
+    def stats(self):
+        with self._lock:
+            n = self.requests
+            return {
+                "requests": n,
+                "from_latest": self.from_latest,
+                "shared": self.shared,
+                "runs": self.runs,
+                "join_timeouts": self.join_timeouts,
+                "inference_saved": round((self.from_latest + self.shared) / n, 4) if n else 0.0,
+                "in_flight": len(self._flights),
+            }
+
+
+COALESCER = ShmCoalescer(CFG.SHM_JOIN_WAIT_MS)
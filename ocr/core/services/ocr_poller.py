@@ -1,14 +1,29 @@
+import queue
 import threading
 import time
 
 import core.runtime.ocr_config as CFG
 import core.runtime.ocr_shm as SHM
 import core.runtime.ocr_engine as OCR
+import core.runtime.ocr_metrics as M
+import core.runtime.ocr_schedule as SCHED
+from core.runtime.ocr_acquire import FrameAcquirer
+from core.runtime.ocr_change import FrameChangeDetector
+from core.runtime.ocr_fusion import TextFusion
+from core.runtime.ocr_lines import LineTracker
+from core.services.ocr_coalesce import COALESCER, opts_key
+from core.services.ocr_stream import PayloadStream
 
 
 _latest_lock = threading.Lock()
 LATEST_TEXT = ""
 LATEST_JSON = {"ok": False, "error": "no_data_yet"}
+# every payload, pushed to GET /stream subscribers
+STREAM = PayloadStream(CFG.STREAM_MAX_SUBSCRIBERS)
+
+
+def _opts():
+    return opts_key(CFG.AUTO_GPU, CFG.AUTO_ANGLE, CFG.AUTO_CLS)
 
 
 def _set_latest(payload):
@@ -16,6 +31,10 @@ def _set_latest(payload):
     with _latest_lock:
         LATEST_JSON = payload
         LATEST_TEXT = (payload.get("text") or "").strip()
+    STREAM.publish(payload)
+    if payload.get("ok"):
+        # /ocr_shm answers from this while it is still the current frame
+        COALESCER.publish(_opts(), payload["seq"], payload)
 
 
 def get_latest():
@@ -23,68 +42,435 @@ def get_latest():
         return LATEST_JSON
 
 
+def _components():
+    # -> (change detector, line tracker, fusion, scheduler) as configured
+    detector = FrameChangeDetector(
+        step=CFG.CHANGE_STEP,
+        pixel_tol=CFG.CHANGE_PIXEL_TOL,
+        min_pixels=CFG.CHANGE_MIN_PIXELS,
+        refresh_ms=CFG.CHANGE_REFRESH_MS,
+    )
+    tracker = LineTracker(
+        redetect_every=CFG.INCR_REDETECT_EVERY,
+        iou_match=CFG.INCR_IOU_MATCH,
+        step=CFG.CHANGE_STEP,
+        pixel_tol=CFG.CHANGE_PIXEL_TOL,
+        min_pixels=CFG.CHANGE_MIN_PIXELS,
+    )
+    fusion = TextFusion(
+        window=CFG.FUSION_WINDOW,
+        min_frames=CFG.FUSION_MIN_FRAMES,
+        agree=CFG.FUSION_AGREE,
+        reset_sim=CFG.FUSION_RESET_SIM,
+        iou_match=CFG.INCR_IOU_MATCH,
+    )
+    sched = SCHED.PollScheduler(
+        min_ms=CFG.POLL_MIN_MS,
+        base_ms=CFG.POLL_INTERVAL_MS,
+        stable_ms=CFG.POLL_STABLE_MAX_MS,
+        error_ms=CFG.POLL_ERROR_MAX_MS,
+        backoff=CFG.POLL_BACKOFF,
+        duty_budget=CFG.POLL_DUTY_BUDGET,
+    )
+    return detector, tracker, fusion, sched
+
+
+def _run_ocr(tracker, img):
+    ocr = OCR.POOL.get(lang=CFG.AUTO_LANG, use_gpu=CFG.AUTO_GPU, use_angle_cls=CFG.AUTO_ANGLE)
+    if CFG.INCREMENTAL_OCR:
+        return tracker.run(OCR.POOL, ocr, img, cls=CFG.AUTO_CLS,
+                           drop_score=getattr(ocr, "drop_score", 0.5),
+                           priority=OCR.PRIO_POLLER)
+    return OCR.POOL.run_ocr(ocr, img, cls=CFG.AUTO_CLS, priority=OCR.PRIO_POLLER, layout=CFG.FIXED_LAYOUT)
+
+
+def _ocr_payload(result, fusion, meta, frames_skipped: int, poll):
+    # -> (payload, raw text) for one OCR result
+    text_joined, texts, boxs, scores, avg_conf, line_ids, lines_reused = \
+        OCR.extract_from_paddle_result(result, with_lines=True)
+    raw_text = text_joined
+    if CFG.FUSION:
+        texts, stable, fusion_stats = fusion.update(texts, scores, boxs, line_ids)
+        text_joined = "\n".join(texts).strip()
+
+    payload = {
+        "ok": True,
+        "text": text_joined,
+        "texts": texts,
+        "boxs": boxs,
+        "scores": scores,
+        "avg_conf": avg_conf,
+        "line_ids": line_ids,
+        "lines_reused": lines_reused,
+        "lang": CFG.AUTO_LANG,
+        "gpu": bool(CFG.AUTO_GPU),
+        "source": "shm_auto",
+        "frame": meta,
+        "seq": meta["seq"],
+        "frames_skipped": frames_skipped,
+        "reused": False,
+        "poll": poll,
+    }
+    if CFG.FUSION:
+        payload["raw_text"] = raw_text
+        payload["stable"] = stable
+        payload["fusion"] = fusion_stats
+    return payload, raw_text
+
+
+def _repeat_payload(last, fusion, **fields):
+    # the last payload again, for a frame that is not OCR'd (unchanged, or no new frame at all):
+    # one more identical reading of every line for the fusion, so text that stays on screen
+    # becomes stable without a new OCR result
+    payload = dict(last, **fields)
+    if CFG.FUSION and "stable" in last:
+        texts, stable, fusion_stats = fusion.repeat()
+        payload.update(text="\n".join(texts).strip(), texts=texts, stable=stable, fusion=fusion_stats)
+    return payload
+
+
+def _differs(a, b) -> bool:
+    return a.get("text") != b.get("text") or a.get("stable") != b.get("stable")
+
+
+class _StablePrinter:
+    # prints the text to stdout once it is stable: the fusion's flag, else unchanged for STABLE_MS
+    def __init__(self):
+        self.last_printed = None
+        self.pending_text = None
+        self.pending_since = 0.0
+
+    def feed(self, payload):
+        cur_text = payload["text"].strip()
+        if "stable" in payload:
+            if payload["stable"] and cur_text and cur_text != self.last_printed:
+                self._print(cur_text)
+        elif CFG.STABLE_MS <= 0:
+            if cur_text and cur_text != self.last_printed:
+                self._print(cur_text)
+        else:
+            now = time.monotonic()
+            if self.pending_text is None or cur_text != self.pending_text:
+                self.pending_text = cur_text
+                self.pending_since = now
+            else:
+                stable_for_ms = (now - self.pending_since) * 1000.0
+                if cur_text and stable_for_ms >= CFG.STABLE_MS and cur_text != self.last_printed:
+                    self._print(cur_text)
+
+    def _print(self, text: str):
+        print(text, flush=True)
+        self.last_printed = text
+
+
 def _poller_loop():
     try:
         OCR.POOL.get(lang=CFG.AUTO_LANG, use_gpu=CFG.AUTO_GPU, use_angle_cls=CFG.AUTO_ANGLE)
     except Exception:
         pass
 
-    last_printed = None
-    pending_text = None
-    pending_since = 0.0
+    reader = SHM.FrameReader()
+    detector, tracker, fusion, sched = _components()
+    printer = _StablePrinter()
+    last_payload = None
+    last_ocr_text = None
+    frames_skipped = 0
+    last_seq = None
 
     while True:
         t0 = time.monotonic()
 
-        img, meta_or_err = SHM.read_frame_bgr()
-        if img is None:
-            _set_latest({"ok": False, "error": meta_or_err})
-        else:
-            try:
-                ocr = OCR.POOL.get(lang=CFG.AUTO_LANG, use_gpu=CFG.AUTO_GPU, use_angle_cls=CFG.AUTO_ANGLE)
-                result = OCR.POOL.run_ocr(ocr, img, cls=CFG.AUTO_CLS)
-
-                text_joined, texts, boxs, scores, avg_conf = OCR.extract_from_paddle_result(result)
-
-                payload = {
-                    "ok": True,
-                    "text": text_joined,
-                    "texts": texts,
-                    "boxs": boxs,
-                    "scores": scores,
-                    "avg_conf": avg_conf,
-                    "lang": CFG.AUTO_LANG,
-                    "gpu": bool(CFG.AUTO_GPU),
-                    "source": "shm_auto",
-                    "frame": meta_or_err,
-                }
-                _set_latest(payload)
+        payload = None
+        if CFG.FRAME_EVENTS and last_payload is not None:
+            # same frame as last time (timeout fallback): nothing new to look at
+            if SHM.wait_frame(last_seq, CFG.FRAME_WAIT_TIMEOUT_MS) == last_seq:
+                payload = _repeat_payload(last_payload, fusion, poll=sched.stats())
+                if _differs(payload, last_payload):
+                    _set_latest(payload)
+                last_payload = payload
+        t_work = time.monotonic()
+        outcome = SCHED.UNCHANGED
 
-                cur_text = text_joined.strip()
-                if CFG.STABLE_MS <= 0:
-                    if cur_text and cur_text != last_printed:
-                        print(cur_text, flush=True)
-                        last_printed = cur_text
-                else:
-                    now = time.monotonic()
-                    if pending_text is None or cur_text != pending_text:
-                        pending_text = cur_text
-                        pending_since = now
-                    else:
-                        stable_for_ms = (now - pending_since) * 1000.0
-                        if cur_text and stable_for_ms >= CFG.STABLE_MS and cur_text != last_printed:
-                            print(cur_text, flush=True)
-                            last_printed = cur_text
+        if payload is None and CFG.SKIP_UNCHANGED and last_payload is not None:
+            view, bmeta = SHM.borrow_frame_bgra(step=detector.step)
+            if view is not None:
+                fp = detector.fingerprint(view, bmeta, step=1)
+                del view
+                if SHM.borrow_still_valid(bmeta) and not detector.changed(fp):
+                    frames_skipped += 1
+                    last_seq = bmeta["seq"]
+                    payload = _repeat_payload(last_payload, fusion, seq=last_seq, frames_skipped=frames_skipped,
+                                              reused=True, poll=sched.stats())
+                    _set_latest(payload)
+                    last_payload = payload
 
-            except Exception as e:
-                _set_latest({"ok": False, "error": str(e)})
+        if payload is None:
+            img, meta_or_err = reader.read()
+            if img is None:
+                last_payload = None
+                last_seq = None
+                detector.reset()
+                tracker.reset()
+                fusion.reset()
+                outcome = SCHED.ERROR
+                _set_latest({"ok": False, "error": meta_or_err, "frames_skipped": frames_skipped,
+                             "poll": sched.stats()})
+            else:
+                # /ocr_shm requests for this frame wait for us instead of running their own
+                flight = COALESCER.begin(meta_or_err["seq"], _opts())
+                try:
+                    fp = detector.fingerprint(img, meta_or_err)
+                    result = _run_ocr(tracker, img)
+                    payload, raw_text = _ocr_payload(result, fusion, meta_or_err, frames_skipped, sched.stats())
+                    # the raw text: a misread the fusion holds back still calls for a quick re-check
+                    outcome = SCHED.CHANGED if raw_text != last_ocr_text else SCHED.SAME
+                    last_ocr_text = raw_text
+                    _set_latest(payload)
+                    COALESCER.finish(flight, payload)
+                    last_payload = payload
+                    last_seq = meta_or_err["seq"]
+                    detector.commit(fp)
+
+                except Exception as e:
+                    COALESCER.finish(flight, error=e)
+                    last_payload = None
+                    detector.reset()
+                    tracker.reset()
+                    fusion.reset()
+                    outcome = SCHED.ERROR
+                    _set_latest({"ok": False, "error": str(e), "frames_skipped": frames_skipped,
+                                 "poll": sched.stats()})
+
+        if payload is not None:
+            printer.feed(payload)
+
+        work_ms = (time.monotonic() - t_work) * 1000.0
+        M.POLL_WORK.observe(work_ms / 1000.0)
+        if work_ms > CFG.POLL_INTERVAL_MS:
+            M.POLL_OVERRUNS.inc()
+
+        if CFG.ADAPTIVE_POLL:
+            # sleeps even with FRAME_EVENTS; the wait above then returns at once if a frame came in
+            time.sleep(sched.tick(outcome, work_ms) / 1000.0)
+            continue
+
+        if CFG.FRAME_EVENTS and last_payload is not None:
+            continue
 
         elapsed_ms = (time.monotonic() - t0) * 1000.0
         sleep_ms = max(0.0, CFG.POLL_INTERVAL_MS - elapsed_ms)
         time.sleep(sleep_ms / 1000.0)
 
 
+class _PostJob:
+    __slots__ = ("kind", "frame", "result", "flight", "poll", "stages", "outcome")
+
+    def __init__(self, kind: str, frame, poll, result=None, flight=None, stages=None):
+        self.kind = kind  # "ocr", "reuse", "hold" (no new frame) or "error"
+        self.frame = frame
+        self.result = result
+        self.flight = flight
+        self.poll = poll
+        self.stages = stages
+        self.outcome = SCHED.UNCHANGED
+
+
+class _PostStage:
+    # Last stage of the pipelined poller: turns OCR results into payloads (extraction, fusion),
+    # publishes them and answers the waiting /ocr_shm requests, in order, on its own thread,
+    # while the inference stage already works on the next frame. Whether the text changed and
+    # the time spent here reach the scheduler through feedback(), on the inference stage's next tick.
+    _RANK = {SCHED.UNCHANGED: 0, SCHED.SAME: 1, SCHED.ERROR: 2, SCHED.CHANGED: 3}
+
+    def __init__(self, fusion):
+        self.fusion = fusion
+        self.printer = _StablePrinter()
+        self.jobs = queue.Queue()
+        self.last_payload = None
+        self.last_ocr_text = None
+        self.frames_skipped = 0
+        self._fb_lock = threading.Lock()
+        self._outcome = None
+        self._busy_ms = 0.0
+
+    def start(self):
+        t = threading.Thread(target=self._run, name="ocr-post", daemon=True)
+        t.start()
+        return t
+
+    def _run(self):
+        while True:
+            job = self.jobs.get()
+            t0 = time.perf_counter()
+            try:
+                self._handle(job)
+            except Exception as e:
+                # keep the stage alive; the flight below still gets an answer
+                job.outcome = SCHED.ERROR
+                COALESCER.finish(job.flight, error=e)
+            finally:
+                # no-op when _handle already finished it; otherwise /ocr_shm joiners would wait forever
+                COALESCER.finish(job.flight, error=RuntimeError("poller_post_failed"))
+                self._record(job, (time.perf_counter() - t0) * 1000.0)
+
+    def _record(self, job: _PostJob, busy_ms: float):
+        with self._fb_lock:
+            self._busy_ms += busy_ms
+            if job.kind in ("ocr", "error"):
+                if self._outcome is None or self._RANK[job.outcome] > self._RANK[self._outcome]:
+                    self._outcome = job.outcome
+
+    def feedback(self):
+        # -> (the strongest outcome of the OCR jobs finished since the last call, or None; ms spent)
+        with self._fb_lock:
+            out, self._outcome = self._outcome, None
+            busy, self._busy_ms = self._busy_ms, 0.0
+        return out, busy
+
+    def _handle(self, job: _PostJob):
+        fr = job.frame
+        if job.kind == "reuse":
+            if self.last_payload is None:
+                return
+            self.frames_skipped += 1
+            payload = _repeat_payload(self.last_payload, self.fusion, seq=fr.seq, frames_skipped=self.frames_skipped,
+                                      reused=True, poll=job.poll)
+            _set_latest(payload)
+            self.last_payload = payload
+            self.printer.feed(payload)
+            return
+
+        if job.kind == "hold":
+            # no new frame within FRAME_WAIT_TIMEOUT_MS: the same text is still on screen
+            if self.last_payload is None:
+                return
+            payload = _repeat_payload(self.last_payload, self.fusion, poll=job.poll)
+            if _differs(payload, self.last_payload):
+                _set_latest(payload)
+            self.last_payload = payload
+            self.printer.feed(payload)
+            return
+
+        if job.kind == "ocr":
+            t0 = time.perf_counter()
+            try:
+                payload, raw_text = _ocr_payload(job.result, self.fusion, fr.meta, self.frames_skipped, job.poll)
+            except Exception as e:
+                COALESCER.finish(job.flight, error=e)
+                job.kind, fr.error = "error", str(e)
+            else:
+                job.stages["post_ms"] = round((time.perf_counter() - t0) * 1000.0, 3)
+                payload["stages"] = job.stages
+                job.outcome = SCHED.CHANGED if raw_text != self.last_ocr_text else SCHED.SAME
+                self.last_ocr_text = raw_text
+                COALESCER.finish(job.flight, payload)
+                _set_latest(payload)
+                self.last_payload = payload
+                self.printer.feed(payload)
+                return
+
+        self.last_payload = None
+        self.fusion.reset()
+        job.outcome = SCHED.ERROR
+        _set_latest({"ok": False, "error": fr.error, "frames_skipped": self.frames_skipped, "poll": job.poll})
+
+
+def _pipelined_loop():
+    # Three stages, so SHM reads, color conversion and payload building stay off the OCR path:
+    # FrameAcquirer (newest converted frame, latest-wins) -> this thread (change check + OCR)
+    # -> _PostStage (extraction, fusion, publishing). Payloads carry each stage's time in "stages".
+    try:
+        OCR.POOL.get(lang=CFG.AUTO_LANG, use_gpu=CFG.AUTO_GPU, use_angle_cls=CFG.AUTO_ANGLE)
+    except Exception:
+        pass
+
+    detector, tracker, fusion, sched = _components()
+    acq = FrameAcquirer(
+        wait_ms=CFG.FRAME_WAIT_TIMEOUT_MS,
+        frame_events=CFG.FRAME_EVENTS,
+        poll_ms=CFG.POLL_INTERVAL_MS,
+        prepare=detector.fingerprint,
+        # unchanged frames are recognized from a borrowed view, without the read and conversion
+        changed=detector.changed if CFG.SKIP_UNCHANGED else None,
+        view_step=detector.step,
+    )
+    post = _PostStage(fusion)
+    post.start()
+    acq.start()
+    have_payload = False  # the post stage has a payload to reuse for unchanged frames
+
+    while True:
+        fr = acq.take(CFG.FRAME_WAIT_TIMEOUT_MS / 1000.0)
+        if fr is None:
+            if have_payload and CFG.FUSION:
+                post.jobs.put(_PostJob("hold", None, sched.stats()))
+            continue  # no new frame
+        t_work = time.monotonic()
+        queue_ms = (t_work - fr.t_ready) * 1000.0
+        poll = sched.stats()
+
+        if fr.error is not None:
+            detector.reset()
+            tracker.reset()
+            have_payload = False
+            job = _PostJob("error", fr, poll)
+        elif fr.img is None and (not have_payload or detector.changed(fr.fp)):
+            # checked against a reference replaced since (or reset): have the acquirer read it in full
+            acq.rescan()
+            acq.release(fr)
+            continue
+        elif CFG.SKIP_UNCHANGED and have_payload and not detector.changed(fr.fp):
+            job = _PostJob("reuse", fr, poll)
+        else:
+            # /ocr_shm requests for this frame wait for us instead of running their own
+            flight = COALESCER.begin(fr.seq, _opts())
+            t0 = time.perf_counter()
+            try:
+                result = _run_ocr(tracker, fr.img)
+            except Exception as e:
+                COALESCER.finish(flight, error=e)
+                detector.reset()
+                tracker.reset()
+                have_payload = False
+                fr.error = str(e)
+                job = _PostJob("error", fr, poll)
+            else:
+                detector.commit(fr.fp)
+                have_payload = True
+                stages = {
+                    "acquire_ms": round(fr.acquire_ms, 3),
+                    "queue_ms": round(queue_ms, 3),
+                    "infer_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+                    "acquired": acq.frames,
+                    "unchanged": acq.unchanged,
+                    "dropped": acq.dropped,
+                }
+                job = _PostJob("ocr", fr, poll, result=result, flight=flight, stages=stages)
+        acq.release(fr)
+        post.jobs.put(job)
+
+        work_ms = (time.monotonic() - t_work) * 1000.0
+        M.POLL_WORK.observe(work_ms / 1000.0)
+        if work_ms > CFG.POLL_INTERVAL_MS:
+            M.POLL_OVERRUNS.inc()
+
+        if CFG.ADAPTIVE_POLL:
+            # no waiting on the post stage: whether the text changed arrives with a later tick
+            late, post_ms = post.feedback()
+            if job.kind == "error":
+                outcome = SCHED.ERROR
+            elif late is not None:
+                outcome = late
+            else:
+                outcome = SCHED.SAME if job.kind == "ocr" else SCHED.UNCHANGED
+            # the duty budget covers the acquisition and post stages' time as well
+            busy_ms = work_ms + acq.take_busy_ms() + post_ms
+            time.sleep(sched.tick(outcome, busy_ms) / 1000.0)
+        elif not CFG.FRAME_EVENTS or not have_payload:
+            time.sleep(max(0.0, CFG.POLL_INTERVAL_MS - work_ms) / 1000.0)
+
+
 def start():
-    t = threading.Thread(target=_poller_loop, daemon=True)
+    t = threading.Thread(target=_pipelined_loop if CFG.POLL_PIPELINE else _poller_loop, daemon=True)
     t.start()
     return t
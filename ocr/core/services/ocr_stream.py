@@ -0,0 +1,95 @@
+import json
+import threading
+
+
+class _Subscriber:
+    # one stream client; holds at most one undelivered payload (a newer one replaces it)
+    def __init__(self, changes_only: bool):
+        self.changes_only = bool(changes_only)
+        self._cond = threading.Condition()
+        self._pending = None
+        self._last_text = None
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, event_id, data: bytes, text: str):
+        with self._cond:
+            if self.changes_only and text == self._last_text:
+                return
+            self._last_text = text
+            if self._pending is not None:
+                self.dropped += 1  # slow reader: it only ever gets the newest payload
+            self._pending = (event_id, data)
+            self._cond.notify()
+
+    def take(self, timeout_s: float):
+        # -> (event_id, data), or None on timeout
+        with self._cond:
+            if self._pending is None:
+                self._cond.wait(timeout_s)
+            item, self._pending = self._pending, None
+            if item is not None:
+                self.sent += 1
+            return item
+
+
+class PayloadStream:
+    # Fan-out of poller payloads to /stream subscribers. Each payload is JSON-encoded once,
+    # only when somebody is listening; every subscriber has its own latest-only slot, so a
+    # slow client never holds up the poller or the other clients.
+    def __init__(self, max_subscribers: int = 16):
+        self.max_subscribers = max(1, int(max_subscribers))
+        self._lock = threading.Lock()
+        self._subs = []
+        self._last = None  # (event_id, data, text) for new subscribers
+        self._next_id = 0
+        self.published = 0
+        self.total_dropped = 0
+
+    def publish(self, payload):
+        with self._lock:
+            self._next_id += 1
+            self.published += 1
+            subs = list(self._subs)
+            if not subs:
+                self._last = (self._next_id, None, payload)
+                return
+            event_id = self._next_id
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        text = (payload.get("text") or "").strip()
+        with self._lock:
+            self._last = (event_id, data, payload)
+        for s in subs:
+            s.offer(event_id, data, text)
+
+    def subscribe(self, changes_only: bool = False):
+        # -> _Subscriber, or None when the subscriber limit is reached
+        with self._lock:
+            if len(self._subs) >= self.max_subscribers:
+                return None
+            sub = _Subscriber(changes_only)
+            self._subs.append(sub)
+            last = self._last
+        if last is not None:
+            event_id, data, payload = last
+            if data is None:
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            sub.offer(event_id, data, (payload.get("text") or "").strip())
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+                self.total_dropped += sub.dropped
+
+    def stats(self):
+        with self._lock:
+            subs = list(self._subs)
+            return {
+                "subscribers": len(subs),
+                "max_subscribers": self.max_subscribers,
+                "published": self.published,
+                "sent": sum(s.sent for s in subs),
+                "dropped": self.total_dropped + sum(s.dropped for s in subs),
+            }
@@ -0,0 +1,187 @@
+import json
+import os
+import secrets
+import stat
+import struct
+import threading
+from multiprocessing.connection import AuthenticationError, Client, Listener, answer_challenge, deliver_challenge
+
+# Local transport between the bridge, the OCR service and the translator: the HTTP APIs' routes
+# and bodies, framed as length-prefixed messages (multiprocessing.connection, bytes only, nothing
+# is unpickled) over a Unix socket, or a named pipe on Windows. Clients keep one connection open.
+#   request:  <B method: 0 GET, 1 POST> <H path length> path incl. query (utf-8) | body
+#   response: <H status> <B body encoding: 0 JSON, 1 MessagePack, 2 other> | body
+# Every connection first passes multiprocessing's HMAC challenge with the shared key from
+# authkey(), so only processes of the same user can talk to the services.
+REQ = struct.Struct("<BH")
+RESP = struct.Struct("<HB")
+METHODS = ("GET", "POST")
+ENC_JSON, ENC_MSGPACK, ENC_OTHER = 0, 1, 2
+
+# SETJA_IPC_KEY overrides the key file (services and bridge must agree)
+KEY_FILE = os.path.join(os.path.expanduser("~"), ".setja", "ipc.key")
+
+
+def family_of(address: str) -> str:
+    return "AF_PIPE" if address.startswith("\\\\.\\pipe\\") else "AF_UNIX"
+
+
+def default_address(name: str) -> str:
+    # the well-known address for "ocr" / "mt", for IPC_ADDRESS and BridgeConfig
+    if os.name == "nt":
+        return rf"\\.\pipe\setja-{name}"
+    return os.path.join(os.path.dirname(KEY_FILE), f"{name}.sock")
+
+
+def authkey(path: str = None) -> bytes:
+    # The shared secret: SETJA_IPC_KEY, else the key file, created with 32 random bytes on first
+    # use. The file (and its directory) must be private to this user.
+    env = os.environ.get("SETJA_IPC_KEY")
+    if env:
+        return env.encode("utf-8")
+    path = path or KEY_FILE
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        pass
+    else:
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_hex(32))
+    if os.name != "nt":
+        st = os.stat(path)
+        if st.st_uid != os.getuid() or st.st_mode & (stat.S_IRWXG | stat.S_IRWXO):
+            raise PermissionError(f"{path} must be owned by this user and not readable by others")
+    with open(path, "r", encoding="ascii") as f:
+        key = f.read().strip()
+    if not key:
+        raise PermissionError(f"{path} is empty")
+    return key.encode("ascii")
+
+
+def parse(msg: bytes):
+    # request frame -> (method name, path, body); ValueError on a malformed frame
+    try:
+        method, plen = REQ.unpack_from(msg)
+        path = msg[REQ.size:REQ.size + plen].decode("utf-8")
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"bad_frame: {e}") from None
+    name = METHODS[method] if method < len(METHODS) else "other"
+    return name, path, msg[REQ.size + plen:]
+
+
+def json_reply(code: int, obj) -> bytes:
+    return RESP.pack(code, ENC_JSON) + json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+class IpcServer:
+    # Accepts on `address` and serves each connection on its own thread, one request at a time
+    # (the bridge and the viewer are the only clients). handle(request frame) -> response frame;
+    # a frame it cannot parse gets a 400, an exception from it a 500, and the connection stays up.
+    def __init__(self, address: str, handle, name: str = "ipc", key: bytes = None):
+        family = family_of(address)
+        if family == "AF_UNIX" and os.path.exists(address):
+            os.unlink(address)  # left behind by a previous run that did not shut down
+        self.address = address
+        self.handle = handle
+        self.name = name
+        self._key = key if key is not None else authkey()
+        # the challenge runs on the connection's thread, so a silent client cannot stall accept()
+        self._listener = Listener(address, family=family)
+        if family == "AF_UNIX":
+            os.chmod(address, 0o600)
+        self._closed = False
+        self.connections = 0
+        self.rejected = 0
+
+    def start(self):
+        t = threading.Thread(target=self.serve_forever, name=self.name, daemon=True)
+        t.start()
+        return t
+
+    def serve_forever(self):
+        while not self._closed:
+            try:
+                conn = self._listener.accept()
+            except OSError:
+                if self._closed:
+                    return
+                continue
+            threading.Thread(target=self._client, args=(conn,), name=f"{self.name}-conn", daemon=True).start()
+
+    def close(self):
+        self._closed = True
+        self._listener.close()
+
+    def _reply(self, msg: bytes) -> bytes:
+        try:
+            return self.handle(msg)
+        except ValueError as e:
+            return json_reply(400, {"ok": False, "error": f"bad_request: {e}"})
+        except Exception as e:
+            return json_reply(500, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+
+    def _client(self, conn):
+        with conn:
+            try:
+                deliver_challenge(conn, self._key)
+                answer_challenge(conn, self._key)
+            except (AuthenticationError, EOFError, OSError):
+                self.rejected += 1
+                return
+            self.connections += 1
+            try:
+                while True:
+                    conn.send_bytes(self._reply(conn.recv_bytes()))
+            except (EOFError, OSError):
+                return
+
+
+class IpcClient:
+    # One persistent connection to a service's IPC address, reopened on demand.
+    def __init__(self, address: str, key: bytes = None):
+        self.address = address
+        self._key = key
+        self._conn = None
+
+    def close(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except OSError:
+                pass
+            self._conn = None
+
+    def request(self, method: str, path: str, body: bytes = b"", timeout: float = 5.0):
+        # -> (status, decoded body); OSError / EOFError when the service is not there,
+        # AuthenticationError when it does not share our key
+        path_b = path.encode("utf-8")
+        msg = REQ.pack(1 if method == "POST" else 0, len(path_b)) + path_b + body
+        for attempt in (0, 1):
+            fresh = self._conn is None
+            if fresh:
+                if self._key is None:
+                    self._key = authkey()
+                self._conn = Client(self.address, family=family_of(self.address), authkey=self._key)
+            try:
+                self._conn.send_bytes(msg)
+            except OSError:
+                # the service restarted since the last call: reconnect once
+                self.close()
+                if fresh or attempt:
+                    raise
+                continue
+            break
+        try:
+            if not self._conn.poll(timeout):
+                raise TimeoutError(f"no reply from {self.address} in {timeout}s")
+            data = self._conn.recv_bytes()
+        except (OSError, EOFError):
+            self.close()  # a late reply would answer the next request
+            raise
+        code, enc = RESP.unpack_from(data)
+        payload = data[RESP.size:]
+        if enc == ENC_MSGPACK:
+            import msgpack
+            return code, msgpack.unpackb(payload, raw=False)
+        return code, json.loads(payload)
@@ -3,7 +3,9 @@ from typing import List, Optional
 from fastapi import FastAPI
 from pydantic import BaseModel
 
+import core.config.t_config as TCFG
 from core.config.t_config import APP_ROOT, MODEL_DIR, TOKENIZER_DIR, DEVICE, COMPUTE_TYPE
+import core.api.t_ipc as t_ipc
 from core.utils.t_engine import RealTimeMT
 
 app = FastAPI(title="SETJA Translator", version="1.0")
@@ -29,6 +31,8 @@ class TranslateResp(BaseModel):
 def startup():
     global _mt
     _mt = RealTimeMT()
+    if TCFG.IPC_ADDRESS:
+        t_ipc.serve(TCFG.IPC_ADDRESS, _ipc_route)
 
     print(f"Translator API Running")
 
@@ -42,6 +46,7 @@ def health():
         "tokenizer_dir": TOKENIZER_DIR,
         "device": DEVICE,
         "compute_type": COMPUTE_TYPE,
+        "caches": _mt.cache_stats() if _mt is not None else None,
     }
 
 
@@ -64,3 +69,12 @@ def translate(req: TranslateReq):
 
     except Exception as e:
         return TranslateResp(ok=False, ms=0.0, error=str(e))
+
+
+def _ipc_route(method: str, path: str, body: bytes):
+    # the IPC transport's routes: same handlers and bodies as over HTTP
+    if method == "POST" and path == "/translate":
+        return 200, translate(TranslateReq.model_validate_json(body)).model_dump()
+    if method == "GET" and path == "/health":
+        return 200, health()
+    return 404, {"ok": False, "error": "not_found"}
@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[3] / "shared"))
+
+from setja_ipc import IpcServer, json_reply, parse
+
+# The translator API over the local transport (shared/setja_ipc.py), JSON bodies only.
+
+
+def serve(address: str, route) -> IpcServer:
+    # route(method, path, body) -> (status, JSON-able object); listening right away
+    def handle(msg: bytes) -> bytes:
+        return json_reply(*route(*parse(msg)))
+
+    server = IpcServer(address, handle, name="mt-ipc")
+    server.start()
+    return server
@@ -22,8 +22,15 @@ BATCH_SIZE = 16
 
 CACHE_MAX = 4000
 SPEAKER_CACHE_MAX = 2000
+# per-line memo of MarianTokenizer work: normalized text -> tokens, output tokens -> text; 0 disables
+TOKEN_CACHE_MAX = 8000
+DETOK_CACHE_MAX = 8000
 
 STABLE_MS = 120
 
 HOST = "127.0.0.1"
 PORT = 15199
+
+# local IPC next to HTTP (t_ipc): Unix socket / named pipe for the bridge, keyed like the OCR
+# service's; off unless set (e.g. setja_ipc.default_address("mt"))
+IPC_ADDRESS = None
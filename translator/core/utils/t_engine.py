@@ -14,6 +14,8 @@ from core.config.t_config import (
     BATCH_SIZE,
     CACHE_MAX,
     SPEAKER_CACHE_MAX,
+    TOKEN_CACHE_MAX,
+    DETOK_CACHE_MAX,
     STABLE_MS,
 )
 
@@ -44,11 +46,19 @@ class RealTimeMT:
 
         self.cache = LRUCache(CACHE_MAX)
         self.speaker_cache = LRUCache(SPEAKER_CACHE_MAX)
+        # subtitle lines repeat constantly; skip the tokenizer for lines seen before
+        self.tok_cache = LRUCache(TOKEN_CACHE_MAX) if TOKEN_CACHE_MAX > 0 else None
+        self.detok_cache = LRUCache(DETOK_CACHE_MAX) if DETOK_CACHE_MAX > 0 else None
         self.gate = StabilityGate(STABLE_MS)
 
         self._warmup()
 
     def _encode_to_tokens(self, text: str):
+        cache = self.tok_cache
+        if cache is not None:
+            cached = cache.get(text)
+            if cached is not None:
+                return list(cached)
         enc = self.tokenizer(
             text,
             add_special_tokens=True,
@@ -56,11 +66,31 @@ class RealTimeMT:
             return_token_type_ids=False,
         )
         ids = enc["input_ids"]
-        return self.tokenizer.convert_ids_to_tokens(ids)
+        tokens = self.tokenizer.convert_ids_to_tokens(ids)
+        if cache is not None:
+            cache.set(text, tuple(tokens))
+        return tokens
 
     def _decode_from_tokens(self, tokens):
+        cache = self.detok_cache
+        key = tuple(tokens) if cache is not None else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
         ids = self.tokenizer.convert_tokens_to_ids(tokens)
-        return self.tokenizer.decode(ids, skip_special_tokens=True)
+        text = self.tokenizer.decode(ids, skip_special_tokens=True)
+        if cache is not None:
+            cache.set(key, text)
+        return text
+
+    def cache_stats(self):
+        return {
+            "translations": self.cache.stats(),
+            "speakers": self.speaker_cache.stats(),
+            "tokens": self.tok_cache.stats() if self.tok_cache is not None else None,
+            "detokens": self.detok_cache.stats() if self.detok_cache is not None else None,
+        }
 
     def _warmup(self):
         toks = self._encode_to_tokens("Hello!")
@@ -5,12 +5,18 @@ class LRUCache:
     def __init__(self, max_size: int):
         self.max_size = max_size
         self._d = OrderedDict()
+        self.hits = 0
+        self.misses = 0
 
     def get(self, k):
-        if k in self._d:
+        try:
             self._d.move_to_end(k)
-            return self._d[k]
-        return None
+            v = self._d[k]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return v
 
     def set(self, k, v):
         self._d[k] = v
@@ -18,6 +24,16 @@ class LRUCache:
         if len(self._d) > self.max_size:
             self._d.popitem(last=False)
 
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "size": len(self._d),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
 class StabilityGate:
     def __init__(self, stable_ms: int):
         self.stable_ms = max(0, int(stable_ms))